@@ -2,54 +2,52 @@ import os
 import json
 import pickle
 import math
-import subprocess
 from collections import defaultdict
+import numpy as np
 from specklepy.objects import Base
 from path_of_travel import euclidean_distance
+from floor_graph import get_room_index
 
-# 🧠 LLM subprocess call utility
+# 🧠 LLM worker pool: the langchain venv processes load models and FAISS indexes once per run
 VENV_PYTHON = os.path.join("langchain_venv", "Scripts" if os.name == "nt" else "bin", "python")
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", 1))
+LLM_WORKER_TIMEOUT_S = float(os.getenv("LLM_WORKER_TIMEOUT_S", 600))  # per batch; the worker is restarted after it
+
+_llm_pool = None
+
+
+def get_llm_pool():
+    """The shared LLMWorkerPool, started lazily and closed at exit."""
+    global _llm_pool
+    if _llm_pool is None:
+        import atexit
+        import sys
+        from llm_worker import LLMWorkerPool
+
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        venv_python = os.path.join(cwd, VENV_PYTHON)
+
+        # Workers run from the repo root, so the relative vector_db paths resolve there
+        _llm_pool = LLMWorkerPool(
+            size=LLM_WORKERS,
+            python=os.getenv("LLM_WORKER_PYTHON") or (venv_python if os.path.exists(venv_python) else sys.executable),
+            cwd=cwd,
+            timeout_s=LLM_WORKER_TIMEOUT_S
+        )
+        atexit.register(_llm_pool.close)
+    return _llm_pool
+
 
 def run_llm_classify_batch(room_names: list[str]) -> dict:
-    import json
-    import time
     from more_itertools import chunked
 
     results = {}
-
-    for batch in chunked(room_names, 10):
-        try:
-            env = os.environ.copy()
-            result = subprocess.run(
-                [VENV_PYTHON, "llm_classify.py", json.dumps(batch)],
-                capture_output=True,
-                text=True,
-                check=True, 
-                env=env
-            )
-
-            # ➕ Extract JSON from mixed stdout
-            lines = result.stdout.strip().splitlines()
-            json_part = None
-            for line in reversed(lines):
-                try:
-                    json_part = json.loads(line)
-                    break  # Stop at the first valid JSON
-                except json.JSONDecodeError:
-                    continue
-
-            if json_part:
-                results.update(json_part)
-            else:
-                print(f"[ERROR] No valid JSON found in output:\n{result.stdout}", flush=True)
-
-        except subprocess.CalledProcessError as e:
-            print(f"[ERROR] Subprocess failed on batch {batch}: {e}", flush=True)
-            print("STDERR:\n", e.stderr, flush=True)
-        except Exception as e:
-            print(f"[ERROR] Unknown error on batch {batch}: {e}", flush=True)
-
-        time.sleep(0.5)
+    batches = [list(batch) for batch in chunked(room_names, 10)]
+    for batch, result in zip(batches, get_llm_pool().map("classify", batches)):
+        if isinstance(result, Exception):
+            print(f"[ERROR] LLM worker failed on batch {batch}: {result}", flush=True)
+            continue
+        results.update(result)
 
     return results
 
@@ -103,91 +101,24 @@ def run_llm_classify_batch(room_names: list[str]) -> dict:
 #     return results
 
 def run_llm_olf_batch(room_names: list[str]) -> dict:
-    import sys
-    import time
-    import json
     from more_itertools import chunked
-    import subprocess
-    import os
 
     results = {}
-
-    # Absolute path to the Python interpreter in langchain_venv
-    venv_python = r"C:\Users\abassaf\scripting\python\fire_safety\langchain_venv\Scripts\python.exe"
-
-    # Determine working directory (same folder as this file)
-    cwd = os.path.dirname(os.path.abspath(__file__))
-
-    # Path to vector_db folder
-    faiss_index_dir = os.path.join(cwd, "vector_db")
-
-    for batch in chunked(room_names, 5):  # smaller batch for better debugging
-        try:
-            env = os.environ.copy()
-            # Ensure FAISS index dir is available to subprocess
-            env["FAISS_INDEX_DIR"] = faiss_index_dir
-
-            # Always call llm_olf.py with langchain_venv interpreter
-            cmd = [venv_python, "llm_olf.py", *batch]
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                env=env,
-                cwd=cwd  # Important: so vector_db resolves correctly
-            )
-
-            if result.returncode != 0:
-                print(f"[ERROR] Subprocess failed on batch: {batch}", flush=True)
-                print("[ERROR] STDOUT:\n", result.stdout, flush=True)
-                print("[ERROR] STDERR:\n", result.stderr, flush=True)
-                continue  # skip this batch
-
-            # Try to parse from last valid JSON line
-            lines = result.stdout.strip().splitlines()
-            print(f"[DEBUG] Raw output for batch {batch}:\n{lines}", flush=True)
-            json_part = None
-            for line in reversed(lines):
-                try:
-                    print(f"[DEBUG] Trying to load line: {line}", flush=True)
-                    json_part = json.loads(line)
-                    break
-                except json.JSONDecodeError:
-                    continue
-
-            if json_part:
-                results.update(json_part)
-            else:
-                print(f"[WARNING] No valid JSON found in output for batch: {batch}\nRaw output:\n{result.stdout}")
-
-        except Exception as e:
-            print(f"[ERROR] Unknown error on batch {batch}: {e}", flush=True)
-
-        time.sleep(0.5)
+    batches = [list(batch) for batch in chunked(room_names, 5)]
+    for batch, result in zip(batches, get_llm_pool().map("olf", batches)):
+        if isinstance(result, Exception):
+            print(f"[ERROR] LLM worker failed on batch {batch}: {result}", flush=True)
+            continue
+        results.update(result)
 
     return results
 
 
-
-
-
 def run_llm_max_occupancy_batch(classifications: list[str]) -> dict:
-    import json
     try:
-        env = os.environ.copy()
-        result = subprocess.run(    
-            [VENV_PYTHON, "llm_max_occupancy.py", json.dumps(classifications)],
-            capture_output=True,
-            text=True,
-            check=True,
-            env=env
-        )
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"[ERROR] Subprocess error:\n{e.stderr}", flush=True)
-        return {}
-    except json.JSONDecodeError as e:
-        print(f"[ERROR] JSON decode error:\nRaw stdout: {result.stdout}", flush=True)
+        return get_llm_pool().request("max_occupancy", classifications)
+    except Exception as e:
+        print(f"[ERROR] LLM worker failed on max occupancy: {e}", flush=True)
         return {}
 
 
@@ -460,15 +391,11 @@ def compute_compliance_check(paths, graph=None, all_rooms=None, all_floors=None,
         path_groups[p["room_id"]].append(p)
 
     # Count how many door nodes per room
-    def count_doors_per_room(graph):
-        room_door_counts = {}
-        for node, data in graph.nodes(data=True):
-            if data.get("type") == "door":
-                for room_id in data.get("connected_rooms", []):
-                    room_door_counts[room_id] = room_door_counts.get(room_id, 0) + 1
-        return room_door_counts
-
-    door_counts = count_doors_per_room(graph)
+    room_index = get_room_index(graph)
+    door_counts = {}
+    for connected_rooms in room_index["door_rooms"].values():
+        for room_id in connected_rooms:
+            door_counts[room_id] = door_counts.get(room_id, 0) + 1
 
     for room_id, path_objs in path_groups.items():
         room = room_lookup.get(room_id)
@@ -486,8 +413,8 @@ def compute_compliance_check(paths, graph=None, all_rooms=None, all_floors=None,
                 continue
 
             dist = sum(euclidean_distance(p1, p2) for p1, p2 in zip(path_nodes[:-1], path_nodes[1:]))
-            room_nodes = [n for n, data in graph.nodes(data=True) if data.get("room_id") == room_id]
-            common = max(euclidean_distance(path_nodes[0], pt) for pt in room_nodes) if room_nodes else 0
+            room_nodes = room_index["room_nodes"].get(room_id)
+            common = float(np.sqrt(((room_nodes - np.asarray(path_nodes[0])) ** 2).sum(axis=1)).max()) if room_nodes is not None else 0
 
             travel_distances.append(round(dist, 2))
             common_paths.append(round(common, 2))
@@ -18,6 +18,7 @@ from speckle_credentials import (
     SPECKLE_TOKEN_CORRECTION
 )
 from specklepy.objects.units import get_units_from_string
+from speckle_cache import SpeckleModelCache
 
 invalid_units_seen = set()
 
@@ -54,7 +55,8 @@ enrichment_branch_name = "enriched walls"
 commit = client.commit.get(stream_id, commit_id)
 print(f"[DEBUG] Commit: {commit}")
 transport = ServerTransport(client=client, stream_id=stream_id)
-base = operations.receive(commit.referencedObject, transport)
+model_cache = SpeckleModelCache()
+base = model_cache.receive(commit.referencedObject, transport)
 
 # Step 2: Extract walls and rooms
 def receive_and_extract_walls_recursive(obj, transport, path="base"):
@@ -84,7 +86,7 @@ def receive_and_extract_walls_recursive(obj, transport, path="base"):
             for i, el in enumerate(elements):
                 if isinstance(el, dict) and "referencedId" in el:
                     ref_id = el["referencedId"]
-                    child = operations.receive(ref_id, transport)
+                    child = model_cache.receive(ref_id, transport)
                     wall_instances += receive_and_extract_walls_recursive(child, transport, path=f"{path}.elements[{i}]")
                 elif isinstance(el, Base):
                     wall_instances += receive_and_extract_walls_recursive(el, transport, path=f"{path}.elements[{i}]")
@@ -120,7 +122,7 @@ def receive_and_extract_rooms_recursive(obj, transport, path="base"):
             for i, el in enumerate(elements):
                 if isinstance(el, dict) and "referencedId" in el:
                     ref_id = el["referencedId"]
-                    child = operations.receive(ref_id, transport)
+                    child = model_cache.receive(ref_id, transport)
                     room_instances += receive_and_extract_rooms_recursive(child, transport, path=f"{path}.elements[{i}]")
                 elif isinstance(el, Base):
                     room_instances += receive_and_extract_rooms_recursive(el, transport, path=f"{path}.elements[{i}]")
@@ -121,12 +121,15 @@
 import os
 import re
 import json
-import pickle
 from collections import defaultdict, Counter
 from openai import AzureOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from dotenv import load_dotenv
+import numpy as np
+from floor_graph import load_floor_graph, list_floor_graphs
+from vectorstore_registry import get_vectorstore
+from llm_async import LLM_ENGINE, run_chat_batch
+from room_cache import get_room_cache, normalize_key
+from llm_batch import LLM_BATCH_ROOMS, run_batched, union_context
 load_dotenv()
 
 # === Speckle Graph Directory ===
@@ -139,22 +142,8 @@ client = AzureOpenAI(
     azure_endpoint=os.getenv("AZURE_ENDPOINT")
 )
 
-embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
+# The SELECTED_CODE_PDF vectorstore is loaded on first use by vectorstore_registry
 selected_pdf = os.environ.get("SELECTED_CODE_PDF")
-vectorstore = None
-if selected_pdf:
-    index_name = os.path.splitext(os.path.basename(selected_pdf))[0]
-    index_path = os.path.join("vector_db", index_name)
-
-    print(f"[DEBUG] Loading FAISS index for classification: {index_path} (index_name={index_name})")
-
-    vectorstore = FAISS.load_local(
-        folder_path=index_path,
-        embeddings=embedding,
-        index_name=index_name,
-        allow_dangerous_deserialization=True
-    )
 
 # === BBox Utility ===
 def bbox_touch_or_overlap(b1, b2, margin=1.0):
@@ -169,35 +158,40 @@ def bbox_touch_or_overlap(b1, b2, margin=1.0):
 def build_room_adjacency_from_graphs():
     adjacency_map = defaultdict(set)
 
-    for fname in os.listdir(GRAPH_DIR):
-        if not fname.endswith(".pkl") or not fname.startswith("G_"):
-            continue
-
-        with open(os.path.join(GRAPH_DIR, fname), "rb") as f:
-            G = pickle.load(f)
+    for graph_path in list_floor_graphs(GRAPH_DIR):
+        # Only coordinates and room columns are needed: no networkx graph is built
+        floor = load_floor_graph(graph_path, as_networkx=False)
+        coords = floor.coords
+        rid_codes = np.asarray(floor.codes["room_id"])
+        name_codes = np.asarray(floor.codes["room_name"])
+        name_table = floor.tables["room_name"]
 
-        room_nodes = defaultdict(list)
-        for node, data in G.nodes(data=True):
-            rid = data.get("room_id")
-            if rid:
-                room_nodes[rid].append((node, data))
+        # Rooms in order of their first node, like iterating G.nodes
+        tagged = np.flatnonzero(rid_codes >= 0)
+        codes, first = np.unique(rid_codes[tagged], return_index=True)
 
         room_bboxes = {}
         room_names = {}
         unnamed_counter = 1
 
-        for rid, node_data_list in room_nodes.items():
-            xs = [pt[0][0] for pt in node_data_list]
-            ys = [pt[0][1] for pt in node_data_list]
-            if not xs or not ys:
+        for code in codes[np.argsort(first)].tolist():
+            rid = floor.tables["room_id"][code]
+            if not rid:
                 continue
-            room_bboxes[rid] = (min(xs), max(xs), min(ys), max(ys))
-
+            members = rid_codes == code
+            xs, ys = coords[members, 0], coords[members, 1]
+            room_bboxes[rid] = (xs.min(), xs.max(), ys.min(), ys.max())
+
+            # Names counted in order of first appearance, so most_common breaks ties the same way
+            member_names = name_codes[members]
+            name_ids, name_first, name_counts_raw = np.unique(
+                member_names[member_names >= 0], return_index=True, return_counts=True
+            )
             name_counts = Counter()
-            for _, data in node_data_list:
-                name = data.get("room_name")
+            for i in np.argsort(name_first).tolist():
+                name = name_table[name_ids[i]]
                 if name and name.strip() and name != "?":
-                    name_counts[name.strip().upper()] += 1
+                    name_counts[name.strip().upper()] += int(name_counts_raw[i])
 
             best_name = name_counts.most_common(1)[0][0] if name_counts else f"UNNAMED_ROOM_{unnamed_counter}"
             if not name_counts:
@@ -220,25 +214,24 @@ print("[INFO] Computing room adjacency from graph PKLs...")
 room_adjacency_map = build_room_adjacency_from_graphs()
 
 # === GPT Classification ===
-def extract_classification_sections_with_gpt(room_name: str) -> str:
-    print(f"[INFO] Searching for classification context for room: {room_name}", flush=True)
-    try:
-        print(f"[INFO] Using FAISS index for {selected_pdf}", flush=True)
-        docs = vectorstore.similarity_search(room_name, k=3)
-        context = "\n\n".join(doc.page_content for doc in docs)
-        print(f"[INFO] Context for '{room_name}': {context[:200]}...", flush=True)
-
-        # 🔍 Inject adjacency for context-sensitive room types
-        base_name = room_name.upper().strip()
-        adjacency_list = room_adjacency_map.get(base_name, [])
-        is_contextual_room = base_name in {"WC", "TOILET", "KITCHEN", "PANTRY", "BATHROOM", "WASHROOM"}
-
-        if is_contextual_room and adjacency_list:
-            room_context = f"Room: {room_name}\nAdjacent rooms: {', '.join(adjacency_list)}"
-        else:
-            room_context = f"Room: {room_name}"
+def classification_messages(room_name: str) -> list:
+    """Chat messages of the classification prompt, with code context retrieved from FAISS."""
+    print(f"[INFO] Using FAISS index for {selected_pdf}", flush=True)
+    docs = get_vectorstore(selected_pdf).similarity_search(room_name, k=3)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    print(f"[INFO] Context for '{room_name}': {context[:200]}...", flush=True)
+
+    # 🔍 Inject adjacency for context-sensitive room types
+    base_name = room_name.upper().strip()
+    adjacency_list = room_adjacency_map.get(base_name, [])
+    is_contextual_room = base_name in {"WC", "TOILET", "KITCHEN", "PANTRY", "BATHROOM", "WASHROOM"}
+
+    if is_contextual_room and adjacency_list:
+        room_context = f"Room: {room_name}\nAdjacent rooms: {', '.join(adjacency_list)}"
+    else:
+        room_context = f"Room: {room_name}"
 
-        prompt = f"""
+    prompt = f"""
             You are an expert in fire safety building codes.
             Given the room context below, return the most appropriate building classification group.
             Include subgroup if applicable (e.g., Group R-2, Group A-3, Group I-4, etc.).
@@ -253,19 +246,67 @@ def extract_classification_sections_with_gpt(room_name: str) -> str:
             Classification: Group X[-Y]
         """
 
+    return [
+        {"role": "system", "content": "Only output one line in this format: Classification: Group X. Do not explain. Do not add extra lines."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def classification_batch_messages(room_names: list[str]) -> list:
+    """Chat messages of one classification prompt for many rooms, answered as a JSON object."""
+    store = get_vectorstore(selected_pdf)
+    context = "\n\n".join(union_context(room_names, lambda name: store.similarity_search(name, k=3)))
+
+    adjacency = []
+    for name in room_names:
+        base_name = name.upper().strip()
+        if base_name in {"WC", "TOILET", "KITCHEN", "PANTRY", "BATHROOM", "WASHROOM"} and room_adjacency_map.get(base_name):
+            adjacency.append(f"{name}: adjacent to {', '.join(room_adjacency_map[base_name])}")
+    adjacency_context = ("Adjacent rooms:\n" + "\n".join(adjacency)) if adjacency else ""
+
+    prompt = f"""
+            You are an expert in fire safety building codes.
+            For each room below, return the most appropriate building classification group.
+            Include subgroup if applicable (e.g., Group R-2, Group A-3, Group I-4, etc.).
+
+            Rooms: {json.dumps(room_names)}
+            {adjacency_context}
+
+            Code Context:
+            {context}
+
+            Respond with one JSON object mapping every room name, exactly as given, to its classification:
+            {{"<room name>": "Group X[-Y]"}}
+        """
+
+    return [
+        {"role": "system", "content": "Only output one JSON object mapping each room name to \"Group X\". Do not explain."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_classification(content: str) -> str | None:
+    match = re.search(r"Classification:\s*(Group\s+[A-Z]+(?:-\d)?)", content or "")
+    return match.group(1) if match else None
+
+
+def validate_classification(room_name: str, value) -> str | None:
+    """One room's value from a batched JSON answer, checked like a single-room answer."""
+    return parse_classification(f"Classification: {value}") if isinstance(value, str) else None
+
+
+def extract_classification_sections_with_gpt(room_name: str) -> str:
+    print(f"[INFO] Searching for classification context for room: {room_name}", flush=True)
+    try:
         response = client.chat.completions.create(
             model=os.getenv("DEPLOYMENT"),
-            messages=[
-                {"role": "system", "content": "Only output one line in this format: Classification: Group X. Do not explain. Do not add extra lines."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=classification_messages(room_name),
             temperature=0
         )
 
-        content = response.choices[0].message.content
-        match = re.search(r"Classification:\s*(Group\s+[A-Z]+(?:-\d)?)", content)
-        if match:
-            return match.group(1)
+        classification = parse_classification(response.choices[0].message.content)
+        if classification:
+            return classification
 
     except Exception as e:
         print(f"[Error] GPT classification failed for '{room_name}': {e}")
@@ -273,34 +314,45 @@ def extract_classification_sections_with_gpt(room_name: str) -> str:
     return None
 
 # === Caching Layer ===
-def get_classification_with_cache(room_name: str, cache_path="cached_data/classification_index.json") -> str:
-    room_name = room_name.upper().strip()
-    index = {}
-
-    # 🔁 Load cache if it exists
-    if os.path.exists(cache_path):
-        with open(cache_path, "r") as f:
-            try:
-                index = json.load(f)
-            except json.JSONDecodeError:
-                print("[WARNING] Cache file corrupted. Starting fresh.")
-                index = {}
-
-    # ✅ Return cached value if available
-    if room_name in index and "classification" in index[room_name]:
-        print(f"[CACHE HIT] {room_name}: {index[room_name]['classification']}")
-        return index[room_name]["classification"]
-
-    # ❗Fallback to GPT if not cached
-    print(f"[GPT QUERY] Classification not cached for: {room_name}")
-    classification = extract_classification_sections_with_gpt(room_name)
-
-    if classification:
-        index.setdefault(room_name, {})["classification"] = classification
-        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-        with open(cache_path, "w") as f:
-            json.dump(index, f, indent=2)
-    else:
-        print(f"[WARNING] GPT returned no classification for: {room_name}")
+def get_classification_with_cache(room_name: str, cache=None) -> str:
+    return get_classifications_with_cache([room_name], cache)[room_name]
+
+
+def get_classifications_with_cache(room_names: list[str], cache=None) -> dict:
+    """
+    {room name: classification or None}, answered from the room cache (room_cache.py) where possible.
+    Cache misses are prompted concurrently through llm_async (LLM_ENGINE=sync: one call each).
+    """
+    cache = cache or get_room_cache()
+    keys = {name: normalize_key(name) for name in room_names}
+    cached = cache.get_many("classification", keys.values(), selected_pdf)
+    missing = [key for key in dict.fromkeys(keys.values()) if key not in cached]
+    print(f"[CACHE] {len(set(keys.values())) - len(missing)} of {len(set(keys.values()))} room name(s) classified from cache")
+
+    if missing:
+        print(f"[GPT QUERY] Classification not cached for {len(missing)} room name(s)")
+
+        def one_by_one(keys):
+            prompts = {}
+            for key in keys:
+                try:
+                    prompts[key] = classification_messages(key)
+                except Exception as e:
+                    print(f"[Error] GPT classification failed for '{key}': {e}")
+            contents = run_chat_batch(list(prompts.values()))
+            return {key: parse_classification(content) for key, content in zip(prompts, contents)}
+
+        if LLM_ENGINE == "sync":
+            found = {key: extract_classification_sections_with_gpt(key) for key in missing}
+        elif LLM_BATCH_ROOMS > 1:
+            found = run_batched(missing, classification_batch_messages, validate_classification, one_by_one)
+        else:
+            found = one_by_one(missing)
+
+        for key in missing:
+            if not found.get(key):
+                print(f"[WARNING] GPT returned no classification for: {key}")
+        cache.put_many("classification", found, selected_pdf)
+        cached.update((key, value) for key, value in found.items() if value)
 
-    return classification
+    return {name: cached.get(key) for name, key in keys.items()}
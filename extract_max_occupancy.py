@@ -4,8 +4,9 @@ import json
 import sys
 import pandas as pd
 from openai import AzureOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from vectorstore_registry import get_vectorstore
+from llm_async import LLM_ENGINE, run_chat_batch
+from room_cache import get_room_cache, normalize_key
 
 # 🔐 Initialize OpenAI + LangChain
 # client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -13,20 +14,7 @@ client = AzureOpenAI(api_key=os.getenv("AZURE_API_KEY"),
                      api_version=os.getenv("API_VERSION"),
                      azure_endpoint=os.getenv("AZURE_ENDPOINT"))
 
-# embedding = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-selected_pdf = os.environ.get("SELECTED_CODE_PDF")
-if not selected_pdf:
-    raise ValueError("Environment variable SELECTED_CODE_PDF is not set.")
-
-# New structured path for vectorstore
-vectorstore = FAISS.load_local(
-    folder_path=f"vector_db/{selected_pdf}",
-    embeddings=embedding,
-    index_name=selected_pdf,
-    allow_dangerous_deserialization=True
-)
+# Embeddings and the SELECTED_CODE_PDF vectorstore come from vectorstore_registry (loaded once per process)
 
 
 def extract_max_occupancy_table_from_text(md_path: str) -> pd.DataFrame:
@@ -75,40 +63,51 @@ def extract_max_occupancy_table_from_text(md_path: str) -> pd.DataFrame:
 
     return pd.DataFrame(rows)
 
-def get_gpt_max_occupancy_for_classification(group_name: str) -> int | None:
-    try:
-        retriever = vectorstore.as_retriever()
-        docs = retriever.get_relevant_documents(f"maximum occupant load for {group_name}")
+def max_occupancy_messages(group_name: str) -> list | None:
+    """Chat messages of the max occupancy prompt, or None if no code sections were retrieved."""
+    retriever = get_vectorstore().as_retriever()
+    docs = retriever.get_relevant_documents(f"maximum occupant load for {group_name}")
 
-        if not docs:
-            print(f"❌ No relevant documents found for: {group_name}", file=sys.stderr)
-            return None
+    if not docs:
+        print(f"❌ No relevant documents found for: {group_name}", file=sys.stderr)
+        return None
 
-        context = "\n".join(doc.page_content for doc in docs)
+    context = "\n".join(doc.page_content for doc in docs)
 
-        prompt = f"""
+    prompt = f"""
 You are a building code expert. Given the following context and the classification group "{group_name}", return only the maximum occupant load allowed for this group. Only return a number. Example: 49
 
 Context:
 {context}
 """
 
+    return [
+        {"role": "system", "content": "You return code values extracted from context."},
+        {"role": "user", "content": prompt.strip()}
+    ]
+
+
+def parse_max_occupancy(content: str) -> int | None:
+    content = (content or "").strip()
+    match = re.search(r"\d+", content)
+    if match:
+        return int(match.group(0))
+    print(f"❌ No number found in GPT response: {content}", file=sys.stderr)
+    return None
+
+
+def get_gpt_max_occupancy_for_classification(group_name: str) -> int | None:
+    try:
+        messages = max_occupancy_messages(group_name)
+        if messages is None:
+            return None
+
         response = client.chat.completions.create(
             model=os.getenv("DEPLOYMENT"),
-            messages=[
-                {"role": "system", "content": "You return code values extracted from context."},
-                {"role": "user", "content": prompt.strip()}
-            ],
+            messages=messages,
             temperature=0
         )
-
-        content = response.choices[0].message.content.strip()
-        match = re.search(r"\d+", content)
-        if match:
-            return int(match.group(0))
-        else:
-            print(f"❌ No number found in GPT response: {content}", file=sys.stderr)
-            return None
+        return parse_max_occupancy(response.choices[0].message.content)
 
     except Exception as e:
         print(f"❌ GPT query failed: {e}", file=sys.stderr)
@@ -162,39 +161,39 @@ def run_max_occupancy_batch(group_names: list[str]) -> dict:
 
 #     return max_occ
 
-def get_max_occupancy_with_cache(classification: str, cache_path="cached_data/classification_index.json") -> int | None:
-    classification = classification.upper().strip()
-
-    if os.path.exists(cache_path):
-        with open(cache_path, "r") as f:
-            try:
-                index = json.load(f)
-            except json.JSONDecodeError:
-                print("[WARNING] Cache file corrupted. Starting fresh.", file=sys.stderr)
-                index = {}
-    else:
-        index = {}
-
-    # Look inside room-based entries for a match
-    for room_name, data in index.items():
-        if data.get("classification", "").strip().lower() == classification.strip().lower():
-            if "max_occupancy" in data:
-                print(f"[CACHE HIT] Max occupancy for {classification} via {room_name}: {data['max_occupancy']}", file=sys.stderr)
-                return data["max_occupancy"]
-
-    # Else fallback to GPT
-    print(f"[GPT QUERY] Max occupancy not cached for: {classification}", file=sys.stderr)
-    max_occ = get_gpt_max_occupancy_for_classification(classification)
-
-    if max_occ:
-        # Inject max occupancy into all rooms that match this classification
-        for room_name, data in index.items():
-            if data.get("classification", "").upper().strip() == classification:
-                data["max_occupancy"] = max_occ
-
-        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-        with open(cache_path, "w") as f:
-            json.dump(index, f, indent=2)
-
-    return max_occ
+def get_max_occupancy_with_cache(classification: str, cache=None) -> int | None:
+    return get_max_occupancies_with_cache([classification], cache)[classification]
+
 
+def get_max_occupancies_with_cache(classifications: list[str], cache=None) -> dict:
+    """
+    {classification: max occupancy or None}, answered from the room cache (room_cache.py) where possible.
+    Cache misses are prompted concurrently through llm_async (LLM_ENGINE=sync: one call each).
+    """
+    cache = cache or get_room_cache()
+    keys = {group: normalize_key(group) for group in classifications}
+    cached = cache.get_many("max_occupancy", keys.values())
+    missing = [key for key in dict.fromkeys(keys.values()) if key not in cached]
+
+    if missing:
+        print(f"[GPT QUERY] Max occupancy not cached for {len(missing)} classification(s)", file=sys.stderr)
+        if LLM_ENGINE == "sync":
+            found = {key: get_gpt_max_occupancy_for_classification(key) for key in missing}
+        else:
+            prompts = {}
+            for key in missing:
+                try:
+                    messages = max_occupancy_messages(key)
+                except Exception as e:
+                    print(f"❌ GPT query failed: {e}", file=sys.stderr)
+                    continue
+                if messages is not None:
+                    prompts[key] = messages
+            contents = run_chat_batch(list(prompts.values()))
+            found = {key: parse_max_occupancy(content) for key, content in zip(prompts, contents)}
+
+        found = {key: value for key, value in found.items() if value}
+        cache.put_many("max_occupancy", found)
+        cached.update(found)
+
+    return {group: cached.get(key) for group, key in keys.items()}
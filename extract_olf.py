@@ -145,8 +145,10 @@ import os
 import sys
 import json
 from openai import AzureOpenAI
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
+from vectorstore_registry import get_vectorstore
+from llm_async import LLM_ENGINE, run_chat_batch
+from room_cache import get_room_cache, normalize_key
+from llm_batch import LLM_BATCH_ROOMS, run_batched, union_context
 
 client = AzureOpenAI(
     api_key=os.getenv("AZURE_API_KEY"),
@@ -163,61 +165,27 @@ def retrieve_olf_context_from_faiss(room_name: str) -> str:
             [SELECTED_CODE_PDF_WITHOUT_EXT].faiss
             [SELECTED_CODE_PDF_WITHOUT_EXT].pkl
 
-    The only required environment variable is SELECTED_CODE_PDF.
+    The only required environment variable is SELECTED_CODE_PDF. The index is loaded once
+    per process by vectorstore_registry.
     """
-    import os
-    from langchain.vectorstores import FAISS
-    from langchain.embeddings import HuggingFaceEmbeddings
-
-    # Base folder is fixed
-    base_dir = "vector_db"
-
-    # Use SELECTED_CODE_PDF environment variable
-    selected_code_pdf = os.environ.get("SELECTED_CODE_PDF")
-    if not selected_code_pdf:
-        raise RuntimeError(
-            "Environment variable SELECTED_CODE_PDF must be set (e.g., SBC_Code_201.pdf)"
-        )
-
-    index_name = os.path.splitext(os.path.basename(selected_code_pdf))[0]
-    index_path = os.path.join(base_dir, index_name)
-
-    if not os.path.isdir(index_path):
-        raise FileNotFoundError(
-            f"Expected FAISS index folder not found: {index_path}"
-        )
-
-    print(f"[DEBUG] Loading FAISS index from {index_path} (index_name={index_name})")
+    docs = get_vectorstore().similarity_search(olf_query(room_name), k=5)
+    return "\n\n".join([doc.page_content for doc in docs])
 
-    db = FAISS.load_local(
-        index_path,
-        embeddings=HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2"),
-        index_name=index_name,
-        allow_dangerous_deserialization=True,
-    )
 
-    query = (
+def olf_query(room_name: str) -> str:
+    return (
         f"Occupant Load Factor table or maximum floor area per occupant "
         f"for a room type similar to {room_name}"
     )
-    docs = db.similarity_search(query, k=5)
-    return "\n\n".join([doc.page_content for doc in docs])
 
 
 
-def get_gpt_olf_for_room(room_name: str, classification: str = "") -> tuple[float, str] | tuple[None, None]:
-    """
-    Use FAISS-retrieved OLF context instead of reading markdown.
-    """
-    try:
-        context = retrieve_olf_context_from_faiss(room_name)
-    except Exception as e:
-        print(f"[ERROR] Failed to retrieve context from FAISS: {e}")
-        return None, None
-
+def olf_messages(room_name: str) -> list | None:
+    """Chat messages of the OLF prompt, or None if FAISS returned no OLF context."""
+    context = retrieve_olf_context_from_faiss(room_name)
     if not context:
         print(f"[WARNING] No OLF context retrieved from FAISS for: {room_name}")
-        return None, None
+        return None
 
     prompt = f"""
 You are an expert in building codes.
@@ -234,61 +202,127 @@ OLF: 9 gross
 OLF: 11 net
 """
 
+    return [
+        {"role": "system", "content": "You match room types with Occupant Load Factors using the provided building code context."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def olf_batch_messages(room_names: list[str]) -> list | None:
+    """Chat messages of one OLF prompt for many rooms (answered as a JSON object), or None without context."""
+    db = get_vectorstore()
+    context = "\n\n".join(union_context(room_names, lambda name: db.similarity_search(olf_query(name), k=5)))
+    if not context:
+        print(f"[WARNING] No OLF context retrieved from FAISS for: {', '.join(room_names)}")
+        return None
+
+    prompt = f"""
+You are an expert in building codes.
+Given the room names {json.dumps(room_names)} and the following building code context:
+
+{context}
+
+Identify the most appropriate Occupant Load Factor (OLF) for each room.
+
+Respond strictly with one JSON object mapping every room name, exactly as given, to "<value> <unit>".
+Example:
+{{"OFFICE": "9 gross", "CLASSROOM": "2 net"}}
+"""
+
+    return [
+        {"role": "system", "content": "You match room types with Occupant Load Factors using the provided building code context."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_olf(room_name: str, content: str) -> tuple[float, str] | tuple[None, None]:
+    import re
+    match = re.search(r"OLF:\s*([\d.]+)\s*(\w+)", content or "")
+    if match:
+        olf_value = float(match.group(1))
+        unit = match.group(2)
+        return olf_value, unit
+    print(f"[Error] GPT didn't return a parsable OLF for '{room_name}': {content}", file=sys.stderr)
+    return None, None
+
+
+def validate_olf(room_name: str, value) -> tuple[float, str] | None:
+    """One room's value from a batched JSON answer: "<value> gross|net" → (olf, unit)."""
+    if not isinstance(value, (str, int, float)):
+        return None
+    olf_value, unit = parse_olf(room_name, f"OLF: {value}")
+    if olf_value and unit.lower() in ("gross", "net"):
+        return olf_value, unit.lower()
+    return None
+
+
+def get_gpt_olf_for_room(room_name: str, classification: str = "") -> tuple[float, str] | tuple[None, None]:
+    """
+    Use FAISS-retrieved OLF context instead of reading markdown.
+    """
+    try:
+        messages = olf_messages(room_name)
+    except Exception as e:
+        print(f"[ERROR] Failed to retrieve context from FAISS: {e}")
+        return None, None
+
+    if messages is None:
+        return None, None
+
     try:
         response = client.chat.completions.create(
             model=os.getenv("DEPLOYMENT"),
-            messages=[
-                {"role": "system", "content": "You match room types with Occupant Load Factors using the provided building code context."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0
         )
-        content = response.choices[0].message.content
-        import re
-        match = re.search(r"OLF:\s*([\d.]+)\s*(\w+)", content)
-        if match:
-            olf_value = float(match.group(1))
-            unit = match.group(2)
-            return olf_value, unit
-        else:
-            print(f"[Error] GPT didn't return a parsable OLF for '{room_name}': {content}", file=sys.stderr)
-            return None, None
+        return parse_olf(room_name, response.choices[0].message.content)
     except Exception as e:
         print(f"[ERROR] GPT API call failed for '{room_name}': {e}")
         return None, None
 
 
-def get_olf_with_cache(room_name: str, classification: str, cache_path="cached_data/classification_index.json") -> tuple:
+def get_olf_with_cache(room_name: str, classification: str = "", cache=None) -> tuple:
+    return get_olfs_with_cache([room_name], cache)[room_name]
+
+
+def get_olfs_with_cache(room_names: list[str], cache=None) -> dict:
     """
-    Same as before, but now uses FAISS instead of markdown.
+    {room name: (olf, unit) or (None, None)}, answered from the room cache (room_cache.py) where possible.
+    Cache misses are prompted concurrently through llm_async (LLM_ENGINE=sync: one call each).
     """
-    room_name = room_name.upper().strip()
-
-    if os.path.exists(cache_path):
-        with open(cache_path, "r") as f:
-            try:
-                index = json.load(f)
-            except json.JSONDecodeError:
-                print("[WARNING] OLF cache corrupted. Starting fresh.")
-                index = {}
-    else:
-        index = {}
-
-    # Return cached value
-    if room_name in index and "olf" in index[room_name]:
-        print(f"[CACHE HIT] OLF for {room_name}: {index[room_name]['olf']}")
-        return tuple(index[room_name]["olf"])
-
-    # Otherwise query GPT
-    print(f"[GPT QUERY] OLF not cached for: {room_name}")
-    olf_value, unit = get_gpt_olf_for_room(room_name, classification)
-
-    if olf_value:
-        index.setdefault(room_name, {})["olf"] = [olf_value, unit]
-        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-        with open(cache_path, "w") as f:
-            json.dump(index, f, indent=2)
-    else:
-        print(f"[WARNING] GPT returned no OLF for: {room_name}")
-
-    return olf_value, unit
+    cache = cache or get_room_cache()
+    keys = {name: normalize_key(name) for name in room_names}
+    cached = cache.get_many("olf", keys.values())
+    missing = [key for key in dict.fromkeys(keys.values()) if key not in cached]
+
+    if missing:
+        print(f"[GPT QUERY] OLF not cached for {len(missing)} room name(s)")
+
+        def one_by_one(keys):
+            prompts = {}
+            for key in keys:
+                try:
+                    messages = olf_messages(key)
+                except Exception as e:
+                    print(f"[ERROR] Failed to retrieve context from FAISS: {e}")
+                    continue
+                if messages is not None:
+                    prompts[key] = messages
+            contents = run_chat_batch(list(prompts.values()))
+            return {key: parse_olf(key, content) for key, content in zip(prompts, contents)}
+
+        if LLM_ENGINE == "sync":
+            found = {key: get_gpt_olf_for_room(key) for key in missing}
+        elif LLM_BATCH_ROOMS > 1:
+            found = run_batched(missing, olf_batch_messages, validate_olf, one_by_one)
+        else:
+            found = one_by_one(missing)
+
+        found = {key: [value[0], value[1]] for key, value in found.items() if value and value[0]}
+        for key in missing:
+            if key not in found:
+                print(f"[WARNING] GPT returned no OLF for: {key}")
+        cache.put_many("olf", found)
+        cached.update(found)
+
+    return {name: tuple(cached[key]) if key in cached else (None, None) for name, key in keys.items()}
@@ -0,0 +1,513 @@
+import base64
+import glob
+import hashlib
+import json
+import os
+import pickle
+import struct
+import zipfile
+import numpy as np
+import networkx as nx
+
+# Node keys are (x, y, z) tuples rounded to 4 decimals, so a 0.1 mm fixed-point lattice
+# stores them exactly in int32 (±214 km range).
+COORD_SCALE = 10000
+
+# Node attributes that get their own integer-coded column
+CODED_ATTRS = ("room_id", "room_name", "type")
+
+# Columnar on-disk format: graphs/G_<level>.npz (uncompressed, so every array can be memory-mapped)
+GRAPH_EXT = ".npz"
+NPZ_FORMAT_VERSION = 2
+
+# Sidecar index of the graphs in a directory: level → summary (see floor_summary)
+MANIFEST_NAME = "manifest.json"
+
+
+class FloorGraph:
+    """
+    Compact array-backed floor graph.
+
+    - qcoords: (n, 3) int32 node coordinates in units of 1 / COORD_SCALE m
+    - indptr / indices / weights: CSR adjacency (both directions stored), float64 weights
+    - codes[attr]: int32 code per node into tables[attr] (-1 = attribute not set)
+    - node_attrs: sparse {node_index: {...}} for every other node attribute (doors, stairs, exits)
+    - graph: the graph-level attribute dict (G.graph), without the room index
+    - room_order / room_offsets: node indices grouped by room_id code; room c owns
+      room_order[room_offsets[c]:room_offsets[c + 1]]
+    - door_nodes: indices of the nodes typed "door"
+    - has_room_index: whether to_networkx() puts the room index back into G.graph
+    """
+
+    def __init__(self, qcoords, indptr, indices, weights, codes, tables, node_attrs=None, graph=None,
+                 room_order=None, room_offsets=None, door_nodes=None, has_room_index=None):
+        self.qcoords = qcoords
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.codes = codes
+        self.tables = tables
+        self.node_attrs = node_attrs or {}
+        graph = graph or {}
+        self.has_room_index = "room_index" in graph if has_room_index is None else has_room_index
+        self.graph = {k: v for k, v in graph.items() if k != "room_index"}
+        if room_order is None or room_offsets is None or door_nodes is None:
+            room_order, room_offsets, door_nodes = self._room_arrays()
+        self.room_order = room_order
+        self.room_offsets = room_offsets
+        self.door_nodes = door_nodes
+
+    def __setstate__(self, state):
+        # FloorGraph pickles from before the room arrays kept the index in graph
+        self.__dict__.update(state)
+        if not hasattr(self, "has_room_index"):
+            self.has_room_index = "room_index" in self.graph
+        self.graph = {k: v for k, v in self.graph.items() if k != "room_index"}
+        if not hasattr(self, "room_order"):
+            self.room_order, self.room_offsets, self.door_nodes = self._room_arrays()
+
+    def _room_arrays(self):
+        room_codes = np.asarray(self.codes["room_id"])
+        order = np.argsort(room_codes, kind="stable")
+        order = order[np.count_nonzero(room_codes < 0):].astype(np.int32)
+        offsets = np.zeros(len(self.tables["room_id"]) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(room_codes[room_codes >= 0], minlength=len(self.tables["room_id"])), out=offsets[1:])
+
+        types = self.tables["type"]
+        if "door" in types:
+            door_nodes = np.flatnonzero(np.asarray(self.codes["type"]) == types.index("door")).astype(np.int32)
+        else:
+            door_nodes = np.empty(0, dtype=np.int32)
+        return order, offsets, door_nodes
+
+    def room_index(self):
+        """The room index dict of build_room_index, read from the room and door arrays."""
+        coords = self.coords
+        room_order = np.asarray(self.room_order)
+        room_offsets = np.asarray(self.room_offsets)
+        room_nodes = {}
+        for code, room_id in enumerate(self.tables["room_id"]):
+            if room_id is not None and room_offsets[code + 1] > room_offsets[code]:
+                room_nodes[room_id] = coords[room_order[room_offsets[code]:room_offsets[code + 1]]]
+
+        room_codes = np.asarray(self.codes["room_id"])
+        room_doors = {}
+        door_rooms = {}
+        for i in np.asarray(self.door_nodes).tolist():
+            key = tuple((self.qcoords[i] / COORD_SCALE).tolist())
+            code = room_codes[i]
+            if code >= 0 and self.tables["room_id"][code] is not None:
+                room_doors.setdefault(self.tables["room_id"][code], []).append(key)
+            door_rooms[key] = list(self.node_attrs.get(i, {}).get("connected_rooms", []))
+
+        return {
+            "node_count": self.number_of_nodes(),
+            "room_nodes": room_nodes,
+            "room_doors": room_doors,
+            "door_rooms": door_rooms,
+        }
+
+    @property
+    def coords(self):
+        return self.qcoords.astype(np.float64) / COORD_SCALE
+
+    def number_of_nodes(self):
+        return len(self.qcoords)
+
+    def number_of_edges(self):
+        n = len(self.qcoords)
+        row = np.repeat(np.arange(n), np.diff(self.indptr))
+        return int(np.count_nonzero(self.indices >= row))
+
+    def node_keys(self):
+        """Return node keys as (x, y, z) tuples, in the original node order."""
+        return [tuple(row) for row in (self.qcoords / COORD_SCALE).tolist()]
+
+    def room_ids(self):
+        """Return the room_id of every node (None where unset)."""
+        table = self.tables["room_id"] + [None]
+        return [table[c] for c in self.codes["room_id"].tolist()]
+
+    @classmethod
+    def from_networkx(cls, G):
+        keys = list(G.nodes)
+        n = len(keys)
+        position = {key: i for i, key in enumerate(keys)}
+
+        qcoords = np.rint(np.asarray(keys, dtype=np.float64).reshape(n, 3) * COORD_SCALE).astype(np.int32)
+
+        # CSR adjacency, keeping each node's neighbour order
+        degrees = np.fromiter((len(G._adj[key]) for key in keys), dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        weights = np.empty(indptr[-1], dtype=np.float64)
+        k = 0
+        for key in keys:
+            for nbr, edge_data in G._adj[key].items():
+                indices[k] = position[nbr]
+                weights[k] = edge_data.get("weight", np.nan)
+                k += 1
+
+        codes = {attr: np.full(n, -1, dtype=np.int32) for attr in CODED_ATTRS}
+        tables = {attr: [] for attr in CODED_ATTRS}
+        lookups = {attr: {} for attr in CODED_ATTRS}
+        node_attrs = {}
+
+        for i, key in enumerate(keys):
+            extra = None
+            for attr, value in G._node[key].items():
+                if attr in lookups:
+                    lookup = lookups[attr]
+                    code = lookup.get(value)
+                    if code is None:
+                        code = lookup[value] = len(tables[attr])
+                        tables[attr].append(value)
+                    codes[attr][i] = code
+                else:
+                    if extra is None:
+                        extra = node_attrs[i] = {}
+                    extra[attr] = value
+
+        return cls(qcoords, indptr, indices, weights, codes, tables, node_attrs, dict(G.graph))
+
+    def to_networkx(self):
+        """Rebuild the networkx graph (same node order, neighbour order and attributes)."""
+        G = nx.Graph()
+        G.graph.update(self.graph)
+        if self.has_room_index:
+            G.graph["room_index"] = self.room_index()
+
+        keys = self.node_keys()
+        tables = {attr: self.tables[attr] for attr in CODED_ATTRS}
+        codes = {attr: self.codes[attr].tolist() for attr in CODED_ATTRS}
+
+        node_store = G._node
+        adj_store = G._adj
+        for i, key in enumerate(keys):
+            data = {}
+            for attr in CODED_ATTRS:
+                code = codes[attr][i]
+                if code >= 0:
+                    data[attr] = tables[attr][code]
+            if i in self.node_attrs:
+                data.update(self.node_attrs[i])
+            node_store[key] = data
+            adj_store[key] = {}
+
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        weights = self.weights.tolist()
+        for i, key in enumerate(keys):
+            row = adj_store[key]
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                if j >= i:
+                    w = weights[k]
+                    row[keys[j]] = {} if w != w else {"weight": w}
+                else:
+                    # Share the attribute dict created from the other endpoint, like nx does
+                    row[keys[j]] = adj_store[keys[j]][key]
+
+        return G
+
+
+def _encode_value(value):
+    """JSON-safe form of a graph/node attribute value; tuples and non-string-key dicts are tagged."""
+    if value is None or type(value) in (bool, int, float, str):
+        return value
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode_value(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode_value(v) for v in value]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value) and not any(k.startswith("__") for k in value):
+            return {k: _encode_value(v) for k, v in value.items()}
+        return {"__items__": [[_encode_value(k), _encode_value(v)] for k, v in value.items()]}
+    # Anything else (sets, numpy scalars, Speckle objects) stays lossless as a pickle
+    return {"__pickle__": base64.b64encode(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).decode("ascii")}
+
+
+def _decode_value(value):
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    if isinstance(value, dict):
+        if "__tuple__" in value:
+            return tuple(_decode_value(v) for v in value["__tuple__"])
+        if "__items__" in value:
+            return {_decode_value(k): _decode_value(v) for k, v in value["__items__"]}
+        if "__pickle__" in value:
+            return pickle.loads(base64.b64decode(value["__pickle__"]))
+        return {k: _decode_value(v) for k, v in value.items()}
+    return value
+
+
+def _npz_member_arrays(path, mmap=True):
+    """
+    Arrays of an uncompressed .npz, memory-mapped in place: each member's data offset is
+    read from its zip local header and .npy header.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_len, extra_len = struct.unpack("<HH", local_header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                    order="F" if fortran_order else "C"
+                )
+    return arrays
+
+
+def _save_npz(floor, path):
+    meta = {
+        "version": NPZ_FORMAT_VERSION,
+        "tables": {attr: [_encode_value(v) for v in floor.tables[attr]] for attr in CODED_ATTRS},
+        "node_attrs": _encode_value(floor.node_attrs),
+        "graph": _encode_value(floor.graph),
+        "room_index": floor.has_room_index,
+    }
+    arrays = {
+        "qcoords": floor.qcoords,
+        "indptr": floor.indptr,
+        "indices": floor.indices,
+        "weights": floor.weights,
+        "room_order": floor.room_order,
+        "room_offsets": floor.room_offsets,
+        "door_nodes": floor.door_nodes,
+        "meta": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+    }
+    arrays.update({f"codes_{attr}": floor.codes[attr] for attr in CODED_ATTRS})
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _load_npz(path, mmap=True):
+    arrays = _npz_member_arrays(path, mmap=mmap)
+    meta = json.loads(bytes(arrays["meta"]).decode("utf-8"))
+    return FloorGraph(
+        arrays["qcoords"], arrays["indptr"], arrays["indices"], arrays["weights"],
+        codes={attr: arrays[f"codes_{attr}"] for attr in CODED_ATTRS},
+        tables={attr: [_decode_value(v) for v in meta["tables"][attr]] for attr in CODED_ATTRS},
+        node_attrs=_decode_value(meta["node_attrs"]),
+        graph=_decode_value(meta["graph"]),
+        room_order=arrays.get("room_order"),
+        room_offsets=arrays.get("room_offsets"),
+        door_nodes=arrays.get("door_nodes"),
+        has_room_index=meta.get("room_index"),
+    )
+
+
+def save_floor_graph(G, path):
+    """
+    Save a floor graph in its compact FloorGraph form: columnar .npz for *.npz paths, a pickle
+    otherwise. The file is replaced atomically, so readers in other processes never see a
+    half-written graph.
+    """
+    floor = G if isinstance(G, FloorGraph) else FloorGraph.from_networkx(G)
+    if str(path).endswith(".npz"):
+        _save_npz(floor, path)
+        return floor
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(floor, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return floor
+
+
+def load_floor_graph(path, as_networkx=True, mmap=True):
+    """
+    Load a floor graph written by save_floor_graph (or a legacy pickled nx.Graph).
+    Returns an nx.Graph by default, or the FloorGraph itself with as_networkx=False; for .npz
+    files its arrays are then memory-mapped (read-only) unless mmap=False.
+    """
+    if str(path).endswith(".npz"):
+        floor = _load_npz(path, mmap=mmap)
+        return floor.to_networkx() if as_networkx else floor
+
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+
+    if isinstance(data, FloorGraph):
+        return data.to_networkx() if as_networkx else data
+    return data if as_networkx else FloorGraph.from_networkx(data)
+
+
+def build_room_index(G):
+    """
+    Index the rooms of a floor graph in one pass and store it in G.graph["room_index"]:
+    room_nodes (room_id → (k, 3) array of node coords), room_doors (room_id → door nodes)
+    and door_rooms (door node → connected rooms). Rebuild after retyping nodes.
+
+    The index is not written into saved graphs: FloorGraph keeps it as room_order /
+    room_offsets / door_nodes arrays and to_networkx() rebuilds it from them.
+    """
+    room_nodes = {}
+    room_doors = {}
+    door_rooms = {}
+    for node, data in G.nodes(data=True):
+        room_id = data.get("room_id")
+        if room_id is not None:
+            room_nodes.setdefault(room_id, []).append(node)
+        if data.get("type") == "door":
+            if room_id is not None:
+                room_doors.setdefault(room_id, []).append(node)
+            door_rooms[node] = list(data.get("connected_rooms", []))
+
+    index = {
+        "node_count": G.number_of_nodes(),
+        "room_nodes": {
+            room_id: np.asarray(nodes, dtype=np.float64).reshape(len(nodes), 3) for room_id, nodes in room_nodes.items()
+        },
+        "room_doors": room_doors,
+        "door_rooms": door_rooms,
+    }
+    G.graph["room_index"] = index
+    return index
+
+
+def get_room_index(G):
+    """
+    G.graph["room_index"], built on first use or again if nodes were added or removed since.
+    Only the node count is compared: after changing a node's room_id, type or connected_rooms
+    in place, call build_room_index(G).
+    """
+    index = G.graph.get("room_index")
+    if index is None or index.get("node_count") != G.number_of_nodes():
+        index = build_room_index(G)
+    return index
+
+
+def floor_graph_path(level_name, graphs_dir="graphs"):
+    return os.path.join(graphs_dir, f"G_{level_name}{GRAPH_EXT}")
+
+
+def level_name_from_graph_path(path):
+    return os.path.splitext(os.path.basename(path))[0].split("_")[-1]
+
+
+def list_floor_graphs(graphs_dir="graphs"):
+    """Sorted G_<level> graph files; legacy .pkl graphs only for levels without an .npz."""
+    npz = sorted(glob.glob(os.path.join(graphs_dir, f"G_*{GRAPH_EXT}")))
+    levels = {level_name_from_graph_path(p) for p in npz}
+    legacy = [p for p in sorted(glob.glob(os.path.join(graphs_dir, "G_*.pkl"))) if level_name_from_graph_path(p) not in levels]
+    return sorted(npz + legacy)
+
+
+def floor_summary(floor, level_name=None, path=None):
+    """
+    Manifest entry for a saved floor graph, read from the FloorGraph arrays: node/edge counts,
+    a content hash, the 2D bounding box, door/stair/exit node keys and room ids.
+    """
+    h = hashlib.sha256()
+    for arr in (floor.qcoords, floor.indptr, floor.indices, floor.weights, *(floor.codes[a] for a in CODED_ATTRS)):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    h.update(json.dumps([floor.tables[a] for a in CODED_ATTRS], default=str).encode("utf-8"))
+
+    qcoords = np.asarray(floor.qcoords)
+    types = floor.tables["type"]
+
+    def nodes_of_type(node_type):
+        if node_type not in types:
+            return []
+        idx = np.flatnonzero(np.asarray(floor.codes["type"]) == types.index(node_type))
+        return (qcoords[idx] / COORD_SCALE).tolist()
+
+    bbox = None
+    if len(qcoords):
+        lo, hi = qcoords[:, :2].min(axis=0) / COORD_SCALE, qcoords[:, :2].max(axis=0) / COORD_SCALE
+        bbox = [lo[0], lo[1], hi[0], hi[1]]
+
+    return {
+        "level_name": level_name or floor.graph.get("level_name"),
+        "file": os.path.basename(path) if path else None,
+        "nodes": floor.number_of_nodes(),
+        "edges": floor.number_of_edges(),
+        "content_hash": h.hexdigest(),
+        "bbox": bbox,
+        "door_nodes": nodes_of_type("door"),
+        "stair_nodes": nodes_of_type("stair"),
+        "exit_nodes": [list(node) for node in floor.graph.get("exit_nodes") or []],
+        "room_ids": sorted(str(r) for r in floor.tables["room_id"] if r and not str(r).startswith("door_")),
+    }
+
+
+def load_manifest(graphs_dir="graphs"):
+    try:
+        with open(os.path.join(graphs_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def update_manifest(graphs_dir, level_name, summary):
+    """Set (or with summary=None, drop) one level's manifest entry. Call from a single process."""
+    manifest = load_manifest(graphs_dir)
+    if summary is None:
+        manifest.pop(level_name, None)
+    else:
+        manifest[level_name] = summary
+
+    os.makedirs(graphs_dir, exist_ok=True)
+    path = os.path.join(graphs_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def find_floor_level(G, graphs_dir="graphs"):
+    """
+    Level name of graph G. O(1) from G.graph["level_name"]; for older graphs, the manifest
+    entries with the same node count and bounding box (plus any graph file the manifest doesn't
+    list) are the only candidates loaded and compared.
+    """
+    if G.graph.get("level_name"):
+        return G.graph["level_name"]
+
+    manifest = load_manifest(graphs_dir)
+    if manifest:
+        bbox = None
+        if G.number_of_nodes():
+            xs = [n[0] for n in G.nodes]
+            ys = [n[1] for n in G.nodes]
+            bbox = [min(xs), min(ys), max(xs), max(ys)]
+        candidates = [
+            os.path.join(graphs_dir, entry["file"]) for entry in manifest.values()
+            if entry.get("file") and entry.get("nodes") == G.number_of_nodes() and entry.get("bbox") == bbox
+        ]
+        # Graphs written before the manifest existed
+        listed = {entry.get("file") for entry in manifest.values()}
+        candidates += [p for p in list_floor_graphs(graphs_dir) if os.path.basename(p) not in listed]
+    else:
+        candidates = list_floor_graphs(graphs_dir)
+
+    for path in candidates:
+        try:
+            candidate = load_floor_graph(path, as_networkx=False)
+        except Exception:
+            continue
+        if candidate.number_of_nodes() == G.number_of_nodes() and set(candidate.node_keys()) == set(G.nodes):
+            return candidate.graph.get("level_name") or level_name_from_graph_path(path)
+    return None
@@ -6,6 +6,7 @@ from matplotlib.path import Path
 from collections import defaultdict
 from rtree import index
 from tqdm import tqdm
+from spatial_index import NodeIndex, get_node_index
 
 def group_rooms_by_level(rooms, level_alias_map=None):
 
@@ -241,6 +242,30 @@ def compute_global_bounds(rooms, walls, doors):
         "avg_z": sum(all_z) / len(all_z) if all_z else 0.0
     }
 
+
+def compute_level_bounds(rooms, walls, doors, global_bounds, spacing=0.5):
+    """
+    Bounds of one level's own elements, snapped outward onto the lattice of global_bounds, so
+    a level's grid only covers its footprint while its points coincide with the grid every
+    other level would get. avg_z stays the global one, like the grid nodes of every level.
+    Levels without any geometry keep global_bounds.
+    """
+    level = compute_global_bounds(rooms, walls, doors)
+    if not all(math.isfinite(level[k]) for k in ("min_x", "max_x", "min_y", "max_y")):
+        return dict(global_bounds)
+
+    def snap(value, origin, rounding):
+        return origin + rounding(round((value - origin) / spacing, 6)) * spacing
+
+    return {
+        "min_x": max(snap(level["min_x"], global_bounds["min_x"], math.floor), global_bounds["min_x"]),
+        "max_x": snap(level["max_x"], global_bounds["min_x"], math.ceil),
+        "min_y": max(snap(level["min_y"], global_bounds["min_y"], math.floor), global_bounds["min_y"]),
+        "max_y": snap(level["max_y"], global_bounds["min_y"], math.ceil),
+        "avg_z": global_bounds["avg_z"],
+    }
+
+
 def generate_gridlines_per_room(rooms, walls, doors=None, spacing=3.0, gap_offset=0.5, level_name=None):
 
     def to_m(val): return val / 1000.0
@@ -347,9 +372,102 @@ def generate_gridlines_per_room(rooms, walls, doors=None, spacing=3.0, gap_offse
 
     return all_trimmed_lines, avg_level_z, combined_grid_dict
 
+def room_outline_polygons(rooms):
+    """(room_id, Path) for every room with an outline of at least 3 points, in meters."""
+
+    def to_meters(val):
+        return val / 1000.0 if abs(val) > 100 else val
+
+    room_polygons = []
+    for room in rooms:
+        outline = getattr(room, "outline", None)
+        if outline and hasattr(outline, "segments"):
+            points = [(to_meters(seg.start.x), to_meters(seg.start.y)) for seg in outline.segments]
+            if len(points) >= 3:
+                poly = Path(points)
+                room_id = getattr(room, "id", None) or getattr(room, "elementId", None)
+                room_polygons.append((room_id, poly))
+    return room_polygons
+
+
+def room_lattice_points(x_vals, y_vals, poly):
+    """(ix, iy) lattice indices of the grid points inside poly, testing only its bounding box."""
+    verts = poly.vertices
+    ix0 = np.searchsorted(x_vals, verts[:, 0].min(), side="left")
+    ix1 = np.searchsorted(x_vals, verts[:, 0].max(), side="right")
+    iy0 = np.searchsorted(y_vals, verts[:, 1].min(), side="left")
+    iy1 = np.searchsorted(y_vals, verts[:, 1].max(), side="right")
+    if ix0 >= ix1 or iy0 >= iy1:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    xx, yy = np.meshgrid(x_vals[ix0:ix1], y_vals[iy0:iy1])
+    inside = poly.contains_points(np.column_stack([xx.ravel(), yy.ravel()])).reshape(xx.shape)
+    iy, ix = np.nonzero(inside)
+    return ix.astype(np.int64) + ix0, iy.astype(np.int64) + iy0
+
+
+def build_room_label_raster(x_vals, y_vals, room_polygons):
+    """
+    Rasterize room polygons onto the grid lattice.
+    Returns an int32 array of shape (len(y_vals), len(x_vals)) holding the index of the
+    first room (in room_polygons order) that contains each grid point, or -1 outside all rooms.
+    Each room only tests the grid points inside its own bounding box.
+    """
+    labels = np.full((len(y_vals), len(x_vals)), -1, dtype=np.int32)
+
+    for k, (_, poly) in enumerate(room_polygons):
+        ix, iy = room_lattice_points(x_vals, y_vals, poly)
+
+        # First room wins, same as the per-point loop
+        free = labels[iy, ix] < 0
+        labels[iy[free], ix[free]] = k
+
+    return labels
+
+
+def same_room_labels(room_ids):
+    """
+    Label lookup that maps each room polygon to the first polygon with the same room id (-1, the
+    last entry, stays -1), so a room outlined by several polygons compares as one room.
+    """
+    first = {}
+    return np.array([first.setdefault(rid, k) for k, rid in enumerate(room_ids)] + [-1], dtype=np.int32)
+
+
+def build_room_label_lists(x_vals, y_vals, room_polygons):
+    """
+    Sparse counterpart of build_room_label_raster for per-room sub-grids: returns the sorted
+    row-major lattice keys (iy * len(x_vals) + ix) of the in-room grid points and the index of
+    the first room containing each one, without allocating the level-sized raster.
+    """
+    keys, key_rooms = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int32)]
+    for k, (_, poly) in enumerate(room_polygons):
+        ix, iy = room_lattice_points(x_vals, y_vals, poly)
+        keys.append(iy * len(x_vals) + ix)
+        key_rooms.append(np.full(len(ix), k, dtype=np.int32))
+
+    keys, first = np.unique(np.concatenate(keys), return_index=True)  # first occurrence = first room
+    return keys, np.concatenate(key_rooms)[first]
+
+
 def generate_extended_gridlines_per_floor(
-    rooms, walls, doors=None, spacing=1.0, max_points=15000, level_name=None, global_bounds=None
+    rooms, walls, doors=None, spacing=1.0, max_points=15000, level_name=None, global_bounds=None,
+    tagging="per_point", return_raster=False
 ):
+    """
+    Build the floor grid over global_bounds, keep only points inside rooms and connect
+    4-neighbours that belong to the same room.
+
+    tagging="per_point" tests every grid Point against every room polygon.
+    tagging="vectorized" builds the grid as coordinate arrays, tags it with one
+    Path.contains_points call per room (limited to the room bbox) and derives grid_dict
+    and edges from the resulting room label raster.
+    tagging="sparse" gives the same result from per-room sub-grids on the same lattice,
+    so memory scales with the room area instead of the bounds (for sprawling levels).
+
+    With return_raster=True a fourth value is returned: a dict with the lattice
+    (x_vals, y_vals, spacing, z), the room label raster and the room_ids it indexes into.
+    """
 
     def to_meters(val):
         return val / 1000.0 if abs(val) > 100 else val
@@ -359,6 +477,11 @@ def generate_extended_gridlines_per_floor(
     if not global_bounds:
         raise ValueError("Global bounds required for grid generation")
 
+    if tagging not in ("per_point", "vectorized", "sparse"):
+        raise ValueError(f"Unsupported tagging mode: {tagging}")
+    if return_raster and tagging != "vectorized":
+        raise ValueError("return_raster requires tagging='vectorized'")
+
     min_x = global_bounds["min_x"]
     max_x = global_bounds["max_x"]
     min_y = global_bounds["min_y"]
@@ -370,23 +493,96 @@ def generate_extended_gridlines_per_floor(
 
     print(f"🧱 Grid dimensions: {len(x_vals)} cols × {len(y_vals)} rows = {len(x_vals) * len(y_vals)} points")
 
+    # Precompute room polygons
+    room_polygons = room_outline_polygons(rooms)
+
+    if tagging in ("vectorized", "sparse"):
+        # Tag on the same rounded coordinates the Points carry
+        x_round = np.round(x_vals, 4)
+        y_round = np.round(y_vals, 4)
+        room_ids = [rid for rid, _ in room_polygons]
+        connectable = np.append(np.array([bool(rid) for rid in room_ids], dtype=bool), False)
+        room_codes = same_room_labels(room_ids)  # neighbours link by room id, not by polygon
+        n_cols = len(x_round)
+
+        if tagging == "vectorized":
+            labels = build_room_label_raster(x_round, y_round, room_polygons)
+            iy_idx, ix_idx = np.nonzero(labels >= 0)
+
+            # Same-room neighbours to the right (dir 0) and above (dir 1); rooms without an id stay unconnected
+            linkable = connectable[labels]
+            codes = room_codes[labels]
+            right = linkable[:, :-1] & (codes[:, :-1] == codes[:, 1:])
+            up = linkable[:-1, :] & (codes[:-1, :] == codes[1:, :])
+            ry, rx = np.nonzero(right)
+            uy, ux = np.nonzero(up)
+        else:
+            keys, key_labels = build_room_label_lists(x_round, y_round, room_polygons)
+            iy_idx, ix_idx = np.divmod(keys, n_cols)
+
+            def linked_neighbours(step, valid):
+                pos = np.searchsorted(keys, keys + step)
+                found = valid & (pos < len(keys))
+                found[found] = (keys[pos[found]] == keys[found] + step) & (room_codes[key_labels[pos[found]]] == room_codes[key_labels[found]])
+                return found & connectable[key_labels]
+
+            right = linked_neighbours(1, ix_idx < n_cols - 1)
+            up = linked_neighbours(n_cols, iy_idx < len(y_round) - 1)
+            ry, rx = iy_idx[right], ix_idx[right]
+            uy, ux = iy_idx[up], ix_idx[up]
+
+        xs = x_round[ix_idx].tolist()
+        ys = y_round[iy_idx].tolist()
+        grid_dict = {
+            key: Point(x=x, y=y, z=avg_z, units="m")
+            for key, x, y in zip(zip(ix_idx.tolist(), iy_idx.tolist()), xs, ys)
+        }
+
+        # Emit edges in the same row-major order as the per-point loop
+        src_y = np.concatenate([ry, uy])
+        src_x = np.concatenate([rx, ux])
+        dst_y = np.concatenate([ry, uy + 1])
+        dst_x = np.concatenate([rx + 1, ux])
+        src_keys = src_y.astype(np.int64) * n_cols + src_x
+        order = np.argsort(
+            src_keys * 2 + np.concatenate([np.zeros(len(ry), np.int64), np.ones(len(uy), np.int64)]),
+            kind="stable"
+        )
+        if tagging == "vectorized":
+            edge_rooms = labels[src_y, src_x]
+        else:
+            edge_rooms = key_labels[np.searchsorted(keys, src_keys)]
+
+        edges = [
+            (grid_dict[(sx, sy)], grid_dict[(dx, dy)], room_ids[r])
+            for sx, sy, dx, dy, r in zip(
+                src_x[order].tolist(), src_y[order].tolist(),
+                dst_x[order].tolist(), dst_y[order].tolist(),
+                edge_rooms[order].tolist()
+            )
+        ]
+
+        print(f"🔗 Total grid edges (after trimming): {len(edges)}")
+        print(f"📉 Retained {len(grid_dict)} grid nodes inside rooms")
+
+        if return_raster:
+            raster = {
+                "x_vals": x_round,
+                "y_vals": y_round,
+                "spacing": spacing,
+                "z": avg_z,
+                "labels": labels,
+                "room_ids": room_ids,
+            }
+            return edges, avg_z, grid_dict, raster
+        return edges, avg_z, grid_dict
+
     grid_dict = {}
     for iy, y in enumerate(y_vals):
         for ix, x in enumerate(x_vals):
             pt = Point(x=round(x, 4), y=round(y, 4), z=avg_z, units="m")
             grid_dict[(ix, iy)] = pt
 
-    # Precompute room polygons
-    room_polygons = []
-    for room in rooms:
-        outline = getattr(room, "outline", None)
-        if outline and hasattr(outline, "segments"):
-            points = [(to_meters(seg.start.x), to_meters(seg.start.y)) for seg in outline.segments]
-            if len(points) >= 3:
-                poly = Path(points)
-                room_id = getattr(room, "id", None) or getattr(room, "elementId", None)
-                room_polygons.append((room_id, poly))
-
     # Step 1: tag grid nodes with room_id (inside room only)
     grid_node_room_ids = {}
     for (ix, iy), pt in grid_dict.items():
@@ -427,6 +623,166 @@ def generate_extended_gridlines_per_floor(
 
     return edges, avg_z, grid_dict
 
+
+def refinement_mask(x_vals, y_vals, spacing, walls, doors=None, stairs=None, margin=0.5, door_width=1.2):
+    """
+    Boolean (ny, nx) mask of the lattice points within margin of a wall baseline, a door
+    opening or a stair footprint: the points the quadtree keeps at full grid resolution.
+    """
+    from scipy import ndimage
+
+    def to_m(val):
+        return val / 1000.0 if abs(val) > 100 else val
+
+    ny, nx = len(y_vals), len(x_vals)
+    seeds = np.zeros((ny, nx), dtype=bool)
+
+    def to_index(x, y):
+        ix = np.rint((np.asarray(x) - x_vals[0]) / spacing).astype(int)
+        iy = np.rint((np.asarray(y) - y_vals[0]) / spacing).astype(int)
+        return ix, iy
+
+    def mark_segment(x0, y0, x1, y1):
+        n = max(int(math.ceil(math.hypot(x1 - x0, y1 - y0) / (spacing / 2))), 1)
+        t = np.linspace(0.0, 1.0, n + 1)
+        ix, iy = to_index(x0 + t * (x1 - x0), y0 + t * (y1 - y0))
+        ok = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        seeds[iy[ok], ix[ok]] = True
+
+    for wall in walls or []:
+        line = getattr(wall, "baseLine", None)
+        if hasattr(line, "start") and hasattr(line, "end"):
+            mark_segment(to_m(line.start.x), to_m(line.start.y), to_m(line.end.x), to_m(line.end.y))
+
+    for door in doors or []:
+        m = getattr(door, "transform", None)
+        if not m or not hasattr(m, "matrix") or len(m.matrix) < 16:
+            continue
+        cx, cy = to_m(m.matrix[3]), to_m(m.matrix[7])
+        ux, uy = float(m.matrix[0]), float(m.matrix[4])  # width direction
+        u_len = math.hypot(ux, uy) or 1.0
+        w = door_width / 2
+        mark_segment(cx - ux / u_len * w, cy - uy / u_len * w, cx + ux / u_len * w, cy + uy / u_len * w)
+
+    for stair in stairs or []:
+        meshes = getattr(stair, "displayValue", None) or []
+        verts = getattr(meshes[0], "vertices", None) if isinstance(meshes, list) and meshes else None
+        if not isinstance(verts, list) or len(verts) < 3:
+            continue
+        xs = [to_m(v) for v in verts[0::3]]
+        ys = [to_m(v) for v in verts[1::3]]
+        (ix0, ix1), (iy0, iy1) = to_index([min(xs), max(xs)], [min(ys), max(ys)])
+        seeds[max(iy0, 0):max(iy1 + 1, 0), max(ix0, 0):max(ix1 + 1, 0)] = True
+
+    if not seeds.any():
+        return seeds
+    return ndimage.distance_transform_edt(~seeds) * spacing <= margin
+
+
+def quadtree_leaves(labels, fine, max_level):
+    """
+    Merge lattice points bottom-up into aligned square blocks of 2**k x 2**k points
+    (k <= max_level) that lie in one room and contain no refined point.
+
+    Returns (leaf_id, blocks): a raster of the same shape as labels mapping every in-room
+    point to its leaf (-1 outside rooms), and an (n_leaves, 3) array of (ix0, iy0, size).
+    """
+    ny, nx = labels.shape
+    block = 1 << max_level
+    pad = ((0, -ny % block), (0, -nx % block))
+    padded_labels = np.pad(labels, pad, constant_values=-1)
+
+    # Room label of each mergeable block per level, -2 where the block can't be merged
+    levels = [np.pad(np.where(fine, -2, labels), pad, constant_values=-2)]
+    for _ in range(max_level):
+        prev = levels[-1]
+        children = prev.reshape(prev.shape[0] // 2, 2, prev.shape[1] // 2, 2)
+        first = children[:, 0, :, 0]
+        uniform = (first >= 0) & (children == first[:, None, :, None]).all(axis=(1, 3))
+        levels.append(np.where(uniform, first, -2))
+
+    # Top-down: a block is a leaf if it is mergeable and no coarser leaf covers it
+    leaf_id = np.full(padded_labels.shape, -1, dtype=np.int64)
+    covered = np.zeros(levels[-1].shape, dtype=bool)
+    blocks = []
+    next_id = 0
+    for k in range(max_level, -1, -1):
+        size = 1 << k
+        is_leaf = ~covered & ((levels[k] >= 0) if k else (padded_labels >= 0))
+        by, bx = np.nonzero(is_leaf)
+        ids = np.full(is_leaf.shape, -1, dtype=np.int64)
+        ids[by, bx] = np.arange(next_id, next_id + len(by))
+        next_id += len(by)
+        blocks.append(np.column_stack([bx * size, by * size, np.full(len(by), size)]))
+        up = np.repeat(np.repeat(ids, size, axis=0), size, axis=1)
+        leaf_id = np.where(up >= 0, up, leaf_id)
+        if k:
+            covered = np.repeat(np.repeat(covered | is_leaf, 2, axis=0), 2, axis=1)
+
+    return leaf_id[:ny, :nx], np.concatenate(blocks).astype(np.int64)
+
+
+def generate_quadtree_gridlines_per_floor(
+    rooms, walls, doors=None, stairs=None, spacing=0.5, max_cell=8.0, refine_margin=0.5,
+    level_name=None, global_bounds=None
+):
+    """
+    Adaptive counterpart of generate_extended_gridlines_per_floor: open room interiors are
+    covered by quadtree cells up to max_cell meters wide, while points within refine_margin
+    of walls, doors and stairs keep the full `spacing` resolution.
+
+    Cells become nodes at their centers; cells of the same room that touch on the lattice
+    (edge or corner, so paths across coarse cells don't zigzag) are connected. Returns
+    (edges, avg_z, grid_dict) in the same format, so the output goes through trim_gridlines
+    and create_graph unchanged.
+    """
+    print(f"📐 Generating quadtree grid for level: {level_name or '[unspecified]'}")
+
+    if not global_bounds:
+        raise ValueError("Global bounds required for grid generation")
+
+    min_x, min_y, avg_z = global_bounds["min_x"], global_bounds["min_y"], global_bounds["avg_z"]
+    x_vals = np.arange(min_x, global_bounds["max_x"] + spacing, spacing)
+    y_vals = np.arange(min_y, global_bounds["max_y"] + spacing, spacing)
+    max_level = max(int(math.floor(math.log2(max(max_cell / spacing, 1.0)))), 0)
+
+    room_polygons = room_outline_polygons(rooms)
+    room_ids = [rid for rid, _ in room_polygons]
+    labels = build_room_label_raster(np.round(x_vals, 4), np.round(y_vals, 4), room_polygons)
+    labels = same_room_labels(room_ids)[labels]  # polygons of one room merge and link as one
+    fine = refinement_mask(x_vals, y_vals, spacing, walls, doors, stairs, margin=refine_margin)
+    leaf_id, blocks = quadtree_leaves(labels, fine, max_level)
+
+    # Leaf centers; 1x1 leaves land exactly on the uniform lattice
+    offset = (blocks[:, 2] - 1) / 2
+    xs = np.round(min_x + (blocks[:, 0] + offset) * spacing, 4).tolist()
+    ys = np.round(min_y + (blocks[:, 1] + offset) * spacing, 4).tolist()
+    points = [Point(x=x, y=y, z=avg_z, units="m") for x, y in zip(xs, ys)]
+    grid_dict = {(ix, iy): pt for (ix, iy), pt in zip(blocks[:, :2].tolist(), points)}
+
+    # Adjacent leaves: distinct leaves of the same (identified) room on 8-neighbouring lattice points
+    connectable = np.append(np.array([bool(rid) for rid in room_ids], dtype=bool), False)
+    pairs = []
+    for a, b, la, lb in (
+        (leaf_id[:, :-1], leaf_id[:, 1:], labels[:, :-1], labels[:, 1:]),
+        (leaf_id[:-1, :], leaf_id[1:, :], labels[:-1, :], labels[1:, :]),
+        (leaf_id[:-1, :-1], leaf_id[1:, 1:], labels[:-1, :-1], labels[1:, 1:]),
+        (leaf_id[:-1, 1:], leaf_id[1:, :-1], labels[:-1, 1:], labels[1:, :-1]),
+    ):
+        linked = (a >= 0) & (b >= 0) & (a != b) & (la == lb) & connectable[la]
+        pairs.append(np.column_stack([np.minimum(a, b)[linked], np.maximum(a, b)[linked], la[linked]]))
+    pairs = np.unique(np.concatenate(pairs), axis=0)
+
+    edges = [
+        (points[i], points[j], room_ids[r])
+        for i, j, r in pairs.tolist()
+    ]
+
+    print(f"🌳 Quadtree: {len(points)} cells ({int((blocks[:, 2] > 1).sum())} merged) "
+          f"instead of {int((labels >= 0).sum())} grid points")
+    print(f"🔗 Total grid edges (after trimming): {len(edges)}")
+    return edges, avg_z, grid_dict
+
 def create_graph(walls=None, rooms=None, doors=None, gridlines=None, room_boundaries=None, level_name=None):
     import math
     import networkx as nx
@@ -508,11 +864,174 @@ def create_graph(walls=None, rooms=None, doors=None, gridlines=None, room_bounda
     return G, wall_lines_2d
 
 
-def trim_gridlines(gridlines, wall_lines_2d, doors, grid_dict, spacing=0.5, gap_offset=0.3):
+def segments_cross_polygons(sx, sy, ex, ey, polys):
+    """
+    Vectorized line_intersects_polygon: does segment k cross any edge of polys[k]?
+    Same strict ccw test as the per-line trimmer. polys is (m, n_vertices, 2).
+    """
+    hit = np.zeros(len(sx), dtype=bool)
+    n_vertices = polys.shape[1]
+    for e in range(n_vertices):
+        qx1, qy1 = polys[:, e, 0], polys[:, e, 1]
+        qx2, qy2 = polys[:, (e + 1) % n_vertices, 0], polys[:, (e + 1) % n_vertices, 1]
+        # ccw(a, b, c) = (c.y - a.y) * (b.x - a.x) > (b.y - a.y) * (c.x - a.x)
+        ccw_a = (qy2 - sy) * (qx1 - sx) > (qy1 - sy) * (qx2 - sx)      # ccw(start, q1, q2)
+        ccw_b = (qy2 - ey) * (qx1 - ex) > (qy1 - ey) * (qx2 - ex)      # ccw(end, q1, q2)
+        ccw_c = (qy1 - sy) * (ex - sx) > (ey - sy) * (qx1 - sx)        # ccw(start, end, q1)
+        ccw_d = (qy2 - sy) * (ex - sx) > (ey - sy) * (qx2 - sx)        # ccw(start, end, q2)
+        hit |= (ccw_a != ccw_b) & (ccw_c != ccw_d)
+    return hit
+
+
+def points_in_polygons(px, py, polys):
+    """
+    Vectorized point_inside_polygon: is point k inside polys[k]? Even-odd crossing test,
+    identical to matplotlib Path.contains_point (radius 0), including for the self-crossing
+    vertex order of door polygons.
+    """
+    inside = np.zeros(len(px), dtype=bool)
+    n_vertices = polys.shape[1]
+    for e in range(n_vertices):
+        ax, ay = polys[:, e, 0], polys[:, e, 1]
+        bx, by = polys[:, (e + 1) % n_vertices, 0], polys[:, (e + 1) % n_vertices, 1]
+        above_a = ay >= py
+        above_b = by >= py
+        inside ^= (above_a != above_b) & ((((by - py) * (ax - bx)) >= ((bx - px) * (ay - by))) == above_b)
+    return inside
+
+
+def build_polygon_index(polys):
+    """rtree over the bounding boxes of an (m, n_vertices, 2) polygon array."""
+    mins = polys.min(axis=1)
+    maxs = polys.max(axis=1)
+    if not len(polys):
+        return index.Index()
+    return index.Index((i, (mins[i, 0], mins[i, 1], maxs[i, 0], maxs[i, 1]), None) for i in range(len(polys)))
+
+
+def segments_touch_polygons(seg, polys, poly_index, chunk_size=500_000):
+    """
+    For each segment (rows of x0, y0, x1, y1): does it cross, or have its midpoint inside, any polygon?
+    Candidate pairs come from a bulk rtree query on the segment bounding boxes.
+    """
+    touched = np.zeros(len(seg), dtype=bool)
+    if not len(seg) or not len(polys):
+        return touched
+
+    for lo in range(0, len(seg), chunk_size):
+        chunk = seg[lo:lo + chunk_size]
+        sx, sy, ex, ey = chunk[:, 0], chunk[:, 1], chunk[:, 2], chunk[:, 3]
+        mins = np.ascontiguousarray(np.column_stack([np.minimum(sx, ex), np.minimum(sy, ey)]))
+        maxs = np.ascontiguousarray(np.column_stack([np.maximum(sx, ex), np.maximum(sy, ey)]))
+        poly_ids, counts = poly_index.intersection_v(mins, maxs)
+        if not len(poly_ids):
+            continue
+
+        line_ids = np.repeat(np.arange(len(chunk)), counts.astype(np.int64))
+        poly_ids = poly_ids.astype(np.int64)
+        pair_polys = polys[poly_ids]
+        psx, psy, pex, pey = sx[line_ids], sy[line_ids], ex[line_ids], ey[line_ids]
+        hit = segments_cross_polygons(psx, psy, pex, pey, pair_polys)
+        hit |= points_in_polygons((psx + pex) / 2, (psy + pey) / 2, pair_polys)
+        touched[lo + np.unique(line_ids[hit])] = True
+
+    return touched
+
+
+def trim_keep_mask(seg, wall_polys, door_polys):
+    """
+    Batch trimming kernel. A gridline is kept if it touches a door opening, or touches no
+    buffered wall polygon. seg is an (n, 4) array of x0, y0, x1, y1; polygons are
+    (m, 4, 2) arrays. Returns the boolean keep-mask.
+    """
+    keep = ~segments_touch_polygons(seg, wall_polys, build_polygon_index(wall_polys))
+    blocked = np.flatnonzero(~keep)
+    if len(blocked) and len(door_polys):
+        # Only lines a wall would remove need the door test
+        keep[blocked] = segments_touch_polygons(seg[blocked], door_polys, build_polygon_index(door_polys))
+    return keep
+
+
+def rasterize_polygons(polys, origin, cell_size, shape):
+    """Boolean (ny, nx) mask of the lattice cells whose center lies inside any of the polygons."""
+    mask = np.zeros(shape, dtype=bool)
+    ny, nx = shape
+    for poly in polys:
+        lo = np.floor((poly.min(axis=0) - origin) / cell_size).astype(int)
+        hi = np.ceil((poly.max(axis=0) - origin) / cell_size).astype(int)
+        ix0, iy0 = max(lo[0], 0), max(lo[1], 0)
+        ix1, iy1 = min(hi[0], nx), min(hi[1], ny)
+        if ix0 >= ix1 or iy0 >= iy1:
+            continue
+
+        cx = origin[0] + (np.arange(ix0, ix1) + 0.5) * cell_size
+        cy = origin[1] + (np.arange(iy0, iy1) + 0.5) * cell_size
+        px, py = np.meshgrid(cx, cy)
+        inside = points_in_polygons(px.ravel(), py.ravel(), np.broadcast_to(poly, (px.size,) + poly.shape))
+        mask[iy0:iy1, ix0:ix1] |= inside.reshape(px.shape)
+    return mask
+
+
+def raster_keep_mask(seg, wall_polys, door_polys, spacing=0.5, oversample=4):
+    """
+    Raster trimming kernel. Wall and door polygons are rasterized onto the grid lattice refined
+    oversample times (grid nodes sit on cell centers). Each gridline is sampled at (at least)
+    every sub-cell step including its endpoints, and removed if a sample falls in a wall cell unless another
+    sample falls in a door cell (like the geometric trimmer, a door opening keeps the whole line).
+    Returns the boolean keep-mask.
+    """
+    keep = np.ones(len(seg), dtype=bool)
+    if not len(seg) or not len(wall_polys):
+        return keep
+
+    cell_size = spacing / oversample
+    pts = seg.reshape(-1, 2)
+    origin = pts.min(axis=0) - cell_size / 2
+    shape = tuple((np.ceil((pts.max(axis=0) - origin) / cell_size).astype(int) + 1)[::-1])
+
+    wall_cells = rasterize_polygons(wall_polys, origin, cell_size, shape)
+    # Door polygons come in bowtie vertex order; the opening is the full rectangle
+    door_cells = rasterize_polygons(door_polys[:, [0, 1, 3, 2]], origin, cell_size, shape)
+
+    # Gridlines longer than the grid spacing (quadtree cells) get proportionally more samples
+    longest = np.hypot(seg[:, 2] - seg[:, 0], seg[:, 3] - seg[:, 1]).max()
+    n_samples = max(oversample, int(math.ceil(longest / cell_size)))
+
+    ny, nx = shape
+    in_door = np.zeros(len(seg), dtype=bool)
+    for t in np.linspace(0.0, 1.0, n_samples + 1):
+        sx = seg[:, 0] + t * (seg[:, 2] - seg[:, 0])
+        sy = seg[:, 1] + t * (seg[:, 3] - seg[:, 1])
+        ix = np.clip(np.floor((sx - origin[0]) / cell_size).astype(int), 0, nx - 1)
+        iy = np.clip(np.floor((sy - origin[1]) / cell_size).astype(int), 0, ny - 1)
+        keep &= ~wall_cells[iy, ix]
+        in_door |= door_cells[iy, ix]
+    return keep | in_door
+
+
+def trim_agreement(keep, reference_keep):
+    """How closely a trimming keep-mask agrees with a reference (geometric) one."""
+    n = len(reference_keep)
+    disagree = keep != reference_keep
+    return {
+        "gridlines": n,
+        "agreement": 1.0 - (int(disagree.sum()) / n if n else 0.0),
+        "extra_kept": int((keep & ~reference_keep).sum()),      # kept here, trimmed by the reference
+        "extra_removed": int((~keep & reference_keep).sum()),   # removed here, kept by the reference
+    }
+
+
+def trim_gridlines(gridlines, wall_lines_2d, doors, grid_dict, spacing=0.5, gap_offset=0.3, engine="per_line",
+                   raster_oversample=4, report_agreement=False):
     """
     Trims gridlines that intersect buffered wall polygons,
     skips trimming those crossing door openings,
     and injects missing door-to-door connections.
+
+    engine="per_line" tests gridlines one by one; engine="batch" evaluates all of them at
+    once with trim_keep_mask (same result, for floors with millions of grid edges).
+    engine="raster" uses raster_keep_mask, an approximation on a wall occupancy lattice;
+    with report_agreement=True its agreement with the geometric trimmer is printed.
     """
 
     def make_polygon_around_line(line: Line, offset: float):
@@ -560,22 +1079,14 @@ def trim_gridlines(gridlines, wall_lines_2d, doors, grid_dict, spacing=0.5, gap_
 
         return corners
 
-    def create_door_bridge(door, grid_dict, spacing=0.5, max_projection_factor=2.0):
+    def create_door_bridge(door, node_index, spacing=0.5, max_projection_factor=2.0):
         m = getattr(door, "transform", None)
         if not m or not hasattr(m, "matrix") or len(m.matrix) < 16:
             return None
 
         def to_m(val): return val / 1000.0 if abs(val) > 100 else val
-        def euclidean(p1, p2): return math.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2)
         def find_nearest_node(pt, radius=0.75):
-            best = None
-            best_dist = float("inf")
-            for node in grid_dict.values():
-                dist = euclidean(pt, node)
-                if dist < best_dist and dist < radius:
-                    best = node
-                    best_dist = dist
-            return best
+            return node_index.nearest(pt, max_distance=radius, strict=True)[0]
 
         cx = to_m(m.matrix[3])
         cy = to_m(m.matrix[7])
@@ -613,10 +1124,12 @@ def trim_gridlines(gridlines, wall_lines_2d, doors, grid_dict, spacing=0.5, gap_
 
         if n1 and n2:
             return [(n1, n2, f"door_{door_id}"), (n2, n1, f"door_{door_id}")]
-        elif n1:
-            return [(n1, (c.x, c.y, c.z), f"door_{door_id}")]
-        elif n2:
-            return [(n2, (c.x, c.y, c.z), f"door_{door_id}")]
+
+        # One-sided door: bridge to the door center, which becomes a new grid node
+        node_index.add(c, (c.x, c.y))
+        if n1:
+            return [(n1, c, f"door_{door_id}")]
+        return [(n2, c, f"door_{door_id}")]
 
 
     def line_intersects_polygon(p1, p2, polygon_pts):
@@ -631,56 +1144,88 @@ def trim_gridlines(gridlines, wall_lines_2d, doors, grid_dict, spacing=0.5, gap_
                 return True
         return False
 
-    def point_inside_polygon(p, polygon_pts):
-        poly = Path([(pt.x, pt.y) for pt in polygon_pts])
-        return poly.contains_point((p.x, p.y))
+    def touches_polygon(start, end, mid, polygon_pts, polygon_path):
+        return line_intersects_polygon(start, end, polygon_pts) or polygon_path.contains_point((mid.x, mid.y))
 
-    # --- Build wall polygon index
+    def polygon_bbox(poly):
+        xs = [p.x for p in poly]
+        ys = [p.y for p in poly]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    # --- Build wall polygon index (with precomputed Paths for the midpoint test)
     wall_idx = index.Index()
     wall_data = {}
+    wall_paths = {}
     for i, wall in enumerate(wall_lines_2d):
         poly = make_polygon_around_line(wall, gap_offset)
         if poly:
-            xs = [p.x for p in poly]
-            ys = [p.y for p in poly]
-            wall_idx.insert(i, (min(xs), min(ys), max(xs), max(ys)))
+            wall_idx.insert(i, polygon_bbox(poly))
             wall_data[i] = poly
+            wall_paths[i] = Path([(pt.x, pt.y) for pt in poly])
 
     print(f"📦 Wall index initialized with {len(wall_data)} polygons")
 
-    # --- Door polygons
+    # --- Door polygons, indexed the same way
     door_polygons = []
+    door_idx = index.Index()
+    door_paths = []
     for door in doors:
         poly = create_door_polygon(door)
         if poly:
+            door_idx.insert(len(door_polygons), polygon_bbox(poly))
             door_polygons.append(poly)
+            door_paths.append(Path([(pt.x, pt.y) for pt in poly]))
     print(f"🚪 Door openings prepared: {len(door_polygons)}")
 
     # --- Trim gridlines
     kept = []
-    for line in tqdm(gridlines, desc="📏 Trimming gridlines (door-aware)"):
-        start, end = line[0], line[1]
-        meta = line[2] if len(line) > 2 else None
-        mid = Point(x=(start.x + end.x) / 2, y=(start.y + end.y) / 2, z=start.z)
+    if engine in ("batch", "raster"):
+        seg = np.array([(line[0].x, line[0].y, line[1].x, line[1].y) for line in gridlines], dtype=np.float64).reshape(-1, 4)
+        wall_polys = np.array([[(p.x, p.y) for p in poly] for poly in wall_data.values()], dtype=np.float64).reshape(-1, 4, 2)
+        door_polys = np.array([[(p.x, p.y) for p in poly] for poly in door_polygons], dtype=np.float64).reshape(-1, 4, 2)
 
-        if any(line_intersects_polygon(start, end, poly) or point_inside_polygon(mid, poly) for poly in door_polygons):
-            kept.append((start, end, meta))
-            continue
+        if engine == "batch":
+            keep = trim_keep_mask(seg, wall_polys, door_polys)
+        else:
+            keep = raster_keep_mask(seg, wall_polys, door_polys, spacing=spacing, oversample=raster_oversample)
+            if report_agreement:
+                report = trim_agreement(keep, trim_keep_mask(seg, wall_polys, door_polys))
+                print(f"🧮 Raster vs geometric trimming: {report['agreement']:.2%} agreement | "
+                      f"{report['extra_kept']} extra kept | {report['extra_removed']} extra removed")
+
+        kept = [
+            (line[0], line[1], line[2] if len(line) > 2 else None)
+            for line, k in zip(gridlines, keep.tolist()) if k
+        ]
+        print(f"📏 {engine.capitalize()} trimming kept {len(kept)} of {len(gridlines)} gridlines")
+    elif engine == "per_line":
+        for line in tqdm(gridlines, desc="📏 Trimming gridlines (door-aware)"):
+            start, end = line[0], line[1]
+            meta = line[2] if len(line) > 2 else None
+            mid = Point(x=(start.x + end.x) / 2, y=(start.y + end.y) / 2, z=start.z)
+            bbox = (min(start.x, end.x), min(start.y, end.y), max(start.x, end.x), max(start.y, end.y))
+
+            # A line can only cross or contain its midpoint in a door whose bbox it overlaps
+            if any(touches_polygon(start, end, mid, door_polygons[i], door_paths[i]) for i in door_idx.intersection(bbox)):
+                kept.append((start, end, meta))
+                continue
 
-        bbox = (min(start.x, end.x), min(start.y, end.y), max(start.x, end.x), max(start.y, end.y))
-        intersects_wall = False
-        for i in wall_idx.intersection(bbox):
-            if line_intersects_polygon(start, end, wall_data[i]) or point_inside_polygon(mid, wall_data[i]):
-                intersects_wall = True
-                break
+            intersects_wall = False
+            for i in wall_idx.intersection(bbox):
+                if touches_polygon(start, end, mid, wall_data[i], wall_paths[i]):
+                    intersects_wall = True
+                    break
 
-        if not intersects_wall:
-            kept.append((start, end, meta))
+            if not intersects_wall:
+                kept.append((start, end, meta))
+    else:
+        raise ValueError(f"Unsupported trimming engine: {engine}")
 
     # --- Add bridge edges across door openings
+    node_index = NodeIndex.from_points(grid_dict.values(), dims=2)
     bridge_edges = []
     for door in doors:
-        bridge = create_door_bridge(door, grid_dict, spacing=spacing)
+        bridge = create_door_bridge(door, node_index, spacing=spacing)
         if bridge:
             bridge_edges.extend(bridge)
 
@@ -701,9 +1246,7 @@ def add_doors_on_grid(G, doors):
 
     def closest_node(pt: Point):
         projected = point_to_tuple(pt)
-        if not G.nodes:
-            return None
-        return min(G.nodes, key=lambda n: euclidean_distance_3d(n, projected))
+        return get_node_index(G).nearest(projected)[0]
 
     mapped = 0
     unmapped = []
@@ -782,9 +1325,7 @@ def add_stairs_on_grid(G, stairs):
 
     def closest_node(pt: Point):
         projected = point_to_tuple(pt)
-        if not G.nodes:
-            return None
-        return min(G.nodes, key=lambda n: euclidean_distance_3d(n, projected))
+        return get_node_index(G).nearest(projected)[0]
 
     mapped = 0
     unmapped = []
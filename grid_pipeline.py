@@ -0,0 +1,144 @@
+# grid_pipeline.py
+# Per-level grid → graph pipeline, runnable in a worker process.
+
+import pickle
+
+from specklepy.objects.base import Base
+from specklepy.objects.geometry import Line, Point
+
+# Attributes the grid pipeline reads from each element type; everything else stays in the parent
+LEVEL_ELEMENT_ATTRS = {
+    "rooms": ("id", "elementId", "name", "outline"),
+    "walls": ("id", "elementId", "baseLine"),
+    "doors": ("id", "elementId", "transform"),
+    "stairs": ("id", "elementId", "displayValue"),
+}
+
+
+def _slim(obj, attrs):
+    slim = Base()
+    for attr in attrs:
+        value = getattr(obj, attr, None)
+        if value is None:
+            continue
+        if attr == "displayValue" and isinstance(value, list):
+            value = value[:1]  # Only the first mesh is used for the stair centroid
+        slim[attr] = value
+    return slim
+
+
+def pack_level(level_name, rooms, walls, doors, stairs):
+    """Serialize one level's elements, stripped to what the pipeline reads, into a pickle payload."""
+    elements = {"rooms": rooms, "walls": walls, "doors": doors, "stairs": stairs}
+    payload = {
+        "level_name": level_name,
+        **{
+            key: [_slim(obj, LEVEL_ELEMENT_ATTRS[key]) for obj in elements[key] or []]
+            for key in LEVEL_ELEMENT_ATTRS
+        },
+    }
+    return pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def unpack_wall_lines(coords):
+    """Rebuild the 2D wall lines returned by create_graph from (sx, sy, ex, ey) tuples."""
+    return [
+        Line(
+            start=Point(x=sx, y=sy, units="m"),
+            end=Point(x=ex, y=ey, units="m"),
+            units="m",
+            category="wall_segment"
+        )
+        for sx, sy, ex, ey in coords
+    ]
+
+
+def build_level_graph(packed, global_bounds, spacing=0.5, gap_offset=0.3, graph_path=None, trim_engine="batch",
+                      discretization="uniform", max_cell=8.0, tagging="vectorized", trim_agreement=False):
+    """
+    Worker entry point: generate the grid, trim it, build the graph and map doors/stairs for one level.
+
+    global_bounds is the grid extent: the building's, or the level's from compute_level_bounds.
+    discretization="uniform" uses the full `spacing` grid; "quadtree" merges open room interiors
+    into cells up to max_cell meters wide. trim_agreement=True prints how closely the raster
+    trim engine agrees with the geometric one. Returns (level_name, FloorGraph, wall line coords).
+    The graph is also saved to graph_path if given.
+    """
+    from generate_grid_test import (
+        generate_extended_gridlines_per_floor,
+        generate_quadtree_gridlines_per_floor,
+        trim_gridlines,
+        create_graph,
+        add_doors_on_grid,
+        add_stairs_on_grid
+    )
+    from floor_graph import FloorGraph, save_floor_graph, build_room_index
+
+    data = pickle.loads(packed)
+    level_name = data["level_name"]
+    rooms_on_level = data["rooms"]
+    walls_on_level = data["walls"]
+    doors_on_level = data["doors"]
+    stairs_on_level = data["stairs"]
+
+    # Generate full grid
+    if discretization == "uniform":
+        gridlines_raw, _, grid_dict = generate_extended_gridlines_per_floor(
+            rooms=rooms_on_level,
+            walls=walls_on_level,
+            doors=doors_on_level,
+            spacing=spacing,
+            level_name=level_name,
+            global_bounds=global_bounds,
+            tagging=tagging
+        )
+    elif discretization == "quadtree":
+        gridlines_raw, _, grid_dict = generate_quadtree_gridlines_per_floor(
+            rooms=rooms_on_level,
+            walls=walls_on_level,
+            doors=doors_on_level,
+            stairs=stairs_on_level,
+            spacing=spacing,
+            max_cell=max_cell,
+            level_name=level_name,
+            global_bounds=global_bounds
+        )
+    else:
+        raise ValueError(f"Unsupported discretization: {discretization}")
+
+    # Extract wall lines (in meters) for trimming
+    _, wall_lines_2d = create_graph(
+        rooms=rooms_on_level,
+        walls=walls_on_level,
+        doors=doors_on_level,
+        gridlines=[],  # no gridlines yet, just want wall_lines_2d
+        level_name=level_name
+    )
+
+    final_gridlines = trim_gridlines(
+        gridlines_raw,
+        wall_lines_2d,
+        doors_on_level,
+        grid_dict,
+        spacing=spacing,
+        gap_offset=gap_offset,
+        engine=trim_engine,
+        report_agreement=trim_agreement
+    )
+
+    G_floor, wall_lines_2d = create_graph(
+        rooms=rooms_on_level,
+        walls=walls_on_level,
+        doors=doors_on_level,
+        gridlines=final_gridlines,
+        level_name=level_name
+    )
+
+    add_doors_on_grid(G_floor, doors_on_level)
+    add_stairs_on_grid(G_floor, stairs_on_level)
+    G_floor.graph["level_name"] = level_name
+    build_room_index(G_floor)
+
+    floor = save_floor_graph(G_floor, graph_path) if graph_path else FloorGraph.from_networkx(G_floor)
+    wall_coords = [(w.start.x, w.start.y, w.end.x, w.end.y) for w in wall_lines_2d]
+    return level_name, floor, wall_coords
@@ -1,25 +1,24 @@
 import os
 import pickle
-import glob
 from specklepy.objects.base import Base
+from floor_graph import COORD_SCALE, FloorGraph, load_floor_graph, list_floor_graphs
 
 def inspect_graph_pkls():
     """Inspect the contents of graph pkl files"""
-    graph_files = sorted(glob.glob("graphs/G_*.pkl"))
+    graph_files = list_floor_graphs("graphs")
     
     if not graph_files:
-        print("❌ No graph pickle files found in 'graphs/' directory.")
+        print("❌ No graph files found in 'graphs/' directory.")
         return
     
     print(f"🔍 Found {len(graph_files)} graph files:")
     
     for graph_path in graph_files:
-        level_name = graph_path.split("_")[-1].replace(".pkl", "")
+        level_name = os.path.splitext(graph_path)[0].split("_")[-1]
         print(f"\n📁 Inspecting: {graph_path} (Floor: {level_name})")
         
         try:
-            with open(graph_path, "rb") as f:
-                G = pickle.load(f)
+            G = load_floor_graph(graph_path)
 
             print(f"  📊 Nodes: {len(G.nodes)} | Edges: {len(G.edges)}")
             print(f"  🚪 Doors: {[n for n in G.nodes if G.nodes[n].get('type') == 'door']}")
@@ -69,15 +68,12 @@ def inspect_sample_parameters(pkl_path="speckle_elements/speckle_metadata.pkl",
     inspect_element_parameters(sample_elem)
 
 def inspect_start_and_exit_nodes(graph_dir="graphs"):
-    for filename in sorted(os.listdir(graph_dir)):
-        if not filename.startswith("G_") or not filename.endswith(".pkl"):
-            continue
+    for graph_path in list_floor_graphs(graph_dir):
+        filename = os.path.basename(graph_path)
 
-        level = filename.replace("G_", "").replace(".pkl", "")
-        graph_path = os.path.join(graph_dir, filename)
+        level = os.path.splitext(filename)[0].replace("G_", "")
 
-        with open(graph_path, "rb") as f:
-            G = pickle.load(f)
+        G = load_floor_graph(graph_path)
 
         start_nodes = G.graph.get("start_nodes", [])
         exit_nodes = G.graph.get("exit_nodes", [])
@@ -133,15 +129,12 @@ def count_exit_nodes_from_paths(paths_dir="paths"):
         print("-" * 30)
 
 def count_default_emergency_exits(graph_dir="graphs"):
-    for fname in sorted(os.listdir(graph_dir)):
-        if not fname.startswith("G_") or not fname.endswith(".pkl"):
-            continue
+    for graph_path in list_floor_graphs(graph_dir):
+        fname = os.path.basename(graph_path)
 
-        level = fname.replace("G_", "").replace(".pkl", "")
-        graph_path = os.path.join(graph_dir, fname)
+        level = os.path.splitext(fname)[0].replace("G_", "")
 
-        with open(graph_path, "rb") as f:
-            G = pickle.load(f)
+        G = load_floor_graph(graph_path)
 
         fallback_exits = [
             node for node, data in G.nodes(data=True)
@@ -190,6 +183,8 @@ def inspect_exit_door_ids_from_pkl(file_path):
     # Fallback if input is a networkx graph
     try:
         import networkx as nx
+        if isinstance(data, FloorGraph):
+            data = data.to_networkx()
         if isinstance(data, nx.Graph):
             exit_door_ids = set()
             for node, attrs in data.nodes(data=True):
@@ -236,8 +231,7 @@ import pickle
 import networkx as nx
 
 def inspect_door_widths_in_graph(graph_pkl_path):
-    with open(graph_pkl_path, "rb") as f:
-        G = pickle.load(f)
+    G = load_floor_graph(graph_pkl_path)
 
     if not isinstance(G, nx.Graph):
         print("❌ File does not contain a valid NetworkX graph.")
@@ -271,47 +265,44 @@ def inspect_door_widths_in_graph(graph_pkl_path):
 
 def inspect_node_room_metadata(graph_dir="graphs"):
     """
-    Inspect all graph PKLs to verify tagging of nodes with room_id and room_name.
+    Inspect all floor graphs to verify tagging of nodes with room_id and room_name.
+    Reads the room columns straight from the (memory-mapped) FloorGraph arrays.
     """
-    import pickle
+    import numpy as np
 
-    graph_files = sorted(f for f in os.listdir(graph_dir) if f.endswith(".pkl") and f.startswith("G_"))
+    graph_files = list_floor_graphs(graph_dir)
 
     if not graph_files:
-        print("❌ No graph PKL files found.")
+        print("❌ No graph files found.")
         return
 
-    for fname in graph_files:
-        path = os.path.join(graph_dir, fname)
-        with open(path, "rb") as f:
-            G = pickle.load(f)
+    for path in graph_files:
+        floor = load_floor_graph(path, as_networkx=False)
 
-        total_nodes = len(G.nodes)
-        room_tagged = [
-            (n, d) for n, d in G.nodes(data=True)
-            if "room_id" in d or "room_name" in d
-        ]
+        total_nodes = floor.number_of_nodes()
+        room_codes, name_codes = floor.codes["room_id"], floor.codes["room_name"]
+        room_tagged = np.flatnonzero((room_codes >= 0) | (name_codes >= 0))
 
-        print(f"\n📦 {fname}")
+        print(f"\n📦 {os.path.basename(path)}")
         print(f"   • Nodes with room_id or room_name: {len(room_tagged)} / {total_nodes}")
 
-        if room_tagged:
+        if len(room_tagged):
             print("   🔍 Sample tagged nodes:")
-            for n, d in room_tagged[:5]:
-                print(f"     - {n} | room_id={d.get('room_id')} | room_name={d.get('room_name')}")
+            room_ids = floor.tables["room_id"] + [None]
+            room_names = floor.tables["room_name"] + [None]
+            for i in room_tagged[:5].tolist():
+                node = tuple((floor.qcoords[i] / COORD_SCALE).tolist())
+                print(f"     - {node} | room_id={room_ids[room_codes[i]]} | room_name={room_names[name_codes[i]]}")
 
 def inspect_room_door_counts(graph_dir="graphs"):
     from path_of_travel import get_outside_doors_by_room
 
-    for fname in sorted(os.listdir(graph_dir)):
-        if not fname.startswith("G_") or not fname.endswith(".pkl"):
-            continue
+    for graph_path in list_floor_graphs(graph_dir):
+        fname = os.path.basename(graph_path)
 
-        level = fname.replace("G_", "").replace(".pkl", "")
-        graph_path = os.path.join(graph_dir, fname)
+        level = os.path.splitext(fname)[0].replace("G_", "")
 
-        with open(graph_path, "rb") as f:
-            G = pickle.load(f)
+        G = load_floor_graph(graph_path)
 
         print(f"\n📘 Floor {level}")
         room_to_doors = get_outside_doors_by_room(G, limit_debug_prints=0)
@@ -328,16 +319,14 @@ def inspect_multi_door_room_starts(graph_dir="graphs", min_doors=2, distance_thr
     def distance(a, b):
         return np.linalg.norm(np.array(a) - np.array(b))
 
-    for fname in sorted(os.listdir(graph_dir)):
-        if not fname.startswith("G_") or not fname.endswith(".pkl"):
-            continue
+    for graph_path in list_floor_graphs(graph_dir):
+        fname = os.path.basename(graph_path)
 
-        with open(os.path.join(graph_dir, fname), "rb") as f:
-            G = pickle.load(f)
+        G = load_floor_graph(os.path.join(graph_dir, fname))
 
         room_starts = G.graph.get("room_start_nodes", {})
         door_nodes = G.graph.get("door_nodes_by_room", {})
-        level = fname.replace("G_", "").replace(".pkl", "")
+        level = os.path.splitext(fname)[0].replace("G_", "")
 
         print(f"\n📐 Floor {level} — Multi-Door Room Start Node Check")
 
@@ -368,13 +357,11 @@ def inspect_all_doors_by_room(graph_dir="graphs"):
     import os, pickle
     from collections import defaultdict
 
-    for fname in sorted(os.listdir(graph_dir)):
-        if not fname.endswith(".pkl") or not fname.startswith("G_"):
-            continue
+    for graph_path in list_floor_graphs(graph_dir):
+        fname = os.path.basename(graph_path)
 
-        floor = fname.replace("G_", "").replace(".pkl", "")
-        with open(os.path.join(graph_dir, fname), "rb") as f:
-            G = pickle.load(f)
+        floor = os.path.splitext(fname)[0].replace("G_", "")
+        G = load_floor_graph(os.path.join(graph_dir, fname))
 
         door_data = defaultdict(list)
 
@@ -396,12 +383,11 @@ def inspect_unique_room_names(graph_dir="graphs"):
     import pickle, os
     from collections import Counter
 
-    graph_files = sorted(f for f in os.listdir(graph_dir) if f.endswith(".pkl") and f.startswith("G_"))
+    graph_files = [os.path.basename(p) for p in list_floor_graphs(graph_dir)]
 
     for fname in graph_files:
         path = os.path.join(graph_dir, fname)
-        with open(path, "rb") as f:
-            G = pickle.load(f)
+        G = load_floor_graph(path)
 
         names = [d.get("room_name") for _, d in G.nodes(data=True) if "room_name" in d]
         counts = Counter(names)
@@ -423,7 +409,7 @@ if __name__ == "__main__":
     #count_default_emergency_exits("graphs")
     #inspect_exit_door_ids_from_pkl("paths/paths_001.pkl")
     #inspect_exit_door_widths_from_pkl("paths/paths_001.pkl")
-    #inspect_door_widths_in_graph("graphs/G_001.pkl")
+    #inspect_door_widths_in_graph("graphs/G_001.npz")
     inspect_node_room_metadata("graphs")
     #inspect_unique_room_names("graphs")
     #inspect_room_door_counts("graphs")
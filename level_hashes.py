@@ -0,0 +1,110 @@
+# level_hashes.py
+# Per-level input hashes, so each stage only redoes the floors whose inputs changed.
+#
+#   graphs/level_hashes.json            level → geometry hash (run_grid_main)
+#   paths/paths_state.json              level → paths input key (run_paths_main)
+#   compliance_reports/fls_state.json   level → FLS input key (run_fls_main)
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Bump when the grid/graph pipeline changes in a way that should invalidate every stored graph
+#   2: floor graphs saved as .npz
+#   3: level_name stored in G.graph
+#   4: room index stored with the graph
+GRID_PIPELINE_VERSION = 4
+
+LEVEL_HASHES_PATH = os.path.join("graphs", "level_hashes.json")
+PATHS_STATE_PATH = os.path.join("paths", "paths_state.json")
+FLS_STATE_PATH = os.path.join("compliance_reports", "fls_state.json")
+
+
+def _update_floats(h, values):
+    h.update(np.asarray(values, dtype=np.float64).tobytes())
+
+
+def _update_str(h, value):
+    h.update(str(value).encode("utf-8"))
+    h.update(b"\0")
+
+
+def _line_coords(line):
+    return [line.start.x, line.start.y, line.start.z, line.end.x, line.end.y, line.end.z]
+
+
+def level_geometry_hash(rooms, walls, doors, stairs, **params):
+    """
+    Hash everything the grid pipeline reads for one level: room ids/names/outlines, wall
+    baselines, door transforms and the first stair mesh, plus pipeline params (spacing,
+    global bounds, ...). Element order is part of the hash, since it affects tagging.
+    """
+    h = hashlib.sha256()
+    _update_str(h, GRID_PIPELINE_VERSION)
+    _update_str(h, json.dumps(params, sort_keys=True, default=str))
+
+    h.update(b"rooms")
+    for room in rooms or []:
+        for attr in ("id", "elementId", "name"):
+            _update_str(h, getattr(room, attr, None))
+        outline = getattr(room, "outline", None)
+        for seg in getattr(outline, "segments", None) or []:
+            if hasattr(seg, "start") and hasattr(seg, "end"):
+                _update_floats(h, _line_coords(seg))
+
+    h.update(b"walls")
+    for wall in walls or []:
+        _update_str(h, getattr(wall, "id", None))
+        base_line = getattr(wall, "baseLine", None)
+        if hasattr(base_line, "start") and hasattr(base_line, "end"):
+            _update_floats(h, _line_coords(base_line))
+
+    h.update(b"doors")
+    for door in doors or []:
+        _update_str(h, getattr(door, "id", None))
+        matrix = getattr(getattr(door, "transform", None), "matrix", None)
+        if isinstance(matrix, list):
+            _update_floats(h, matrix)
+
+    h.update(b"stairs")
+    for stair in stairs or []:
+        _update_str(h, getattr(stair, "id", None))
+        meshes = getattr(stair, "displayValue", None) or []
+        if isinstance(meshes, list) and meshes and isinstance(getattr(meshes[0], "vertices", None), list):
+            _update_floats(h, meshes[0].vertices)
+
+    return h.hexdigest()
+
+
+def input_key(*parts):
+    """Stable hash of JSON-serializable stage inputs."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def file_digest(path):
+    """sha256 of a file's bytes, or None if it doesn't exist."""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -0,0 +1,173 @@
+# llm_async.py
+# Concurrent chat-completion requests against the Azure OpenAI REST endpoint.
+#
+# Prompts run concurrently, up to LLM_CONCURRENCY in flight. A token bucket limits them to
+# LLM_RATE_PER_S requests per second (bursts of LLM_BURST). Throttled and failed requests are
+# retried with exponential backoff, honoring Retry-After. Identical prompts are sent only once
+# per engine.
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+
+import httpx
+
+# "async" (concurrent requests through AsyncChatEngine) or "sync" (one blocking call per prompt)
+LLM_ENGINE = os.getenv("LLM_ENGINE", "async")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 16))
+LLM_RATE_PER_S = float(os.getenv("LLM_RATE_PER_S", 20))
+LLM_BURST = int(os.getenv("LLM_BURST", 20))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncChatEngine:
+    """
+    Chat completions over one shared httpx.AsyncClient.
+
+    complete() returns the message content of one prompt; complete_many() runs a list of prompts
+    concurrently and returns their contents in order (None where a prompt failed). Endpoint,
+    key, API version and deployment default to the AZURE_ENDPOINT, AZURE_API_KEY, API_VERSION
+    and DEPLOYMENT environment variables.
+    """
+
+    def __init__(self, endpoint=None, api_key=None, api_version=None, deployment=None,
+                 max_concurrency=LLM_CONCURRENCY, rate_per_s=LLM_RATE_PER_S, burst=LLM_BURST,
+                 max_retries=LLM_MAX_RETRIES, backoff_s=0.5, max_backoff_s=20.0, timeout_s=60.0):
+        self.endpoint = (endpoint or os.getenv("AZURE_ENDPOINT") or "").rstrip("/")
+        self.api_key = api_key or os.getenv("AZURE_API_KEY")
+        self.api_version = api_version or os.getenv("API_VERSION")
+        self.deployment = deployment or os.getenv("DEPLOYMENT")
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.timeout_s = timeout_s
+        self.stats = {"requests": 0, "retries": 0, "deduplicated": 0, "failed": 0}
+        self._client = None
+        self._semaphore = None
+        self._bucket = None
+        self._tasks = {}
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout_s,
+            limits=httpx.Limits(max_connections=self.max_concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.rate_per_s, self.burst) if self.rate_per_s else None
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    @property
+    def url(self):
+        return f"{self.endpoint}/openai/deployments/{self.deployment}/chat/completions"
+
+    async def _post(self, body):
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                self.stats["requests"] += 1
+                try:
+                    response = await self._client.post(
+                        self.url,
+                        params={"api-version": self.api_version},
+                        headers={"api-key": self.api_key or ""},
+                        json=body
+                    )
+                except httpx.TransportError as e:
+                    response, error = None, e
+                else:
+                    error = None
+
+            if response is not None and response.status_code < 400:
+                return response.json()["choices"][0]["message"]["content"]
+            if response is not None and response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+            if attempt == self.max_retries:
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+
+            # Throttled or transient failure → back off (the server's Retry-After wins)
+            delay = min(self.max_backoff_s, self.backoff_s * 2 ** attempt) * (0.5 + random.random() / 2)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def complete(self, messages, temperature=0):
+        body = {"messages": messages, "temperature": temperature}
+        key = json.dumps(body, sort_keys=True)
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(self._post(body))
+        else:
+            self.stats["deduplicated"] += 1
+        return await asyncio.shield(task)
+
+    async def complete_many(self, message_lists, temperature=0):
+        results = await asyncio.gather(
+            *(self.complete(messages, temperature) for messages in message_lists),
+            return_exceptions=True
+        )
+        contents = []
+        for result in results:
+            if isinstance(result, BaseException):
+                self.stats["failed"] += 1
+                print(f"[ERROR] Chat completion failed: {type(result).__name__}: {result}", file=sys.stderr)
+                result = None
+            contents.append(result)
+        return contents
+
+
+def run_chat_batch(message_lists, temperature=0, **engine_kwargs):
+    """Run prompts concurrently from synchronous code; returns their contents (None on failure)."""
+    message_lists = list(message_lists)
+    if not message_lists:
+        return []
+
+    async def run():
+        async with AsyncChatEngine(**engine_kwargs) as engine:
+            started = time.perf_counter()
+            contents = await engine.complete_many(message_lists, temperature)
+            print(f"[INFO] {len(message_lists)} prompt(s) in {time.perf_counter() - started:.1f}s: {engine.stats}",
+                  file=sys.stderr)
+            return contents
+
+    return asyncio.run(run())
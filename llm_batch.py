@@ -0,0 +1,113 @@
+# llm_batch.py
+# Multi-room prompts: similar room names share one chat completion and one retrieved code context.
+#
+# The model answers with a JSON object keyed by room name. Every answer is validated on its own;
+# rooms that are missing from the answer or fail validation fall back to their single-room prompt.
+
+import os
+import re
+import json
+
+from llm_async import run_chat_batch
+from room_cache import normalize_key
+
+LLM_BATCH_ROOMS = int(os.getenv("LLM_BATCH_ROOMS", 20))    # rooms per prompt; 1 disables batching
+LLM_BATCH_CHUNKS = int(os.getenv("LLM_BATCH_CHUNKS", 12))  # code chunks per batched prompt
+
+
+def room_family(room_name):
+    """Room type of a name, taken as its last word: "COMMUNITY SERVICES STORAGE" → "STORAGE"."""
+    words = re.findall(r"[A-Z]+", normalize_key(room_name))
+    return words[-1] if words else ""
+
+
+def group_room_names(room_names, max_rooms=None):
+    """
+    Split room names into groups of at most max_rooms (default: LLM_BATCH_ROOMS, capped at
+    LLM_BATCH_CHUNKS so every room of a group can get its own code chunk). Names of one family
+    stay together where they fit, so a group's retrieved code sections overlap as much as possible.
+    """
+    max_rooms = max(1, max_rooms or min(LLM_BATCH_ROOMS, LLM_BATCH_CHUNKS))
+    families = {}
+    for name in sorted(dict.fromkeys(room_names), key=lambda n: (room_family(n), normalize_key(n))):
+        families.setdefault(room_family(name), []).append(name)
+
+    groups, current = [], []
+    for members in families.values():
+        if len(current) + len(members) > max_rooms and current:
+            groups.append(current)
+            current = []
+        while len(members) > max_rooms:
+            groups.append(members[:max_rooms])
+            members = members[max_rooms:]
+        current = current + members
+    if current:
+        groups.append(current)
+    return groups
+
+
+def union_context(queries, search, max_chunks=None):
+    """
+    Code chunks retrieved by search(query) for every query, duplicates dropped. Each query's best
+    chunk is always kept, even past max_chunks; the rest are interleaved by rank up to max_chunks.
+    """
+    max_chunks = max_chunks or LLM_BATCH_CHUNKS
+    results = [search(query) for query in queries]
+    seen, chunks = set(), []
+    for rank in range(max((len(docs) for docs in results), default=0)):
+        for docs in results:
+            if rank > 0 and len(chunks) >= max_chunks:
+                return chunks
+            if rank < len(docs) and docs[rank].page_content not in seen:
+                seen.add(docs[rank].page_content)
+                chunks.append(docs[rank].page_content)
+    return chunks
+
+
+def parse_json_answer(content):
+    """The JSON object of a model answer (code fences and surrounding text are ignored), or {}."""
+    match = re.search(r"\{.*\}", content or "", re.S)
+    if not match:
+        return {}
+    try:
+        answer = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    return answer if isinstance(answer, dict) else {}
+
+
+def run_batched(room_names, batch_messages, validate, single, max_rooms=None):
+    """
+    {room name: answer or None} with one prompt per group of rooms.
+
+    batch_messages(group) returns the chat messages of a group (None: no context); validate(name,
+    value) turns one room's JSON value into its answer or None. Rooms left without an answer go
+    to single(names), which returns {name: answer or None} from single-room prompts.
+    """
+    room_names = list(dict.fromkeys(room_names))
+    prompts = []
+    for group in group_room_names(room_names, max_rooms):
+        if len(group) < 2:
+            continue
+        try:
+            messages = batch_messages(group)
+        except Exception as e:
+            print(f"[ERROR] Batched prompt failed for {len(group)} room(s): {e}")
+            continue
+        if messages is not None:
+            prompts.append((group, messages))
+
+    found = {}
+    contents = run_chat_batch([messages for _, messages in prompts])
+    for (group, _), content in zip(prompts, contents):
+        answer = {normalize_key(key): value for key, value in parse_json_answer(content).items()}
+        for name in group:
+            value = answer.get(normalize_key(name))
+            found[name] = validate(name, value) if value is not None else None
+
+    retry = [name for name in room_names if not found.get(name)]
+    print(f"[INFO] {len(room_names) - len(retry)} of {len(room_names)} room(s) answered by "
+          f"{len(prompts)} batched prompt(s); {len(retry)} sent one by one")
+    if retry:
+        found.update(single(retry))
+    return found
@@ -2,33 +2,42 @@
 import sys
 import json
 from dotenv import load_dotenv
-from extract_max_occupancy import get_max_occupancy_with_cache
+from extract_max_occupancy import get_max_occupancies_with_cache
+from room_cache import get_room_cache
 
 load_dotenv()
 
-if len(sys.argv) < 2:
-    print("❌ Error: classification groups not provided.", file=sys.stderr)
-    sys.exit(1)
 
-try:
-    groups = json.loads(sys.argv[1])
-except Exception as e:
-    print(f"❌ Failed to parse input: {e}", file=sys.stderr)
-    sys.exit(1)
+def max_occupancy_for_groups(groups):
+    results = {}
+    values = get_max_occupancies_with_cache(groups)
+    if not any(values.values()):
+        return results
 
-results = {}
+    classifications = get_room_cache().items("classification")
 
-for group in groups:
-    val = get_max_occupancy_with_cache(group)
-    if val:
-        with open("cached_data/classification_index.json", "r") as f:
-            index = json.load(f)
+    for group in groups:
+        val = values[group]
+        if val:
+            for room_name, classification in classifications.items():
+                if classification.strip().lower() == group.strip().lower():
+                    results[room_name] = {
+                        "classification": classification,
+                        "max_occupancy": val
+                    }
 
-        for room_name, data in index.items():
-            if data.get("classification", "").strip().lower() == group.strip().lower():
-                results[room_name] = {
-                    "classification": data.get("classification"),
-                    "max_occupancy": val
-                }
+    return results
 
-print(json.dumps(results))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("❌ Error: classification groups not provided.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        groups = json.loads(sys.argv[1])
+    except Exception as e:
+        print(f"❌ Failed to parse input: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps(max_occupancy_for_groups(groups)))
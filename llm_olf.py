@@ -2,22 +2,26 @@
 import sys
 import json
 from dotenv import load_dotenv
-from extract_olf import get_olf_with_cache
+from extract_olf import get_olfs_with_cache
 
 load_dotenv()
 
-if __name__ == "__main__":
-    try:
-        room_names = sys.argv[1:]
-        result = {}
 
-        for name in room_names:
-            classification = "UNKNOWN"  # fallback if not passed, could also read from cache
-            olf, unit = get_olf_with_cache(name, classification)
-            if olf:
-                result[name.upper()] = {"olf": olf, "unit": unit}
+def olf_for_rooms(room_names):
+    result = {}
+    olfs = get_olfs_with_cache(room_names)
+
+    for name in room_names:
+        olf, unit = olfs[name]
+        if olf:
+            result[name.upper()] = {"olf": olf, "unit": unit}
+
+    return result
 
-        json.dump(result, sys.stdout)
+
+if __name__ == "__main__":
+    try:
+        json.dump(olf_for_rooms(sys.argv[1:]), sys.stdout)
         print("", file=sys.stderr)
     except Exception as e:
         print(f"[ERROR] Exception in llm_olf.py: {e}", file=sys.stderr)
@@ -0,0 +1,188 @@
+# llm_worker.py
+# Long-lived LLM worker: imports the langchain stack, embedding model and FAISS indexes once and
+# answers batched requests as JSON lines on stdin/stdout. LLMWorkerPool runs a few of them.
+#
+#   request:   {"id": 1, "task": "classify", "items": ["OFFICE", "STORE"]}
+#   response:  {"id": 1, "ok": true, "result": {...}}  or  {"id": 1, "ok": false, "error": "..."}
+
+import os
+import sys
+import json
+import queue
+import threading
+import subprocess
+
+# task → "module:function"; the function takes the request items and returns a JSON-serializable dict
+TASKS = {
+    "classify": "llm_classify:classify_rooms",
+    "olf": "llm_olf:olf_for_rooms",
+    "max_occupancy": "llm_max_occupancy:max_occupancy_for_groups",
+}
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+
+
+def serve(tasks=None, stdin=None, stdout=None):
+    """Worker loop: one response line per request line, until stdin closes."""
+    import importlib
+
+    tasks = dict(TASKS, **(tasks or {}))
+    stdin = stdin or sys.stdin
+    protocol = stdout
+    if protocol is None:
+        # Keep the real stdout for the protocol and send fd 1 (native libraries too) to stderr
+        sys.stdout.flush()
+        protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    # Task modules print debug output; keep it off the protocol stream
+    sys.stdout = sys.stderr
+
+    handlers = {}
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            task = request["task"]
+            if task not in handlers:
+                module_name, func_name = tasks[task].split(":")
+                handlers[task] = getattr(importlib.import_module(module_name), func_name)
+            response = {"id": request_id, "ok": True, "result": handlers[task](request["items"])}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+
+class LLMWorkerPool:
+    """
+    Persistent llm_worker.py processes, started on the first request and reused until close().
+
+    map() spreads a call's batches over the idle workers and returns one result per batch, in
+    order; a failed batch yields its exception instead of a dict. A worker that dies, answers
+    out of protocol or takes longer than timeout_s on a request is killed and restarted.
+    """
+
+    def __init__(self, size=1, python=None, cwd=None, env=None, tasks=None, timeout_s=600.0):
+        self.size = max(1, int(size))
+        self.python = python or sys.executable
+        self.cwd = cwd
+        self.env = env
+        self.tasks = tasks or {}
+        self.timeout_s = timeout_s
+        self._idle = queue.Queue()
+        self._procs = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _spawn(self):
+        cmd = [self.python, "-u", WORKER_SCRIPT]
+        for name, target in self.tasks.items():
+            cmd += ["--task", f"{name}={target}"]
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8",
+            bufsize=1, cwd=self.cwd, env=self.env
+        )
+        self._procs.append(proc)
+        return proc
+
+    def _respawn(self, proc):
+        with self._lock:
+            if proc in self._procs:
+                self._procs.remove(proc)
+            proc.kill()
+            return self._spawn()
+
+    def _start(self):
+        with self._lock:
+            if not self._procs:
+                print(f"🧠 Starting {self.size} LLM worker(s)", flush=True)
+                for _ in range(self.size):
+                    self._idle.put(self._spawn())
+
+    def request(self, task, items):
+        """Send one batch to an idle worker and wait for its result dict."""
+        self._start()
+        proc = self._idle.get()
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+
+        expired = threading.Event()
+        timer = None
+        if self.timeout_s:
+            timer = threading.Timer(self.timeout_s, lambda worker=proc: (expired.set(), worker.kill()))
+            timer.daemon = True
+            timer.start()
+
+        try:
+            proc.stdin.write(json.dumps({"id": request_id, "task": task, "items": list(items)}) + "\n")
+            proc.stdin.flush()
+            line = proc.stdout.readline()
+            if timer:
+                timer.cancel()
+            if expired.is_set():
+                raise TimeoutError(f"LLM worker took longer than {self.timeout_s}s on request {request_id}")
+            if not line:
+                raise RuntimeError(f"LLM worker exited with code {proc.wait()}")
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                raise RuntimeError(f"LLM worker sent a non-JSON line: {line[:200]!r}")
+            if not isinstance(response, dict) or response.get("id") != request_id:
+                raise RuntimeError(f"LLM worker answered {line[:200]!r} to request {request_id}")
+        except (OSError, RuntimeError):
+            # The worker's stdout is no longer in step with its requests: replace it
+            proc = self._respawn(proc)
+            raise
+        finally:
+            if timer:
+                timer.cancel()
+            self._idle.put(proc)
+
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error"))
+        return response["result"]
+
+    def map(self, task, batches):
+        from concurrent.futures import ThreadPoolExecutor
+
+        def run(batch):
+            try:
+                return self.request(task, batch)
+            except Exception as e:
+                return e
+
+        batches = list(batches)
+        if len(batches) <= 1 or self.size == 1:
+            return [run(batch) for batch in batches]
+        with ThreadPoolExecutor(max_workers=self.size) as pool:
+            return list(pool.map(run, batches))
+
+    def close(self):
+        with self._lock:
+            procs, self._procs = self._procs, []
+            while not self._idle.empty():
+                self._idle.get_nowait()
+        for proc in procs:
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=10)
+            except Exception:
+                proc.kill()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Persistent LLM worker (JSON lines on stdin/stdout)")
+    parser.add_argument("--task", action="append", default=[], help="Extra task as name=module:function")
+    args = parser.parse_args()
+
+    serve(tasks=dict(spec.split("=", 1) for spec in args.task))
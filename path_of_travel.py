@@ -5,14 +5,14 @@ from specklepy.api import operations
 from specklepy.transports.server import ServerTransport
 from pathfinding_algorithms import a_star, theta_star  
 from helpers import euclidean_distance
+from floor_graph import find_floor_level, build_room_index, get_room_index
+from spatial_index import get_node_index
 
 def euclidean_distance(p1, p2):
     return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2 + (p1[2] - p2[2]) ** 2) ** 0.5
 
 def closest_node(pt: Point, G):
-    def dist(a, b):
-        return (a.x - b[0])**2 + (a.y - b[1])**2 + (a.z - b[2])**2
-    return min(G.nodes, key=lambda n: dist(pt, n), default=None)
+    return get_node_index(G).nearest(pt)[0]
 
 def map_doors_to_graph_nodes(G, doors, rooms, exit_door_ids=None, room_outlines=None):
     start_nodes = []
@@ -109,63 +109,95 @@ def map_doors_to_graph_nodes(G, doors, rooms, exit_door_ids=None, room_outlines=
 
 #     print(f"🏠 Mapped {len(room_start_nodes)} room centers to start nodes.")
 
-def map_room_center_to_start_nodes(G):
+def group_room_nodes(G):
     """
-    Map each room to a representative start node:
-    - If the room has ≥2 door nodes: pick the midpoint (2 doors) or most central node (3+).
-    - Else: use centroid of all tagged room nodes.
+    Group the room nodes of G once: room_id → (nodes, coords, door coords), in graph node order.
+    Door bridge nodes ("door_*") and untagged nodes are skipped.
     """
-    from collections import defaultdict
     import numpy as np
 
-    room_nodes = defaultdict(list)
-    door_nodes_by_room = defaultdict(list)
-
-    # Step 1: Collect nodes per room
+    room_nodes = {}
+    door_nodes_by_room = {}
     for node, data in G.nodes(data=True):
         room_id = str(data.get("room_id", "")).strip()
         if not room_id or room_id.startswith("door_") or room_id == "none":
             continue
-        room_nodes[room_id].append(node)
+        room_nodes.setdefault(room_id, []).append(node)
         if data.get("type") == "door":
-            door_nodes_by_room[room_id].append(node)
+            door_nodes_by_room.setdefault(room_id, []).append(node)
 
-    room_start_nodes = {}
+    return {
+        room_id: (
+            nodes,
+            np.asarray(nodes, dtype=np.float64).reshape(len(nodes), 3),
+            np.asarray(door_nodes_by_room.get(room_id, []), dtype=np.float64).reshape(-1, 3),
+        )
+        for room_id, nodes in room_nodes.items()
+    }
 
-    # Step 2: Assign best start node
-    for room_id, nodes in room_nodes.items():
-        doors = door_nodes_by_room.get(room_id, [])
-        chosen = None
 
+def _start_node_choices(G, strategy):
+    """Yield (room_id, node, reason) per room; distances are broadcast over each room's coords."""
+    import numpy as np
+
+    def dist_to(coords, point):
+        return np.sqrt(((coords - point) ** 2).sum(axis=1))
+
+    for room_id, (nodes, coords, doors) in group_room_nodes(G).items():
         if len(doors) == 2:
-            # Midpoint of the two door nodes
-            p1 = np.array(doors[0])
-            p2 = np.array(doors[1])
-            mid = (p1 + p2) / 2
-            chosen = min(nodes, key=lambda pt: np.linalg.norm(np.array(pt) - mid))
-            print(f"📍 Room {room_id} → midpoint between 2 doors → node {chosen}")
+            # Midpoint of the two doors
+            i = int(np.argmin(dist_to(coords, doors.mean(axis=0))))
+            yield room_id, nodes[i], "midpoint between 2 doors"
 
         elif len(doors) >= 3:
-            # Node with minimum average distance to all other door nodes
-            def avg_dist_to_all(pt):
-                return np.mean([np.linalg.norm(np.array(pt) - np.array(d)) for d in doors])
-            chosen = min(nodes, key=avg_dist_to_all)
-            print(f"📍 Room {room_id} → central node among {len(doors)} doors → node {chosen}")
+            # Node with minimum average distance to all doors (central among doors)
+            avg = np.sqrt(((coords[:, None, :] - doors[None, :, :]) ** 2).sum(axis=2)).mean(axis=1)
+            i = int(np.argmin(avg))
+            yield room_id, nodes[i], f"central node among {len(doors)} doors"
+
+        elif len(doors) == 1 and strategy == "farthest_from_door":
+            # Node farthest from the single door
+            i = int(np.argmax(dist_to(coords, doors[0])))
+            yield room_id, nodes[i], "farthest from 1 door"
 
         else:
-            # Use geometric center of room nodes
-            coords = np.array(nodes)
-            centroid = coords.mean(axis=0)
-            chosen = min(nodes, key=lambda pt: np.linalg.norm(np.array(pt) - centroid))
-            print(f"📍 Room {room_id} → centroid fallback → node {chosen}")
+            # Geometric centroid of the room nodes
+            i = int(np.argmin(dist_to(coords, coords.mean(axis=0))))
+            yield room_id, nodes[i], "no doors → centroid" if strategy == "farthest_from_door" else "centroid fallback"
+
 
-        room_start_nodes[room_id] = chosen
+def compute_room_start_nodes(G, strategy="farthest_from_door"):
+    """
+    Start node of every room on the floor in one call: room_id → node.
+
+    strategy="farthest_from_door" follows map_farthest_point_from_door, "room_center"
+    follows map_room_center_to_start_nodes (a single door falls back to the centroid).
+    """
+    if strategy not in ("farthest_from_door", "room_center"):
+        raise ValueError(f"Unsupported start node strategy: {strategy}")
+    return {room_id: node for room_id, node, _ in _start_node_choices(G, strategy)}
+
+
+def _assign_start_nodes(G, strategy):
+    room_start_nodes = {}
+    for room_id, node, reason in _start_node_choices(G, strategy):
+        print(f"📍 Room {room_id} → {reason} → node {node}")
+        room_start_nodes[room_id] = node
 
     G.graph["start_nodes"] = list(room_start_nodes.values())
     G.graph["room_start_nodes"] = room_start_nodes
     print(f"✅ Assigned start nodes for {len(room_start_nodes)} rooms.")
 
 
+def map_room_center_to_start_nodes(G):
+    """
+    Map each room to a representative start node:
+    - If the room has ≥2 door nodes: pick the midpoint (2 doors) or most central node (3+).
+    - Else: use centroid of all tagged room nodes.
+    """
+    _assign_start_nodes(G, "room_center")
+
+
 # def map_farthest_point_from_door(G):
 #     """
 #     Map each room to a representative start node:
@@ -230,74 +262,22 @@ def map_farthest_point_from_door(G):
     - If the room has 1 door: choose the node farthest from that door.
     - If the room has 0 doors: choose the node closest to the room centroid.
     """
-    from collections import defaultdict
-    import numpy as np
-
-    room_nodes = defaultdict(list)
-    door_nodes_by_room = defaultdict(list)
-
-    # Step 1: Collect nodes per room
-    for node, data in G.nodes(data=True):
-        room_id = str(data.get("room_id", "")).strip()
-        if not room_id or room_id.startswith("door_") or room_id == "none":
-            continue
-
-        # Add node to this room
-        room_nodes[room_id].append(node)
-
-        # If this node is a door, register it as a door for this room
-        if data.get("type") == "door":
-            door_nodes_by_room[room_id].append(node)
+    _assign_start_nodes(G, "farthest_from_door")
 
-    room_start_nodes = {}
-
-    # Step 2: Choose representative node per room
-    for room_id, nodes in room_nodes.items():
-        doors = door_nodes_by_room.get(room_id, [])
-        chosen = None
-
-        if len(doors) == 2:
-            # Midpoint of the two doors
-            p1, p2 = np.array(doors[0]), np.array(doors[1])
-            mid = (p1 + p2) / 2
-            chosen = min(nodes, key=lambda pt: np.linalg.norm(np.array(pt) - mid))
-            print(f"📍 Room {room_id} → midpoint between 2 doors → node {chosen}")
 
-        elif len(doors) >= 3:
-            # Node with minimum average distance to all doors (central among doors)
-            def avg_dist_to_all(pt):
-                return np.mean([np.linalg.norm(np.array(pt) - np.array(d)) for d in doors])
-            chosen = min(nodes, key=avg_dist_to_all)
-            print(f"📍 Room {room_id} → central node among {len(doors)} doors → node {chosen}")
-
-        elif len(doors) == 1:
-            # Node farthest from the single door
-            door = np.array(doors[0])
-            chosen = max(nodes, key=lambda pt: np.linalg.norm(np.array(pt) - door))
-            print(f"📍 Room {room_id} → farthest from 1 door → node {chosen}")
-
-        else:  # len(doors) == 0
-            # No doors: fallback to geometric centroid
-            centroid = np.mean([np.array(pt) for pt in nodes], axis=0)
-            chosen = min(nodes, key=lambda pt: np.linalg.norm(np.array(pt) - centroid))
-            print(f"📍 Room {room_id} → no doors → centroid node {chosen}")
-
-        room_start_nodes[room_id] = chosen
-
-    # Save to graph attributes
-    G.graph["start_nodes"] = list(room_start_nodes.values())
-    G.graph["room_start_nodes"] = room_start_nodes
-    print(f"✅ Assigned start nodes for {len(room_start_nodes)} rooms.")
-
-
-
-def stitch_subgraphs(G, max_distance=0.6):
+def stitch_subgraphs(G, max_distance=0.6, strategy="main", engine="kdtree"):
     """
     Connects disconnected components of G by linking the closest pair of nodes
-    between each component within a max_distance threshold.
+    between components within a max_distance threshold.
+
+    strategy="main" links every other component to the largest one; "forest" links
+    components to each other along a minimum spanning forest, so fragments that are
+    only close to another fragment get stitched too. engine="kdtree" finds the pairs
+    with KD-tree queries; "pairwise" is the original all-pairs search ("main" only).
     """
     import itertools
     import math
+    import numpy as np
 
     def euclidean_3d(a, b):
         return math.sqrt(sum((a[i] - b[i]) ** 2 for i in range(3)))
@@ -309,19 +289,44 @@ def stitch_subgraphs(G, max_distance=0.6):
 
     print(f"🧵 Stitching {len(components)} disconnected components...")
 
+    if strategy == "forest":
+        if engine != "kdtree":
+            raise ValueError("The forest strategy requires engine='kdtree'")
+        _stitch_spanning_forest(G, components, max_distance)
+        print("✅ Stitching complete.")
+        return
+    if strategy != "main":
+        raise ValueError(f"Unsupported stitch strategy: {strategy}")
+
     # Connect each isolated component to the largest one (usually component 0)
     main_component = max(components, key=len)
     rest_components = [c for c in components if c != main_component]
 
+    if engine == "kdtree":
+        from scipy.spatial import cKDTree
+
+        main_nodes = list(main_component)
+        tree = cKDTree(np.asarray(main_nodes, dtype=np.float64))
+
     for comp in rest_components:
         min_dist = float("inf")
         closest_pair = (None, None)
 
-        for a, b in itertools.product(main_component, comp):
-            dist = euclidean_3d(a, b)
-            if dist < min_dist and dist <= max_distance:
-                min_dist = dist
-                closest_pair = (a, b)
+        if engine == "kdtree":
+            comp_nodes = list(comp)
+            dist, idx = tree.query(np.asarray(comp_nodes, dtype=np.float64), k=1, distance_upper_bound=max_distance)
+            best = int(np.argmin(dist))
+            if np.isfinite(dist[best]):
+                min_dist = float(dist[best])
+                closest_pair = (main_nodes[idx[best]], comp_nodes[best])
+        elif engine == "pairwise":
+            for a, b in itertools.product(main_component, comp):
+                dist = euclidean_3d(a, b)
+                if dist < min_dist and dist <= max_distance:
+                    min_dist = dist
+                    closest_pair = (a, b)
+        else:
+            raise ValueError(f"Unsupported stitch engine: {engine}")
 
         if closest_pair[0] and closest_pair[1]:
             G.add_edge(closest_pair[0], closest_pair[1], weight=min_dist)
@@ -332,6 +337,46 @@ def stitch_subgraphs(G, max_distance=0.6):
     print("✅ Stitching complete.")
 
 
+def _stitch_spanning_forest(G, components, max_distance):
+    """Kruskal over the shortest inter-component node pairs within max_distance."""
+    import numpy as np
+    from scipy.spatial import cKDTree
+
+    nodes = [n for comp in components for n in comp]
+    labels = np.repeat(np.arange(len(components)), [len(c) for c in components])
+    coords = np.asarray(nodes, dtype=np.float64)
+
+    pairs = cKDTree(coords).query_pairs(r=max_distance, output_type="ndarray")
+    pairs = pairs[labels[pairs[:, 0]] != labels[pairs[:, 1]]]
+    dists = np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1)
+    order = np.lexsort((pairs[:, 1], pairs[:, 0], dists))
+
+    parent = list(range(len(components)))
+
+    def find(c):
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    links = 0
+    for k in order.tolist():
+        i, j = pairs[k].tolist()
+        ci, cj = find(labels[i]), find(labels[j])
+        if ci == cj:
+            continue
+        parent[ci] = cj
+        G.add_edge(nodes[i], nodes[j], weight=float(dists[k]))
+        print(f"🔗 Connected {nodes[i]} ↔ {nodes[j]} (dist: {dists[k]:.2f})")
+        links += 1
+        if links == len(components) - 1:
+            break
+
+    groups = len(components) - links
+    if groups > 1:
+        print(f"⚠️ {groups} component groups remain (no nodes within {max_distance}m).")
+
+
 def get_outside_doors_by_room(G, limit_debug_prints=10):
     """
     Return a dictionary mapping actual room_id → list of door node coordinates.
@@ -415,22 +460,10 @@ def get_outside_doors_by_room(G, limit_debug_prints=10):
 def prompt_emergency_exit_selection(G):
     import os
     import json
-    import pickle
 
-    # 🔍 Try to infer level_name from graphs/ folder by comparing object hashes
-    level_name = None
+    # 🔍 Level name from the graph itself, or the graphs/ manifest for older graphs
     graphs_dir = os.path.join(os.path.dirname(__file__), "graphs")
-    for filename in os.listdir(graphs_dir):
-        if filename.startswith("G_") and filename.endswith(".pkl"):
-            path = os.path.join(graphs_dir, filename)
-            try:
-                with open(path, "rb") as f:
-                    G_candidate = pickle.load(f)
-                if G_candidate.number_of_nodes() == G.number_of_nodes() and set(G_candidate.nodes) == set(G.nodes):
-                    level_name = filename.replace(".pkl", "").split("_")[-1]
-                    break
-            except Exception as e:
-                continue
+    level_name = find_floor_level(G, graphs_dir)
 
     if not level_name:
         print("⚠️ Could not determine level name by inspecting graph folder.")
@@ -539,35 +572,44 @@ def prompt_emergency_exit_selection(G):
 #     return all_exit_paths
 
 
+def resolve_room_start_node(G, room_id, start_node, furniture_list=None):
+    """
+    Return the node a room's egress path starts from: the in-room node farthest from the
+    room's doors when there is no furniture, otherwise the given start_node.
+    """
+    import numpy as np
+
+    room_index = get_room_index(G)
+    room_nodes = room_index["room_nodes"].get(room_id)
+
+    # Extend in-room path if no furniture is present
+    if not furniture_list and room_nodes is not None:
+        door_nodes = room_index["room_doors"].get(room_id, [])
+        if door_nodes:
+            door_center = door_nodes[0] if len(door_nodes) == 1 else tuple(
+                sum(coord) / len(door_nodes) for coord in zip(*door_nodes)
+            )
+            dist_to_door = np.sqrt(((room_nodes - np.asarray(door_center)) ** 2).sum(axis=1))
+            longest_in_room_node = tuple(room_nodes[int(np.argmax(dist_to_door))].tolist())
+            print(f"🧭 Room {room_id} → using longest in-room node: {longest_in_room_node}")
+            start_node = longest_in_room_node
+
+    return start_node
+
+
 def compute_exit_paths_for_room(
     G, room_id, start_node, fallback_exits, outside_exits_by_room,
     selected_door_ids, selected_stair_ids,
     furniture_list=None, algorithm="a_star", max_jump_distance=2.0,
-    node_to_component=None
+    node_to_component=None, blocker_index=None
 ):
-    from pathfinding_algorithms import a_star, theta_star
+    from pathfinding_algorithms import a_star, theta_star, build_blocker_index
     from helpers import euclidean_distance
 
     door_width_lookup = G.graph.get("door_width_lookup", {})
     all_exit_paths = []
 
-    # Identify nodes in room
-    room_nodes = [n for n, data in G.nodes(data=True) if data.get("room_id") == room_id]
-
-    # Extend in-room path if no furniture is present
-    if not furniture_list and room_nodes:
-        door_nodes = [
-            n for n in G.nodes if G.nodes[n].get("type") == "door" and G.nodes[n].get("room_id") == room_id
-        ]
-        if door_nodes:
-            door_center = door_nodes[0] if len(door_nodes) == 1 else tuple(
-                sum(coord) / len(door_nodes) for coord in zip(*door_nodes)
-            )
-            def dist_to_door(n):
-                return euclidean_distance(n, door_center)
-            longest_in_room_node = max(room_nodes, key=dist_to_door)
-            print(f"🧭 Room {room_id} → using longest in-room node: {longest_in_room_node}")
-            start_node = longest_in_room_node
+    start_node = resolve_room_start_node(G, room_id, start_node, furniture_list)
 
     # Collect exits
     exit_sets = []
@@ -593,16 +635,17 @@ def compute_exit_paths_for_room(
                 if algorithm == "a_star":
                     path = a_star(G, start_node, exit_node)
                 elif algorithm == "theta_star":
-                    wall_segments = G.graph.get("wall_segments", [])
-                    room_boundaries = G.graph.get("room_boundaries", [])
-                    blockers = wall_segments + room_boundaries
+                    if blocker_index is None:
+                        blocker_index = build_blocker_index(
+                            G.graph.get("wall_segments", []) + G.graph.get("room_boundaries", []),
+                            furniture_list
+                        )
                     path = theta_star(
                         G,
                         start_node,
                         exit_node,
-                        blockers=blockers,
-                        furniture=furniture_list or [],
-                        max_jump_distance=max_jump_distance
+                        max_jump_distance=max_jump_distance,
+                        blocker_index=blocker_index
                     )
                 else:
                     raise ValueError(f"Unsupported algorithm: {algorithm}")
@@ -642,13 +685,115 @@ def compute_exit_paths_for_room(
     return all_exit_paths
 
 
+def compute_exit_paths_multi_source(
+    G, room_start_nodes, fallback_exits, outside_exits_by_room,
+    furniture_list=None, algorithm="a_star", max_jump_distance=2.0, blocker_index=None
+):
+    """
+    Egress paths for all rooms from one reverse Dijkstra pass per exit category, instead of
+    one search per (room, exit) pair.
+
+    The outside_exit pass is seeded from the outside exits of every room. If the exit a room
+    reaches is not one of its own outside exits, that room gets a dedicated pass seeded from its
+    own exits (cached per exit set). For theta_star, the passes are any-angle with the same
+    blockers, restricted rooms and jump limit.
+    """
+    from pathfinding_algorithms import multi_source_dijkstra, path_to_source, build_blocker_index
+    from helpers import euclidean_distance
+
+    if algorithm not in ("a_star", "theta_star"):
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
 
-def find_shortest_paths(G, doors=None, rooms=None, algorithm="a_star", blockers=None, max_jump_distance=2.0):
+    restricted = algorithm == "theta_star"
+    combined_blockers = None
+    if restricted:
+        combined_blockers = blocker_index if blocker_index is not None else build_blocker_index(
+            G.graph.get("wall_segments", []) + G.graph.get("room_boundaries", []),
+            furniture_list
+        )
+
+    def solve(sources):
+        return multi_source_dijkstra(
+            G, sources, restricted=restricted,
+            blockers=combined_blockers, max_jump_distance=max_jump_distance
+        )
+
+    door_width_lookup = G.graph.get("door_width_lookup", {})
+
+    all_outside_exits = list(dict.fromkeys(
+        n for nodes in outside_exits_by_room.values() for n in nodes
+    ))
+    fields = {
+        "default_exit": solve(fallback_exits),
+        "outside_exit": solve(all_outside_exits),
+    }
+    room_fields = {}
+    print(f"🧮 Multi-source egress fields: {len(fallback_exits)} default exits, "
+          f"{len(all_outside_exits)} outside exits")
+
+    all_paths = []
+    for room_id, start_node in room_start_nodes.items():
+        if start_node not in G:
+            continue
+        start_node = resolve_room_start_node(G, room_id, start_node, furniture_list)
+
+        exit_sets = []
+        room_exit_nodes = outside_exits_by_room.get(room_id, [])
+        if room_exit_nodes:
+            exit_sets.append(("outside_exit", room_exit_nodes))
+        exit_sets.append(("default_exit", fallback_exits))
+
+        for exit_label, exit_nodes in exit_sets:
+            dist, next_hop, reached = fields[exit_label]
+
+            if exit_label == "outside_exit" and reached.get(start_node) not in set(exit_nodes):
+                # Nearest outside exit belongs to another room → search this room's exits only
+                key = frozenset(exit_nodes)
+                if key not in room_fields:
+                    room_fields[key] = solve(exit_nodes)
+                dist, next_hop, reached = room_fields[key]
+
+            path = path_to_source(start_node, next_hop, reached)
+
+            if not path or len(path) < 2:
+                print(f"❌ No valid path found for room {room_id} via {exit_label}")
+                continue
+
+            exit_node = path[-1]
+            exit_source_id = G.nodes[exit_node].get("source_id")
+            exit_door_width = door_width_lookup.get(exit_source_id)
+
+            print(f"📏 Room {room_id} → {exit_label} → Exit ID: {exit_source_id} → Width: {exit_door_width}")
+
+            all_paths.append({
+                "room_id": room_id,
+                "start_node": start_node,
+                "exit_node": exit_node,
+                "exit_source_id": exit_source_id,
+                "exit_type": exit_label,
+                "exit_door_width": exit_door_width,
+                "path": path,
+                "distance_m": sum(euclidean_distance(u, v) for u, v in zip(path[:-1], path[1:]))
+            })
+
+    return all_paths
+
+
+def find_shortest_paths(G, doors=None, rooms=None, algorithm="a_star", blockers=None, max_jump_distance=2.0,
+                        solver="pairwise"):
+    """
+    Compute egress paths from every room start node to its nearest exits.
+
+    solver="pairwise" runs one search per (room, exit) pair; solver="multi_source" computes
+    all rooms from one reverse Dijkstra pass per exit category. With algorithm="a_star" the
+    multi_source passes use the raw edge weights, without a_star's diagonal_penalty_factor and
+    turn_penalty, so they can pick different (shorter but turnier) routes than pairwise a_star.
+    """
     import networkx as nx
     import pickle
     import os
 
-    from pathfinding_algorithms import euclidean_distance
+    from pathfinding_algorithms import euclidean_distance, build_blocker_index
     from path_of_travel import get_outside_doors_by_room, prompt_emergency_exit_selection
 
     selected_door_ids, selected_stair_ids = prompt_emergency_exit_selection(G)
@@ -701,6 +846,31 @@ def find_shortest_paths(G, doors=None, rooms=None, algorithm="a_star", blockers=
     else:
         fallback_exits = G.graph["exit_nodes"]
 
+    # Selected exits are no longer doors, so index rooms against the final node types
+    build_room_index(G)
+
+    # Blockers (walls, room boundaries, furniture outlines) are indexed once per floor
+    blocker_index = None
+    if algorithm == "theta_star":
+        blocker_index = build_blocker_index(
+            G.graph.get("wall_segments", []) + G.graph.get("room_boundaries", []),
+            furniture_list
+        )
+        print(f"🧱 Indexed {len(blocker_index)} blocker segments")
+
+    if solver == "multi_source":
+        all_paths = compute_exit_paths_multi_source(
+            G, room_start_nodes, fallback_exits, outside_exits_by_room,
+            furniture_list=furniture_list,
+            algorithm=algorithm,
+            max_jump_distance=max_jump_distance,
+            blocker_index=blocker_index
+        )
+        print(f"✅ Found {len(all_paths)} paths from room centers to exits.")
+        return all_paths
+    elif solver != "pairwise":
+        raise ValueError(f"Unsupported solver: {solver}")
+
     components = list(nx.connected_components(G))
     node_to_component = {node: i for i, comp in enumerate(components) for node in comp}
 
@@ -714,7 +884,8 @@ def find_shortest_paths(G, doors=None, rooms=None, algorithm="a_star", blockers=
             furniture_list=furniture_list,
             algorithm=algorithm,
             max_jump_distance=max_jump_distance,
-            node_to_component=node_to_component
+            node_to_component=node_to_component,
+            blocker_index=blocker_index
         )
         all_paths.extend(room_paths)
 
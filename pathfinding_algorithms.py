@@ -1,5 +1,6 @@
 import heapq
 import math
+from spatial_index import BlockerIndex
 
 def euclidean_distance(p1, p2):
     return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2 + (p1[2] - p2[2]) ** 2) ** 0.5
@@ -38,27 +39,34 @@ def is_jump_allowed(graph, p1, p2):
     return True
 
 
+def reconstruct_path(came_from, current):
+    """Walk came_from back to the start (whose parent is missing or None) and return start → current."""
+    path = [current]
+    while came_from.get(current) is not None:
+        current = came_from[current]
+        path.append(current)
+    path.reverse()
+    return path
+
+
 def a_star(graph, start, goal, diagonal_penalty_factor=1.05, turn_penalty=0.4):
+    # Scores are only stored for touched nodes, so a query costs what it explores
+    inf = float('inf')
     open_set = []
     heapq.heappush(open_set, (0, start))
 
     came_from = {}
-    g_score = {node: float('inf') for node in graph.nodes}
-    g_score[start] = 0
-
-    f_score = {node: float('inf') for node in graph.nodes}
-    f_score[start] = euclidean_distance(start, goal)
+    g_score = {start: 0}
+    closed = set()
 
     while open_set:
         _, current = heapq.heappop(open_set)
+        if current in closed:
+            continue  # Stale heap entry
+        closed.add(current)
 
         if current == goal:
-            path = []
-            while current in came_from:
-                path.insert(0, current)
-                current = came_from[current]
-            path.insert(0, start)
-            return path
+            return reconstruct_path(came_from, current)
 
         for neighbor in graph.neighbors(current):
             weight = graph.edges[current, neighbor]['weight']
@@ -75,11 +83,11 @@ def a_star(graph, start, goal, diagonal_penalty_factor=1.05, turn_penalty=0.4):
             weight += compute_turn_penalty(prev, current, neighbor, turn_penalty)
 
             tentative_g_score = g_score[current] + weight
-            if tentative_g_score < g_score[neighbor]:
+            if tentative_g_score < g_score.get(neighbor, inf):
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + euclidean_distance(neighbor, goal)
-                heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                closed.discard(neighbor)  # Reopen if a closed node got cheaper
+                heapq.heappush(open_set, (tentative_g_score + euclidean_distance(neighbor, goal), neighbor))
 
     return None  # No path found
 
@@ -157,74 +165,161 @@ def a_star(graph, start, goal, diagonal_penalty_factor=1.05, turn_penalty=0.4):
 
 #     return None
 
-def theta_star(graph, start, goal, blockers=None, furniture=None, max_jump_distance=2.0):
-    import math
-    import heapq
+# ⛔ Rooms that paths may not cross into (e.g. shafts)
+RESTRICTED_ROOMS = {"WASTE", "STORAGE", "KITCHEN", "MECHANICAL", "ELECTRICAL", "CHEMICAL"}
+
+
+def is_restricted(name):
+    return any(keyword in name for keyword in RESTRICTED_ROOMS)
 
-    def euclidean_distance(p1, p2):
-        return math.sqrt(sum([(p1[i] - p2[i]) ** 2 for i in range(3)]))
 
-    def do_segments_intersect(p1, p2, q1, q2):
-        def ccw(a, b, c):
-            return (c[1] - a[1]) * (b[0] - a[0]) > (b[1] - a[1]) * (c[0] - a[0])
-        return (ccw(p1, q1, q2) != ccw(p2, q1, q2)) and (ccw(p1, p2, q1) != ccw(p1, p2, q2))
+def do_segments_intersect(p1, p2, q1, q2):
+    def ccw(a, b, c):
+        return (c[1] - a[1]) * (b[0] - a[0]) > (b[1] - a[1]) * (c[0] - a[0])
+    return (ccw(p1, q1, q2) != ccw(p2, q1, q2)) and (ccw(p1, p2, q1) != ccw(p1, p2, q2))
 
-    def line_of_sight(p1, p2, blockers, max_dist=None):
-        if max_dist and euclidean_distance(p1, p2) > max_dist:
+
+def line_of_sight(p1, p2, blockers, max_dist=None):
+    if max_dist and euclidean_distance(p1, p2) > max_dist:
+        return False
+    if isinstance(blockers, BlockerIndex):
+        return not blockers.intersects_any(p1, p2)
+    for seg_start, seg_end in blockers or []:
+        if do_segments_intersect((p1[0], p1[1]), (p2[0], p2[1]), seg_start, seg_end):
             return False
-        for seg_start, seg_end in blockers or []:
-            if do_segments_intersect((p1[0], p1[1]), (p2[0], p2[1]), seg_start, seg_end):
-                return False
-        return True
+    return True
+
 
-    # 🔲 Convert furniture to blocker segments
+def furniture_to_blockers(furniture):
+    """🔲 Convert furniture bounding boxes to blocker segments."""
     furniture_blockers = []
-    if furniture:
-        for obj in furniture:
-            if hasattr(obj, "bbox") and obj.bbox:
-                try:
-                    bb = obj.bbox  # Expected to be an object with xSize, ySize, zSize and a transform
-                    tx = obj.transform.matrix[3] / 1000.0
-                    ty = obj.transform.matrix[7] / 1000.0
-                    w = bb.xSize / 2000.0
-                    h = bb.ySize / 2000.0
-                    x1, x2 = tx - w, tx + w
-                    y1, y2 = ty - h, ty + h
-                    furniture_blockers += [
-                        ((x1, y1), (x2, y1)),
-                        ((x2, y1), (x2, y2)),
-                        ((x2, y2), (x1, y2)),
-                        ((x1, y2), (x1, y1)),
-                    ]
-                except Exception as e:
-                    print(f"⚠️ Skipping furniture due to error: {e}")
-
-    combined_blockers = (blockers or []) + furniture_blockers
-
-    # ⛔ Optional: avoid crossing into restricted rooms (e.g. shafts)
-    restricted_rooms = {"WASTE", "STORAGE", "KITCHEN", "MECHANICAL", "ELECTRICAL", "CHEMICAL"}
-
-    def is_restricted(name):
-        return any(keyword in name for keyword in restricted_rooms)
+    for obj in furniture or []:
+        if hasattr(obj, "bbox") and obj.bbox:
+            try:
+                bb = obj.bbox  # Expected to be an object with xSize, ySize, zSize and a transform
+                tx = obj.transform.matrix[3] / 1000.0
+                ty = obj.transform.matrix[7] / 1000.0
+                w = bb.xSize / 2000.0
+                h = bb.ySize / 2000.0
+                x1, x2 = tx - w, tx + w
+                y1, y2 = ty - h, ty + h
+                furniture_blockers += [
+                    ((x1, y1), (x2, y1)),
+                    ((x2, y1), (x2, y2)),
+                    ((x2, y2), (x1, y2)),
+                    ((x1, y2), (x1, y1)),
+                ]
+            except Exception as e:
+                print(f"⚠️ Skipping furniture due to error: {e}")
+    return furniture_blockers
+
+
+def multi_source_dijkstra(graph, sources, restricted=False, blockers=None, max_jump_distance=2.0):
+    """
+    One Dijkstra pass seeded from every node in sources at distance 0, run over the
+    reversed travel direction (from exits back towards rooms).
+
+    Returns (dist, next_hop, reached) dicts: for every node that can reach a source, its
+    distance to the nearest source, the next node on the way there and which source it reaches.
+    With restricted=True, moves into a restricted room from a different room are forbidden,
+    matching theta_star. With blockers given, relaxation is any-angle like theta_star: a node
+    may skip straight to its neighbour's next hop when that is in line of sight.
+    """
+    any_angle = blockers is not None
+    dist = {}
+    next_hop = {}
+    reached = {}
+    open_set = []
+    counter = 0
+
+    for source in sources:
+        if source in graph and source not in dist:
+            dist[source] = 0.0
+            reached[source] = source
+            heapq.heappush(open_set, (0.0, counter, source))
+            counter += 1
+
+    done = set()
+    while open_set:
+        d, _, current = heapq.heappop(open_set)
+        if current in done:
+            continue
+        done.add(current)
+
+        # Travel goes neighbor → current
+        if restricted:
+            current_room = graph.nodes[current].get("room_name", "").upper().strip()
+            current_blocked = is_restricted(current_room)
+
+        for neighbor, edge_data in graph.adj[current].items():
+            if neighbor in done:
+                continue
+            if restricted and current_blocked:
+                neighbor_room = graph.nodes[neighbor].get("room_name", "").upper().strip()
+                if neighbor_room != current_room:
+                    continue
+
+            parent = next_hop.get(current) if any_angle else None
+            if parent is not None and line_of_sight(neighbor, parent, blockers, max_jump_distance):
+                hop = parent
+                tentative = dist[parent] + euclidean_distance(neighbor, parent)
+            else:
+                hop = current
+                tentative = d + edge_data.get("weight", euclidean_distance(current, neighbor))
+
+            if tentative < dist.get(neighbor, float("inf")):
+                dist[neighbor] = tentative
+                next_hop[neighbor] = hop
+                reached[neighbor] = reached[current]
+                heapq.heappush(open_set, (tentative, counter, neighbor))
+                counter += 1
+
+    return dist, next_hop, reached
+
+
+def path_to_source(start, next_hop, reached):
+    """Follow next_hop pointers from start to the source it reaches."""
+    if start not in reached:
+        return None
+    path = [start]
+    current = start
+    while current in next_hop:
+        current = next_hop[current]
+        path.append(current)
+    return path
+
+
+def build_blocker_index(blockers=None, furniture=None, cell_size=1.0):
+    """Index walls/boundaries plus furniture outlines once per floor, for reuse across theta_star calls."""
+    return BlockerIndex((blockers or []) + furniture_to_blockers(furniture), cell_size=cell_size)
+
 
+def theta_star(graph, start, goal, blockers=None, furniture=None, max_jump_distance=2.0, blocker_index=None):
+    import math
+    import heapq
+
+    def euclidean_distance(p1, p2):
+        return math.sqrt(sum([(p1[i] - p2[i]) ** 2 for i in range(3)]))
+
+    # A prebuilt blocker_index replaces blockers + furniture
+    combined_blockers = blocker_index if blocker_index is not None else (blockers or []) + furniture_to_blockers(furniture)
+
+    inf = float('inf')
     open_set = []
     heapq.heappush(open_set, (0, start))
 
     came_from = {start: None}
-    g_score = {node: float('inf') for node in graph.nodes}
-    g_score[start] = 0
-
-    f_score = {node: float('inf') for node in graph.nodes}
-    f_score[start] = euclidean_distance(start, goal)
+    g_score = {start: 0}
+    closed = set()
 
     while open_set:
         _, current = heapq.heappop(open_set)
+        if current in closed:
+            continue  # Stale heap entry
+        closed.add(current)
+
         if current == goal:
-            path = []
-            while current:
-                path.insert(0, current)
-                current = came_from[current]
-            return path
+            return reconstruct_path(came_from, current)
 
         current_data = graph.nodes[current]
         current_room_name = current_data.get('room_name', '').upper().strip()
@@ -239,18 +334,18 @@ def theta_star(graph, start, goal, blockers=None, furniture=None, max_jump_dista
             parent = came_from.get(current)
             if parent and line_of_sight(parent, neighbor, combined_blockers, max_jump_distance):
                 tentative_g = g_score[parent] + euclidean_distance(parent, neighbor)
-                if tentative_g < g_score[neighbor]:
+                if tentative_g < g_score.get(neighbor, inf):
                     came_from[neighbor] = parent
                     g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + euclidean_distance(neighbor, goal)
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                    closed.discard(neighbor)
+                    heapq.heappush(open_set, (tentative_g + euclidean_distance(neighbor, goal), neighbor))
             else:
                 weight = graph.edges[current, neighbor]['weight']
                 tentative_g = g_score[current] + weight
-                if tentative_g < g_score[neighbor]:
+                if tentative_g < g_score.get(neighbor, inf):
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + euclidean_distance(neighbor, goal)
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                    closed.discard(neighbor)
+                    heapq.heappush(open_set, (tentative_g + euclidean_distance(neighbor, goal), neighbor))
 
     return None  # No path found
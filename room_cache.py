@@ -0,0 +1,212 @@
+# room_cache.py
+# SQLite store of LLM answers about rooms (classification, OLF) and classification groups
+# (max occupancy), replacing the whole-file rewrites of cached_data/classification_index.json.
+#
+# Every answer is keyed by (kind, normalized room name or group, code PDF, prompt version), so
+# switching the code PDF or changing a prompt never serves a stale answer. The database runs in
+# WAL mode, so the parallel LLM workers can read while one of them writes a batch.
+
+import os
+import json
+import time
+import atexit
+import sqlite3
+import threading
+
+DEFAULT_ROOM_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "cached_data", "room_knowledge.sqlite"
+)
+LEGACY_JSON_PATH = os.path.join("cached_data", "classification_index.json")
+
+KINDS = ("classification", "olf", "max_occupancy")
+
+# Bump a kind's version when its prompt changes: answers cached under other versions are ignored
+PROMPT_VERSIONS = {"classification": "1", "olf": "1", "max_occupancy": "1"}
+
+# SQLite caps the number of host parameters per statement
+_CHUNK = 500
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def normalize_key(name):
+    return (name or "").upper().strip()
+
+
+def code_pdf_key(code_pdf=None):
+    """Code PDF part of the key: the SELECTED_CODE_PDF file name without folder or extension."""
+    code_pdf = code_pdf or os.environ.get("SELECTED_CODE_PDF") or ""
+    return os.path.splitext(os.path.basename(code_pdf))[0]
+
+
+class RoomKnowledgeCache:
+    """
+    get_many()/put_many() read and write one kind of answer for many keys in one statement or
+    transaction. Hits and misses are counted per instance and in total across runs (stats()).
+    """
+
+    def __init__(self, path=DEFAULT_ROOM_CACHE_PATH, timeout_s=30.0):
+        self.path = path
+        self.counts = {kind: {"hits": 0, "misses": 0} for kind in KINDS}
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=timeout_s, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                code_pdf TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (kind, key, code_pdf, prompt_version)
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def _count(self, kind, hits, misses):
+        self.counts[kind]["hits"] += hits
+        self.counts[kind]["misses"] += misses
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                [(f"{kind}.hits", hits), (f"{kind}.misses", misses)]
+            )
+
+    def get_many(self, kind, keys, code_pdf=None, prompt_version=None):
+        """{key: cached value} for the keys that have an answer; keys are normalized first."""
+        keys = list(dict.fromkeys(normalize_key(k) for k in keys))
+        code_pdf = code_pdf_key(code_pdf)
+        prompt_version = prompt_version or PROMPT_VERSIONS[kind]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _CHUNK):
+                chunk = keys[start:start + _CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM answers WHERE kind = ? AND code_pdf = ? AND prompt_version = ? "
+                    f"AND key IN ({', '.join('?' * len(chunk))})",
+                    (kind, code_pdf, str(prompt_version), *chunk)
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+            self._count(kind, len(found), len(keys) - len(found))
+        return found
+
+    def put_many(self, kind, values, code_pdf=None, prompt_version=None, now=None):
+        """Store {key: value} in one transaction; None values are skipped. Returns the number stored."""
+        now = time.time() if now is None else now
+        code_pdf = code_pdf_key(code_pdf)
+        prompt_version = prompt_version or PROMPT_VERSIONS[kind]
+        rows = [
+            (kind, normalize_key(key), code_pdf, str(prompt_version), json.dumps(value), now)
+            for key, value in values.items() if value is not None
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO answers (kind, key, code_pdf, prompt_version, value, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def items(self, kind, code_pdf=None, prompt_version=None):
+        """Every cached {key: value} of one kind."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, value FROM answers WHERE kind = ? AND code_pdf = ? AND prompt_version = ?",
+                (kind, code_pdf_key(code_pdf), str(prompt_version or PROMPT_VERSIONS[kind]))
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def import_json(self, json_path=LEGACY_JSON_PATH, code_pdf=None):
+        """
+        One-time import of the old classification_index.json under code_pdf (default: the selected
+        one). Max occupancy moves from the room entries to their classification group. Returns the
+        number of answers imported, 0 if the file is missing or was imported before.
+        """
+        marker = f"imported:{os.path.abspath(json_path)}"
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE name = ?", (marker,)).fetchone():
+                return 0
+        if not os.path.exists(json_path):
+            return 0
+
+        try:
+            with open(json_path, "r") as f:
+                index = json.load(f)
+        except json.JSONDecodeError:
+            print(f"[WARNING] {json_path} is corrupted; nothing imported.")
+            index = {}
+
+        answers = {kind: {} for kind in KINDS}
+        for room_name, data in index.items():
+            if not isinstance(data, dict):
+                continue
+            if data.get("classification"):
+                answers["classification"][room_name] = data["classification"]
+            if data.get("olf"):
+                answers["olf"][room_name] = list(data["olf"])
+            if data.get("classification") and data.get("max_occupancy"):
+                answers["max_occupancy"].setdefault(normalize_key(data["classification"]), data["max_occupancy"])
+
+        imported = sum(
+            self.put_many(kind, values, code_pdf)
+            for kind, values in answers.items()
+        )
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                (marker, json.dumps({"code_pdf": code_pdf_key(code_pdf), "answers": imported, "at": time.time()}))
+            )
+        print(f"[CACHE] Imported {imported} answer(s) from {json_path} into {self.path}")
+        return imported
+
+    def stats(self):
+        with self._lock:
+            entries = dict(self.conn.execute("SELECT kind, COUNT(*) FROM answers GROUP BY kind").fetchall())
+            totals = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+
+        stats = {}
+        for kind in KINDS:
+            hits, misses = self.counts[kind]["hits"], self.counts[kind]["misses"]
+            total_hits, total_misses = totals.get(f"{kind}.hits", 0), totals.get(f"{kind}.misses", 0)
+            stats[kind] = {
+                "entries": entries.get(kind, 0),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+                "total_hits": total_hits,
+                "total_misses": total_misses,
+                "total_hit_rate": total_hits / (total_hits + total_misses) if total_hits + total_misses else None,
+            }
+        return stats
+
+    def close(self):
+        self.conn.close()
+
+
+def get_room_cache(path=None):
+    """
+    The process-wide cache at path (default: ROOM_CACHE_PATH or cached_data/room_knowledge.sqlite).
+    It imports the legacy JSON cache the first time it is opened.
+    """
+    path = path or os.getenv("ROOM_CACHE_PATH") or DEFAULT_ROOM_CACHE_PATH
+    with _shared_lock:
+        if path not in _shared:
+            cache = _shared[path] = RoomKnowledgeCache(path)
+            atexit.register(cache.close)
+            cache.import_json()
+        return _shared[path]
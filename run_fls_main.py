@@ -10,12 +10,14 @@ from specklepy.api.client import SpeckleClient
 from specklepy.api.wrapper import StreamWrapper
 from specklepy.transports.server import ServerTransport
 from specklepy.objects.base import Base
-from specklepy.api import operations
 from specklepy.objects.units import get_units_from_string
 
 from extract_elements import extract_elements_by_type
 from code_compliance import compute_compliance_check, floor_fls_parameters
 from send_utils import send_model_to_speckle_per_floor
+from floor_graph import load_floor_graph, list_floor_graphs, level_name_from_graph_path
+from speckle_cache import receive_cached
+from level_hashes import PATHS_STATE_PATH, FLS_STATE_PATH, input_key, load_state, save_state
 from speckle_credentials import SPECKLE_SERVER_URL, PROJECT_ID, MODEL_ID, SPECKLE_TOKEN_FLS
 
 
@@ -49,7 +51,7 @@ commits = client.commit.list(PROJECT_ID, MODEL_ID)
 default_commit = branch.commits.items[-1] if branch.commits.items else None
 
 transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-speckle_data = operations.receive(default_commit.referencedObject, transport)
+speckle_data = receive_cached(default_commit.referencedObject, transport)
 
 # Extract building elements
 elements_extracted = extract_elements_by_type(speckle_data.elements)
@@ -99,16 +101,24 @@ def safe_json_value(val):
 graph_dir = "graphs"
 path_dir = "paths"
 
-for graph_file in sorted(os.listdir(graph_dir)):
-    if not graph_file.endswith(".pkl"):
+# ⏭️ Floors whose paths inputs and code document are unchanged keep their last report
+paths_state = load_state(PATHS_STATE_PATH)
+fls_state = load_state(FLS_STATE_PATH)
+force_fls = os.getenv("FLS_FORCE") == "1"
+
+for graph_path in list_floor_graphs(graph_dir):
+    level_name = level_name_from_graph_path(graph_path)
+
+    fls_key = input_key(paths_state[level_name], selected_pdf) if level_name in paths_state else None
+    report_exists = os.path.exists(f"compliance_reports/compliance_report_{level_name}.json")
+    if not force_fls and fls_key and fls_state.get(level_name) == fls_key and report_exists:
+        print(f"\n⏭️ Floor {level_name} unchanged → keeping existing compliance report", flush=True)
         continue
 
-    level_name = graph_file.split("_")[-1].replace(".pkl", "")
     print(f"\n📘 Running FLS Check for Floor: {level_name}", flush=True)
 
     try:
-        with open(os.path.join(graph_dir, graph_file), "rb") as f:
-            G_floor = pickle.load(f)
+        G_floor = load_floor_graph(graph_path)
     except Exception as e:
         print(f"❌ Failed to load graph: {e}", flush=True)
         continue
@@ -232,4 +242,8 @@ for graph_file in sorted(os.listdir(graph_dir)):
             message_prefix="Fire Safety Compliance – Check"
         )
 
+    if fls_key:
+        fls_state[level_name] = fls_key
+        save_state(FLS_STATE_PATH, fls_state)
+
 print("\n✅ FLS Parameters + Compliance Review Complete.", flush=True)
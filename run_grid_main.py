@@ -1,11 +1,12 @@
 import os
-import pickle
 import sys
 import io
+import argparse
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')  # Ensure UTF-8 encoding for stdout
 from specklepy.api.client import SpeckleClient
 from specklepy.api.wrapper import StreamWrapper
-from specklepy.api import operations
 from specklepy.transports.server import ServerTransport
 
 
@@ -21,15 +22,14 @@ from generate_grid_test import (
     group_walls_by_level,
     group_doors_by_level,
     group_stairs_by_level,
-    assign_room_metadata_to_nodes,
-    generate_extended_gridlines_per_floor,
-    trim_gridlines, 
     compute_global_bounds,
-    create_graph,
-    add_doors_on_grid, 
-    add_stairs_on_grid
+    compute_level_bounds
 )
-from send_utils import graph_to_speckle_objects, send_graph_to_speckle_per_floor
+from send_utils import graph_to_speckle_objects, send_graph_to_speckle_per_floor, UploadQueue
+from grid_pipeline import pack_level, build_level_graph, unpack_wall_lines
+from speckle_cache import receive_cached
+from floor_graph import floor_graph_path, floor_summary, update_manifest
+from level_hashes import LEVEL_HASHES_PATH, level_geometry_hash, load_state, save_state
 # 🛠️ Patch Speckle units to ignore invalid unit strings like "฿"
 from specklepy.objects.base import Base
 from specklepy.objects.units import get_units_from_string
@@ -54,131 +54,225 @@ Base.units = property(
     fdel=original_units.fdel if original_units else None
 )
 
-# Construct wrapper
-project_url = f"{SPECKLE_SERVER_URL}/streams/{PROJECT_ID}/branches/main"
-wrapper = StreamWrapper(project_url)
-
-# Initialize Speckle client
-client = SpeckleClient(host=SPECKLE_SERVER_URL)
-client.authenticate_with_token(SPECKLE_TOKEN_STG)
-
-print("Speckle Client Authenticated.")
-
-# Fetch Stream details
-stream = client.stream.get(PROJECT_ID)
-
-if stream:
-    print(f"Stream Name: {stream.name}")
-    print(f"Stream ID: {stream.id}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build per-floor navigation graphs")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("GRID_WORKERS", os.cpu_count() or 1)),
+        help="Worker processes for per-level graph building (1 = in-process)"
+    )
+    parser.add_argument(
+        "--upload-workers", type=int, default=int(os.getenv("GRID_UPLOAD_WORKERS", 2)),
+        help="Concurrent Speckle uploads"
+    )
+    parser.add_argument(
+        "--full", action="store_true", default=os.getenv("GRID_FULL_REBUILD") == "1",
+        help="Rebuild every level instead of only the levels whose geometry hash changed"
+    )
+    parser.add_argument(
+        "--trim-engine", choices=("per_line", "batch", "raster"), default=os.getenv("GRID_TRIM_ENGINE", "batch"),
+        help="Gridline trimming engine (raster approximates the geometric trim, for very large floors)"
+    )
+    parser.add_argument(
+        "--trim-agreement", action="store_true", default=os.getenv("GRID_TRIM_AGREEMENT") == "1",
+        help="With the raster engine, also run the geometric trim and print how closely they agree"
+    )
+    parser.add_argument(
+        "--discretization", choices=("uniform", "quadtree"), default=os.getenv("GRID_DISCRETIZATION", "uniform"),
+        help="uniform 0.5 m grid, or quadtree cells (coarse in open interiors, fine near walls/doors/stairs)"
+    )
+    parser.add_argument(
+        "--max-cell", type=float, default=float(os.getenv("GRID_MAX_CELL", 8.0)),
+        help="Largest quadtree cell size in meters"
+    )
+    parser.add_argument(
+        "--grid-bounds", choices=("level", "global"), default=os.getenv("GRID_BOUNDS", "level"),
+        help="Lay each level's grid over its own footprint (snapped to the global lattice) or over the whole building"
+    )
+    parser.add_argument(
+        "--tagging", choices=("vectorized", "sparse"), default=os.getenv("GRID_TAGGING", "vectorized"),
+        help="Room tagging over the level raster, or per-room sub-grids on the same lattice (same result)"
+    )
+    args, _ = parser.parse_known_args()
+    return args
 
-branch = client.branch.get(PROJECT_ID, MODEL_ID)
-print(f"Branch Name: {branch.name}")
-print(f"Branch ID: {branch.id}")
 
+def authenticated_client():
+    client = SpeckleClient(host=SPECKLE_SERVER_URL)
+    client.authenticate_with_token(SPECKLE_TOKEN_STG)
+    return client
 
-# Fetch Latest Commit
-commits = client.commit.list(PROJECT_ID, MODEL_ID)
-default_commit = branch.commits.items[-1] if branch.commits.items else None
 
+def main():
+    args = parse_args()
 
-# Retrieve Data from Speckle
-transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-speckle_data = operations.receive(default_commit.referencedObject, transport)
+    # Construct wrapper
+    project_url = f"{SPECKLE_SERVER_URL}/streams/{PROJECT_ID}/branches/main"
+    wrapper = StreamWrapper(project_url)
 
-# Run extraction
-elements_extracted = extract_elements_by_type(speckle_data.elements, save_to_path=True)
-rooms = elements_extracted["Rooms"]
+    # Initialize Speckle client
+    client = authenticated_client()
 
-global_bounds = compute_global_bounds(
-    elements_extracted["Rooms"],
-    elements_extracted["Walls"],
-    elements_extracted["Doors"]
-)
+    print("Speckle Client Authenticated.")
 
-# Print extraction summary
-print(f"\n✅ Extraction Summary:")
-for key, value in elements_extracted.items():
-    print(f"  {key}: {len(value)} elements")
+    # Fetch Stream details
+    stream = client.stream.get(PROJECT_ID)
 
-room_floors = group_rooms_by_level(elements_extracted["Rooms"])
-wall_floors = group_walls_by_level(elements_extracted["Walls"])
-door_floors = group_doors_by_level(elements_extracted["Doors"])
-stair_floors = group_stairs_by_level(elements_extracted["Stairs"])
+    if stream:
+        print(f"Stream Name: {stream.name}")
+        print(f"Stream ID: {stream.id}")
 
-import shutil
-graphs_dir = "graphs"
-if os.path.exists(graphs_dir):
-    shutil.rmtree(graphs_dir)
-os.makedirs(graphs_dir, exist_ok=True)
-
-for level_name, rooms_on_level in room_floors.items():
-    print(f"\n🔄 Processing Floor: {level_name} ({len(rooms_on_level)} rooms)")
-
-    walls_on_level = wall_floors.get(level_name, [])
-    doors_on_level = door_floors.get(level_name, [])
-    stairs_on_level = stair_floors.get(level_name, [])
-
-    # Generate full grid
-    gridlines_raw, _, grid_dict = generate_extended_gridlines_per_floor(
-        rooms=rooms_on_level,
-        walls=walls_on_level,
-        doors=doors_on_level,
-        spacing=0.5, # meters
-        level_name=level_name, 
-        global_bounds=global_bounds
-    )
+    branch = client.branch.get(PROJECT_ID, MODEL_ID)
+    print(f"Branch Name: {branch.name}")
+    print(f"Branch ID: {branch.id}")
 
-    # # Extract wall lines (in meters) for trimming
-    _, wall_lines_2d = create_graph(
-        rooms=rooms_on_level,
-        walls=walls_on_level,
-        doors=doors_on_level,
-        gridlines=[],  # no gridlines yet, just want wall_lines_2d
-        level_name=level_name
-    )
+    # Fetch Latest Commit
+    commits = client.commit.list(PROJECT_ID, MODEL_ID)
+    default_commit = branch.commits.items[-1] if branch.commits.items else None
 
-    final_gridlines = trim_gridlines(
-        gridlines_raw, 
-        wall_lines_2d, 
-        doors_on_level,
-        grid_dict,
-        spacing=0.5, 
-        gap_offset=0.3
-    )
+    # Retrieve Data from Speckle
+    transport = ServerTransport(client=client, stream_id=PROJECT_ID)
+    speckle_data = receive_cached(default_commit.referencedObject, transport)
 
+    # Run extraction
+    elements_extracted = extract_elements_by_type(speckle_data.elements, save_to_path=True)
 
-    # Use those edges directly (they still contain start, end, and optional room_id)
-    G_floor, wall_lines_2d = create_graph(
-        rooms=rooms_on_level,
-        walls=walls_on_level,
-        doors=doors_on_level,
-        gridlines=final_gridlines,
-        level_name=level_name
+    global_bounds = compute_global_bounds(
+        elements_extracted["Rooms"],
+        elements_extracted["Walls"],
+        elements_extracted["Doors"]
     )
 
-    # Add doors and continue with rest of processing...
-    add_doors_on_grid(G_floor, doors_on_level)
-    add_stairs_on_grid(G_floor, stairs_on_level)
-
-    # Ensure all nodes have room_id and room_name
-    # assign_room_metadata_to_nodes(G_floor, rooms_on_level)
-
-
-    
-    with open(f"{graphs_dir}/G_{level_name}.pkl", "wb") as f:
-        pickle.dump(G_floor, f)
-
-    graph_objects = graph_to_speckle_objects(
-        G_floor, 
-        level_name=level_name, 
-        wall_lines=wall_lines_2d,
-        commit_edges=True
+    # Print extraction summary
+    print(f"\n✅ Extraction Summary:")
+    for key, value in elements_extracted.items():
+        print(f"  {key}: {len(value)} elements")
+
+    room_floors = group_rooms_by_level(elements_extracted["Rooms"])
+    wall_floors = group_walls_by_level(elements_extracted["Walls"])
+    door_floors = group_doors_by_level(elements_extracted["Doors"])
+    stair_floors = group_stairs_by_level(elements_extracted["Stairs"])
+
+    graphs_dir = "graphs"
+    if args.full and os.path.exists(graphs_dir):
+        shutil.rmtree(graphs_dir)
+    os.makedirs(graphs_dir, exist_ok=True)
+
+    # 🧮 Incremental mode: only levels whose inputs hash differently are rebuilt
+    previous_hashes = load_state(LEVEL_HASHES_PATH)
+    level_hashes = {}
+    grid_bounds = {}
+    for level_name, rooms_on_level in room_floors.items():
+        if args.grid_bounds == "level":
+            grid_bounds[level_name] = compute_level_bounds(
+                rooms_on_level,
+                wall_floors.get(level_name, []),
+                door_floors.get(level_name, []),
+                global_bounds,
+                spacing=0.5
+            )
+        else:
+            grid_bounds[level_name] = global_bounds
+
+        level_hashes[level_name] = level_geometry_hash(
+            rooms_on_level,
+            wall_floors.get(level_name, []),
+            door_floors.get(level_name, []),
+            stair_floors.get(level_name, []),
+            spacing=0.5,
+            gap_offset=0.3,
+            grid_bounds=grid_bounds[level_name],
+            trim_engine=args.trim_engine,
+            discretization=args.discretization,
+            max_cell=args.max_cell if args.discretization == "quadtree" else None
         )
 
-    send_graph_to_speckle_per_floor(
-        graph_objects,
-        client,
-        PROJECT_ID,
-        level_name
-    )
\ No newline at end of file
+    # Drop graphs of levels that no longer exist in the model
+    for level_name in set(previous_hashes) - set(level_hashes):
+        for stale_path in (floor_graph_path(level_name, graphs_dir), f"{graphs_dir}/G_{level_name}.pkl"):
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        update_manifest(graphs_dir, level_name, None)
+        print(f"🗑️ Removed graph of deleted level: {level_name}")
+    current_hashes = {k: v for k, v in previous_hashes.items() if k in level_hashes}
+    save_state(LEVEL_HASHES_PATH, current_hashes)
+
+    # Each worker gets only its level's elements, stripped to what the pipeline reads
+    jobs = []
+    for level_name, rooms_on_level in room_floors.items():
+        graph_path = floor_graph_path(level_name, graphs_dir)
+        if previous_hashes.get(level_name) == level_hashes[level_name] and os.path.exists(graph_path):
+            print(f"⏭️ Floor {level_name} unchanged → keeping {graph_path}")
+            continue
+
+        print(f"\n🔄 Queued Floor: {level_name} ({len(rooms_on_level)} rooms)")
+        packed = pack_level(
+            level_name,
+            rooms_on_level,
+            wall_floors.get(level_name, []),
+            door_floors.get(level_name, []),
+            stair_floors.get(level_name, [])
+        )
+        jobs.append((level_name, packed, graph_path))
+
+    if not jobs:
+        print("\n✅ All floor graphs are up to date.")
+        return
+
+    def record_level(level_name, floor):
+        current_hashes[level_name] = level_hashes[level_name]
+        save_state(LEVEL_HASHES_PATH, current_hashes)
+        update_manifest(graphs_dir, level_name, floor_summary(floor, level_name, floor_graph_path(level_name, graphs_dir)))
+
+    def upload_level_graph(floor, wall_coords, level_name):
+        graph_objects = graph_to_speckle_objects(
+            floor.to_networkx(),
+            level_name=level_name,
+            wall_lines=unpack_wall_lines(wall_coords),
+            commit_edges=True
+        )
+        send_graph_to_speckle_per_floor(graph_objects, uploads.client(), PROJECT_ID, level_name)
+
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"\n⚙️ Building {len(jobs)} floor graph(s) with {workers} worker(s)")
+
+    # Each upload thread commits through its own client
+    with UploadQueue(max_workers=args.upload_workers, client_factory=authenticated_client) as uploads:
+        if workers == 1:
+            for level_name, packed, graph_path in jobs:
+                print(f"\n🔄 Processing Floor: {level_name}")
+                try:
+                    _, floor, wall_coords = build_level_graph(
+                        packed, grid_bounds[level_name], graph_path=graph_path, trim_engine=args.trim_engine,
+                        discretization=args.discretization, max_cell=args.max_cell, tagging=args.tagging,
+                        trim_agreement=args.trim_agreement
+                    )
+                except Exception as e:
+                    print(f"❌ Failed to build graph for floor {level_name}: {e}")
+                    continue
+                record_level(level_name, floor)
+                uploads.submit(upload_level_graph, floor, wall_coords, level_name)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(
+                        build_level_graph, packed, grid_bounds[level_name], graph_path=graph_path,
+                        trim_engine=args.trim_engine, discretization=args.discretization, max_cell=args.max_cell,
+                        tagging=args.tagging, trim_agreement=args.trim_agreement
+                    ): level_name
+                    for level_name, packed, graph_path in jobs
+                }
+                for future in as_completed(futures):
+                    level_name = futures[future]
+                    try:
+                        _, floor, wall_coords = future.result()
+                    except Exception as e:
+                        print(f"❌ Failed to build graph for floor {level_name}: {e}")
+                        continue
+                    print(f"✅ Floor {level_name} built: {floor.number_of_nodes()} nodes")
+                    record_level(level_name, floor)
+                    uploads.submit(upload_level_graph, floor, wall_coords, level_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 # run_paths_main.py
 
 import os
-import glob
 import pickle
 import sys
 import io
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')  # Ensure UTF-8 encoding for stdout
 
 from speckle_credentials import SPECKLE_SERVER_URL, PROJECT_ID, MODEL_ID, SPECKLE_TOKEN_PATHS
@@ -27,94 +30,255 @@ from debug_utils import (
     debug_door_connections
 )
 from send_utils import send_paths_to_speckle, graph_to_speckle_objects
+from floor_graph import (
+    FloorGraph, load_floor_graph, save_floor_graph, list_floor_graphs, level_name_from_graph_path, floor_summary,
+    update_manifest, get_room_index
+)
+from level_hashes import LEVEL_HASHES_PATH, PATHS_STATE_PATH, input_key, file_digest, load_state, save_state
+
+# "multi_source" (one reverse pass per exit category) or "pairwise" (one search per room/exit pair)
+PATH_SOLVER = os.getenv("PATH_SOLVER", "multi_source")
+# "main" (link fragments to the largest component) or "forest" (minimum spanning forest over all components)
+PATH_STITCH = os.getenv("PATH_STITCH", "main")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compute egress paths per floor")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("PATHS_WORKERS", os.cpu_count() or 1)),
+        help="Worker processes for per-floor pathfinding (1 = in-process)"
+    )
+    parser.add_argument(
+        "--force", action="store_true", default=os.getenv("PATHS_FORCE") == "1",
+        help="Recompute every floor, even if its inputs did not change"
+    )
+    args, _ = parser.parse_known_args()
+    return args
+
+
+def process_floor(graph_path, solver=PATH_SOLVER, capture_output=False):
+    """
+    Stitch, map start/exit nodes and compute egress paths for one floor graph.
+
+    Returns a result dict with level_name, status, paths, the updated graph as a FloorGraph
+    (for the upload in the parent), the saved graph's manifest summary, diagnostics and, with
+    capture_output, the floor's log.
+    """
+    level_name = level_name_from_graph_path(graph_path)
+    result = {
+        "level_name": level_name,
+        "status": "ok",
+        "paths": [],
+        "floor": None,
+        "summary": None,
+        "diagnostics": {},
+        "log": "",
+    }
+    started = time.perf_counter()
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log) if capture_output else contextlib.nullcontext():
+        print(f"\n🏗️ Processing Floor: {level_name}")
+        try:
+            _process_floor_graph(graph_path, level_name, solver, result)
+        except Exception as e:
+            print(f"❌ Unexpected failure on floor {level_name}: {e}")
+            result["status"] = "failed"
+
+    result["diagnostics"]["elapsed_s"] = round(time.perf_counter() - started, 2)
+    result["log"] = log.getvalue()
+    return result
+
+
+def _process_floor_graph(graph_path, level_name, solver, result):
+    diagnostics = result["diagnostics"]
+    try:
+        G = load_floor_graph(graph_path)
+    except Exception as e:
+        print(f"❌ Failed to load graph from {graph_path}: {e}")
+        result["status"] = "load_failed"
+        return
+
+    G.graph.setdefault("level_name", level_name)
+    diagnostics["nodes"] = G.number_of_nodes()
+    diagnostics["components"] = nx.number_connected_components(G)
+
+    if diagnostics["components"] > 1:
+        print("🔗 Found disconnected subgraphs → stitching required.")
+        try:
+            stitch_subgraphs(G, strategy=PATH_STITCH)
+            print("✅ Subgraphs stitched.")
+        except Exception as e:
+            print(f"❌ Stitching failed: {e}")
+            result["status"] = "stitch_failed"
+            return
+    else:
+        print("✅ Graph is already fully connected.")
+
+    try:
+        # map_room_center_to_start_nodes(G)
+        map_farthest_point_from_door(G)
+        debug_door_connections(G)
+        get_room_index(G)
+        saved = save_floor_graph(G, graph_path)
+        result["summary"] = floor_summary(saved, level_name, graph_path)
+        print("💾 Updated graph saved with start/exit nodes.")
+    except Exception as e:
+        print(f"❌ Failed to update graph with start/exit metadata: {e}")
+        result["status"] = "mapping_failed"
+        return
+
+    try:
+        paths = find_shortest_paths(G, algorithm="theta_star", max_jump_distance=2.0, solver=solver)
+    except Exception as e:
+        print(f"❌ Pathfinding failed for floor {level_name}: {e}")
+        paths = []
+
+    os.makedirs("paths", exist_ok=True)
+    path_file = os.path.join("paths", f"paths_{level_name}.pkl")
+
+    # Explicitly overwrite existing paths file
+    if os.path.exists(path_file):
+        print(f"♻️ Removing existing paths file: {path_file}")
+        os.remove(path_file)
+
+    try:
+        with open(path_file, "wb") as f_out:
+            pickle.dump(paths, f_out)
+        print(f"✅ Paths saved to {path_file}")
+    except Exception as e:
+        print(f"❌ Failed to save paths: {e}")
+        result["status"] = "save_failed"
+        return
+
+    try:
+        inspect_graph_z_levels(G)
+        report_unreachable_start_nodes(G, paths)
+        inspect_exit_node_connectivity(G)
+        check_graph_connectivity(G)
+    except Exception as e:
+        print(f"⚠️ Debugging failed for floor {level_name}: {e}")
+
+    diagnostics["paths"] = len(paths)
+    diagnostics["rooms"] = len(G.graph.get("room_start_nodes", {}))
+    result["paths"] = paths
+    result["floor"] = FloorGraph.from_networkx(G)
+
+
+def floor_input_keys(graph_files):
+    """
+    Key of everything a floor's paths depend on: its geometry hash from run_grid_main, the
+    floor's emergency exit selection, the solver, the stitch strategy and the furniture metadata.
+    None = unknown.
+    """
+    import json
+
+    level_hashes = load_state(LEVEL_HASHES_PATH)
+    try:
+        with open("user_inputs.json", "r", encoding="utf-8") as f:
+            user_inputs = json.load(f)
+    except Exception:
+        user_inputs = {}
+    metadata_digest = file_digest(os.path.join("speckle_elements", "speckle_metadata.pkl"))
+
+    keys = {}
+    for graph_path in graph_files:
+        level_name = level_name_from_graph_path(graph_path)
+        level_hash = level_hashes.get(level_name)
+        keys[graph_path] = None if level_hash is None else input_key(
+            level_hash, user_inputs.get(level_name), PATH_SOLVER, PATH_STITCH, metadata_digest
+        )
+    return keys
+
+
+def upload_floor_results(result, client):
+    level_name = result["level_name"]
+    G = result["floor"].to_networkx()
+    paths = result["paths"]
+
+    path_lines = visualize_shortest_paths(paths, level_name=level_name)
+    raw_graph_objects = graph_to_speckle_objects(G, level_name=level_name, wall_lines=[], commit_edges=True)
+    graph_objects = clean_speckle_objects(raw_graph_objects)
+
+    try:
+        send_paths_to_speckle(graph_objects, path_lines, client, PROJECT_ID, level_name)
+    except Exception as e:
+        print(f"❌ Failed to upload results for {level_name}: {e}")
+
 
 def main():
+    args = parse_args()
     print("🔥 Starting Fire Safety Compliance Check...")
 
     wrapper = StreamWrapper(f"{SPECKLE_SERVER_URL}/streams/{PROJECT_ID}/branches/main")
     client = SpeckleClient(host=wrapper.host)
     client.authenticate_with_token(SPECKLE_TOKEN_PATHS)
 
-    graph_files = sorted(glob.glob("graphs/G_*.pkl"))
+    graph_files = list_floor_graphs("graphs")
     if not graph_files:
-        print("❌ No graph pickle files found in 'graphs/' directory.")
+        print("❌ No graph files found in 'graphs/' directory.")
         return
 
-    for graph_path in graph_files:
-        level_name = os.path.splitext(os.path.basename(graph_path))[0].split("_")[-1]
-        print(f"\n🏗️ Processing Floor: {level_name}")
-        try:
-            with open(graph_path, "rb") as f:
-                G = pickle.load(f)
-        except Exception as e:
-            print(f"❌ Failed to load graph from {graph_path}: {e}")
-            continue
-
-        stitched = False
-        if nx.number_connected_components(G) > 1:
-            print("🔗 Found disconnected subgraphs → stitching required.")
-            try:
-                stitch_subgraphs(G)
-                stitched = True
-                print("✅ Subgraphs stitched.")
-            except Exception as e:
-                print(f"❌ Stitching failed: {e}")
-                continue
-        else:
-            print("✅ Graph is already fully connected.")
-
-        try:
-            # map_room_center_to_start_nodes(G)
-            map_farthest_point_from_door(G)
-            debug_door_connections(G)
-            with open(graph_path, "wb") as f_out:
-                pickle.dump(G, f_out)
-            print("💾 Updated graph saved with start/exit nodes.")
-        except Exception as e:
-            print(f"❌ Failed to update graph with start/exit metadata: {e}")
-            continue
+    # ⏭️ Skip floors whose inputs did not change since their paths were computed
+    paths_state = load_state(PATHS_STATE_PATH)
+    input_keys = floor_input_keys(graph_files)
+    unchanged = []
+    if not args.force:
+        for graph_path in graph_files:
+            level_name = level_name_from_graph_path(graph_path)
+            key = input_keys[graph_path]
+            if key and paths_state.get(level_name) == key and os.path.exists(os.path.join("paths", f"paths_{level_name}.pkl")):
+                print(f"⏭️ Floor {level_name} unchanged → keeping existing paths")
+                unchanged.append(level_name)
+    graph_files = [
+        g for g in graph_files
+        if level_name_from_graph_path(g) not in unchanged
+    ]
 
+    def record_floor(graph_path, result):
+        key = input_keys[graph_path]
+        if key and result["status"] == "ok":
+            paths_state[result["level_name"]] = key
         else:
-            print("✅ Graph is already fully connected.")
-    
-        try:
-            paths = find_shortest_paths(G, algorithm="theta_star", max_jump_distance=2.0)
-        except Exception as e:
-            print(f"❌ Pathfinding failed for floor {level_name}: {e}")
-            paths = []
-        
-        os.makedirs("paths", exist_ok=True)
-        path_file = os.path.join("paths", f"paths_{level_name}.pkl")
-        
-        # Explicitly overwrite existing paths file
-        if os.path.exists(path_file):
-            print(f"♻️ Removing existing paths file: {path_file}")
-            os.remove(path_file)
+            paths_state.pop(result["level_name"], None)
+        save_state(PATHS_STATE_PATH, paths_state)
+        if result["summary"] is not None:
+            update_manifest(os.path.dirname(graph_path), result["level_name"], result["summary"])
 
-        try:
-            with open(path_file, "wb") as f_out:
-                pickle.dump(paths, f_out)
-            print(f"✅ Paths saved to {path_file}")
-        except Exception as e:
-            print(f"❌ Failed to save paths: {e}")
-            continue
+    workers = max(1, min(args.workers, len(graph_files)))
+    print(f"⚙️ Processing {len(graph_files)} floor(s) with {workers} worker(s)")
 
-        try:
-            inspect_graph_z_levels(G)
-            report_unreachable_start_nodes(G, paths)
-            inspect_exit_node_connectivity(G)
-            check_graph_connectivity(G)
-        except Exception as e:
-            print(f"⚠️ Debugging failed for floor {level_name}: {e}")
+    results = []
+    if workers == 1:
+        for graph_path in graph_files:
+            result = process_floor(graph_path)
+            record_floor(graph_path, result)
+            if result["floor"] is not None:
+                upload_floor_results(result, client)
+            results.append(result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_floor, graph_path, PATH_SOLVER, True) for graph_path in graph_files]
 
-        path_lines = visualize_shortest_paths(paths, level_name=level_name)
-        raw_graph_objects = graph_to_speckle_objects(G, level_name=level_name, wall_lines=[], commit_edges=True)
-        graph_objects = clean_speckle_objects(raw_graph_objects)
+            # Consume in floor order so logs and Speckle commits stay deterministic
+            for graph_path, future in zip(graph_files, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ Worker failed for {graph_path}: {e}")
+                    continue
+                print(result["log"], end="")
+                record_floor(graph_path, result)
+                if result["floor"] is not None:
+                    upload_floor_results(result, client)
+                results.append(result)
 
-        try:
-            send_paths_to_speckle(graph_objects, path_lines, client, PROJECT_ID, level_name)
-        except Exception as e:
-            print(f"❌ Failed to upload results for {level_name}: {e}")
+    print("\n📋 Floor summary:")
+    for level_name in unchanged:
+        print(f"  {level_name}: unchanged")
+    for result in results:
+        d = result["diagnostics"]
+        print(f"  {result['level_name']}: {result['status']} | {d.get('paths', 0)} paths | "
+              f"{d.get('nodes', 0)} nodes | {d.get('components', 0)} component(s) | {d.get('elapsed_s', 0)}s")
 
     print("\n✅ Fire Safety Compliance Check Complete.")
 
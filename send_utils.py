@@ -5,6 +5,78 @@ from specklepy.serialization.base_object_serializer import BaseObjectSerializer
 from specklepy.api import operations
 from speckle_credentials import  BRANCH_NAME
 
+
+class UploadQueue:
+    """
+    Bounded concurrent upload queue. At most max_workers uploads run at once, and submit()
+    blocks while max_pending uploads are queued or running, so finished floors waiting for
+    upload don't pile up in memory.
+
+    Uploads get their SpeckleClient from client(): one per upload thread, made by
+    client_factory, because specklepy's gql transport can't run two calls at once.
+    """
+
+    def __init__(self, max_workers=2, max_pending=4, client_factory=None):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speckle-upload")
+        self._slots = threading.BoundedSemaphore(max(max_pending, max_workers))
+        self._futures = []
+        self._client_factory = client_factory
+        self._local = threading.local()
+
+    def client(self):
+        """The calling upload thread's own client, created by client_factory on first use."""
+        if getattr(self._local, "client", None) is None:
+            self._local.client = self._client_factory()
+        return self._local.client
+
+    def submit(self, fn, *args, **kwargs):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        return future
+
+    def join(self):
+        """Wait for every submitted upload; failures are reported, not raised."""
+        for future in self._futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Upload failed: {e}")
+        self._futures = []
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.join()
+        return False
+
+
+def create_commit(client, stream_id, object_id, branch_name, message):
+    """
+    client.commit.create, raising the errors specklepy returns instead of raising
+    (a SpeckleException in place of the commit id, e.g. on TransportAlreadyConnected).
+    """
+    commit_id = client.commit.create(
+        stream_id=stream_id,
+        object_id=object_id,
+        branch_name=branch_name,
+        message=message
+    )
+    if isinstance(commit_id, Exception):
+        raise commit_id
+    return commit_id
+
+
 def send_model_to_speckle_per_floor(objects_to_send, client, stream_id, level_name, message_prefix="Fire Safety Model"):
     """
     Uploads and commits any model objects (e.g., color-coded rooms) for a specific floor.
@@ -34,7 +106,8 @@ def send_model_to_speckle_per_floor(objects_to_send, client, stream_id, level_na
         return
 
     try:
-        commit_id = client.commit.create(
+        commit_id = create_commit(
+            client,
             stream_id=stream_id,
             object_id=hash_id,
             branch_name="main",
@@ -71,7 +144,8 @@ def send_graph_to_speckle_per_floor(graph_objects, client, stream_id, level_name
         return
 
     try:
-        commit_id = client.commit.create(
+        commit_id = create_commit(
+            client,
             stream_id=stream_id,
             object_id=object_id,
             branch_name="main",
@@ -118,7 +192,8 @@ def send_paths_to_speckle(graph_objects, path_lines, client, stream_id, level_na
         transport = ServerTransport(client=client, stream_id=stream_id)
         object_id = operations.send(base=base_obj, transports=[transport])
 
-        commit_id = client.commit.create(
+        commit_id = create_commit(
+            client,
             stream_id=stream_id,
             object_id=object_id,
             branch_name=BRANCH_NAME,
@@ -104,8 +104,8 @@ def get_floors():
     graph_dir = os.path.join(BASE_DIR, "graphs")
     if not os.path.exists(graph_dir):
         return {"floors": []}
-    files = sorted(f for f in os.listdir(graph_dir) if f.startswith("G_") and f.endswith(".pkl"))
-    return {"floors": [f.replace(".pkl", "").split("_")[-1] for f in files]}
+    files = [f for f in os.listdir(graph_dir) if f.startswith("G_") and f.endswith((".npz", ".pkl"))]
+    return {"floors": sorted({os.path.splitext(f)[0].split("_")[-1] for f in files})}
 
 
 @app.post("/save-user-inputs")
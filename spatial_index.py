@@ -0,0 +1,210 @@
+import math
+import weakref
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class NodeIndex:
+    """
+    Nearest-neighbour index over node coordinates, built once per floor graph.
+
+    Nodes can be any payload (graph node tuples, specklepy Points) as long as their
+    coordinates are passed alongside. Nodes added after construction go into a small
+    brute-force buffer that is folded into the KD-tree once it grows past rebuild_threshold.
+    Ties are resolved in favour of the node that was inserted first, matching min() over
+    the original node order.
+    """
+
+    def __init__(self, nodes, coords, rebuild_threshold=256):
+        self.nodes = list(nodes)
+        self.coords = np.asarray(coords, dtype=np.float64)
+        if self.coords.ndim != 2:
+            self.coords = self.coords.reshape(len(self.nodes), -1 if len(self.nodes) else 3)
+        self.rebuild_threshold = rebuild_threshold
+        self._tree = cKDTree(self.coords) if len(self.nodes) else None
+        self._tree_size = len(self.nodes)
+        self._added_coords = []
+
+    @classmethod
+    def from_graph(cls, G, dims=3):
+        nodes = list(G.nodes)
+        coords = np.asarray(nodes, dtype=np.float64).reshape(len(nodes), 3)[:, :dims]
+        return cls(nodes, coords)
+
+    @classmethod
+    def from_points(cls, points, dims=2):
+        points = list(points)
+        coords = [(p.x, p.y, p.z)[:dims] for p in points]
+        return cls(points, np.asarray(coords, dtype=np.float64).reshape(len(points), dims))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add(self, node, coord):
+        """Register a node added after the index was built."""
+        self.nodes.append(node)
+        self._added_coords.append(tuple(coord)[: self.coords.shape[1]])
+        if len(self._added_coords) > self.rebuild_threshold:
+            self.rebuild()
+
+    def rebuild(self):
+        if self._added_coords:
+            self.coords = np.vstack([self.coords, np.asarray(self._added_coords, dtype=np.float64)])
+            self._added_coords = []
+        self._tree = cKDTree(self.coords) if len(self.nodes) else None
+        self._tree_size = len(self.nodes)
+
+    def _as_query(self, point):
+        if hasattr(point, "x"):
+            point = (point.x, point.y, point.z)
+        return np.asarray(point, dtype=np.float64)[: self.coords.shape[1]]
+
+    def _pending(self, q):
+        if not self._added_coords:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        idx = np.arange(self._tree_size, len(self.nodes))
+        return idx, np.linalg.norm(np.asarray(self._added_coords, dtype=np.float64) - q, axis=1)
+
+    def _k_nearest(self, q, k, max_distance):
+        idx = np.empty(0, dtype=np.int64)
+        dist = np.empty(0)
+        if self._tree is not None:
+            # cKDTree excludes distance_upper_bound itself; max_distance is inclusive
+            bound = np.nextafter(max_distance, np.inf) if np.isfinite(max_distance) else max_distance
+            d, i = self._tree.query(q, k=min(k, self._tree_size), distance_upper_bound=bound)
+            d, i = np.atleast_1d(d), np.atleast_1d(i)
+            found = i < self._tree_size
+            idx, dist = i[found].astype(np.int64), d[found]
+
+        p_idx, p_dist = self._pending(q)
+        keep = p_dist <= max_distance
+        idx = np.concatenate([idx, p_idx[keep]])
+        dist = np.concatenate([dist, p_dist[keep]])
+
+        order = np.lexsort((idx, dist))[:k]
+        return idx[order], dist[order]
+
+    def k_nearest(self, point, k=1, max_distance=np.inf):
+        """Return up to k (node, distance) pairs ordered by distance, then insertion order."""
+        if not self.nodes:
+            return []
+        idx, dist = self._k_nearest(self._as_query(point), k, max_distance)
+        return [(self.nodes[i], d) for i, d in zip(idx.tolist(), dist.tolist())]
+
+    def nearest(self, point, max_distance=np.inf, strict=False):
+        """
+        Return (node, distance) of the closest node within max_distance, or (None, inf).
+        With strict=True the distance must be strictly below max_distance.
+        """
+        if not self.nodes:
+            return None, float("inf")
+
+        # A few extra candidates so ties (up to float noise) resolve to the earliest node
+        idx, dist = self._k_nearest(self._as_query(point), 8, max_distance)
+        if not len(idx):
+            return None, float("inf")
+        tied = dist - dist[0] <= 1e-9 * max(1.0, dist[0])
+        best = int(np.argmin(np.where(tied, idx, np.iinfo(np.int64).max)))
+        if strict and not dist[best] < max_distance:
+            return None, float("inf")
+        return self.nodes[idx[best]], float(dist[best])
+
+    def query_radius(self, point, radius):
+        """Return all (node, distance) pairs within radius, ordered by distance."""
+        if not self.nodes:
+            return []
+        q = self._as_query(point)
+
+        idx = np.empty(0, dtype=np.int64)
+        dist = np.empty(0)
+        if self._tree is not None:
+            idx = np.asarray(self._tree.query_ball_point(q, r=radius), dtype=np.int64)
+            dist = np.linalg.norm(self.coords[idx] - q, axis=1)
+        p_idx, p_dist = self._pending(q)
+        keep = p_dist <= radius
+        idx = np.concatenate([idx, p_idx[keep]])
+        dist = np.concatenate([dist, p_dist[keep]])
+
+        order = np.lexsort((idx, dist))
+        return [(self.nodes[i], float(d)) for i, d in zip(idx[order].tolist(), dist[order].tolist())]
+
+
+_graph_indexes = weakref.WeakKeyDictionary()
+
+
+def get_node_index(G):
+    """
+    Return the shared 3D NodeIndex of graph G, building it on first use.
+    The index is rebuilt when G's node count changes; replacing nodes without changing the
+    count is not detected.
+    """
+    node_index = _graph_indexes.get(G)
+    if node_index is None or len(node_index) != G.number_of_nodes():
+        node_index = NodeIndex.from_graph(G)
+        _graph_indexes[G] = node_index
+    return node_index
+
+
+class BlockerIndex:
+    """
+    Uniform-bucket index over 2D blocker segments ((x1, y1), (x2, y2)) for line-of-sight tests.
+
+    Each segment is registered in every cell its bounding box touches, so a query only tests
+    the segments bucketed in the cells spanned by the query segment's bounding box. The
+    intersection test is the same strict ccw test as pathfinding_algorithms.do_segments_intersect,
+    vectorized over the candidates.
+    """
+
+    def __init__(self, segments, cell_size=1.0):
+        segments = list(segments or [])
+        self.cell_size = float(cell_size)
+        self.segments = segments
+        arr = np.asarray(segments, dtype=np.float64).reshape(len(segments), 4)
+        self.x1, self.y1, self.x2, self.y2 = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+
+        buckets = {}
+        if len(segments):
+            lo = np.floor(np.minimum(arr[:, :2], arr[:, 2:]) / self.cell_size).astype(np.int64)
+            hi = np.floor(np.maximum(arr[:, :2], arr[:, 2:]) / self.cell_size).astype(np.int64)
+            for seg_id, (ix0, iy0, ix1, iy1) in enumerate(np.hstack([lo, hi]).tolist()):
+                for ix in range(ix0, ix1 + 1):
+                    for iy in range(iy0, iy1 + 1):
+                        buckets.setdefault((ix, iy), []).append(seg_id)
+        self._buckets = {cell: np.asarray(ids, dtype=np.int64) for cell, ids in buckets.items()}
+
+    def __len__(self):
+        return len(self.segments)
+
+    def candidates(self, p1, p2):
+        """Ids of segments bucketed in the cells spanned by the bounding box of p1 → p2."""
+        cs = self.cell_size
+        ix0, ix1 = int(math.floor(min(p1[0], p2[0]) / cs)), int(math.floor(max(p1[0], p2[0]) / cs))
+        iy0, iy1 = int(math.floor(min(p1[1], p2[1]) / cs)), int(math.floor(max(p1[1], p2[1]) / cs))
+
+        found = [
+            self._buckets[(ix, iy)]
+            for ix in range(ix0, ix1 + 1)
+            for iy in range(iy0, iy1 + 1)
+            if (ix, iy) in self._buckets
+        ]
+        if not found:
+            return None
+        if len(found) == 1:
+            return found[0]
+        return np.unique(np.concatenate(found))
+
+    def intersects_any(self, p1, p2):
+        """True if segment p1 → p2 (2D) crosses any indexed blocker."""
+        ids = self.candidates(p1, p2)
+        if ids is None:
+            return False
+
+        ax, ay, bx, by = p1[0], p1[1], p2[0], p2[1]
+        qx1, qy1, qx2, qy2 = self.x1[ids], self.y1[ids], self.x2[ids], self.y2[ids]
+
+        # ccw(a, b, c) = (c.y - a.y) * (b.x - a.x) > (b.y - a.y) * (c.x - a.x)
+        ccw_p1 = (qy2 - ay) * (qx1 - ax) > (qy1 - ay) * (qx2 - ax)          # ccw(p1, q1, q2)
+        ccw_p2 = (qy2 - by) * (qx1 - bx) > (qy1 - by) * (qx2 - bx)          # ccw(p2, q1, q2)
+        ccw_q1 = (qy1 - ay) * (bx - ax) > (by - ay) * (qx1 - ax)            # ccw(p1, p2, q1)
+        ccw_q2 = (qy2 - ay) * (bx - ax) > (by - ay) * (qx2 - ax)            # ccw(p1, p2, q2)
+        return bool(np.any((ccw_p1 != ccw_p2) & (ccw_q1 != ccw_q2)))
@@ -0,0 +1,168 @@
+# speckle_cache.py
+# On-disk cache of received Speckle models, keyed by the commit's referencedObject id.
+# Object ids are content hashes, so a cached entry can never go stale, only old.
+
+import os
+import pickle
+import sqlite3
+import time
+
+from specklepy.api import operations
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cached_data", "speckle_models.sqlite")
+DEFAULT_MAX_BYTES = int(float(os.getenv("SPECKLE_CACHE_MAX_MB", 2048)) * 1024 * 1024)
+DEFAULT_MAX_AGE_S = float(os.getenv("SPECKLE_CACHE_MAX_AGE_DAYS", 30)) * 24 * 3600
+
+
+class SpeckleModelCache:
+    """
+    SQLite store of pickled, already deserialized Base objects.
+
+    A hit skips both the download and the deserialization. Entries are evicted when older than
+    max_age_s, and least recently used entries go first once the cache exceeds max_bytes.
+    Hit/miss counters are kept per instance (hits, misses) and in total across runs (stats()).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, max_age_s=DEFAULT_MAX_AGE_S):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                obj_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def _count(self, name):
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+        self.conn.commit()
+
+    def get(self, obj_id, now=None):
+        """Return the cached Base for obj_id, or None."""
+        now = time.time() if now is None else now
+        row = self.conn.execute(
+            "SELECT data, created FROM objects WHERE obj_id = ?", (obj_id,)
+        ).fetchone()
+
+        if row is not None and now - row[1] > self.max_age_s:
+            self.conn.execute("DELETE FROM objects WHERE obj_id = ?", (obj_id,))
+            self.conn.commit()
+            row = None
+
+        if row is not None:
+            try:
+                base = pickle.loads(row[0])
+            except Exception as e:
+                print(f"⚠️ Dropping unreadable cache entry {obj_id}: {e}")
+                self.conn.execute("DELETE FROM objects WHERE obj_id = ?", (obj_id,))
+                self.conn.commit()
+            else:
+                self.hits += 1
+                self.conn.execute("UPDATE objects SET last_access = ? WHERE obj_id = ?", (now, obj_id))
+                self._count("hits")
+                return base
+
+        self.misses += 1
+        self._count("misses")
+        return None
+
+    def put(self, obj_id, base, now=None):
+        """Store base under obj_id. Returns False if it can't be pickled or exceeds max_bytes."""
+        now = time.time() if now is None else now
+        try:
+            data = pickle.dumps(base, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"⚠️ Model {obj_id} is not cacheable: {e}")
+            return False
+        if len(data) > self.max_bytes:
+            print(f"⚠️ Model {obj_id} ({len(data) / 1e6:.1f} MB) exceeds the cache size limit")
+            return False
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO objects (obj_id, data, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+            (obj_id, sqlite3.Binary(data), len(data), now, now)
+        )
+        self.conn.commit()
+        self.evict(now=now)
+        return True
+
+    def evict(self, now=None):
+        """Drop expired entries, then least recently used ones until the cache fits max_bytes."""
+        now = time.time() if now is None else now
+        self.conn.execute("DELETE FROM objects WHERE created < ?", (now - self.max_age_s,))
+
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total > self.max_bytes:
+            for obj_id, size in self.conn.execute(
+                "SELECT obj_id, size FROM objects ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM objects WHERE obj_id = ?", (obj_id,))
+                total -= size
+        self.conn.commit()
+
+    def receive(self, obj_id, remote_transport):
+        """operations.receive through the cache: the network is only used on a miss."""
+        base = self.get(obj_id)
+        if base is not None:
+            print(f"📦 Model {obj_id} loaded from local cache")
+            return base
+
+        base = operations.receive(obj_id, remote_transport)
+        self.put(obj_id, base)
+        return base
+
+    def stats(self):
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+        totals = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def receive_cached(obj_id, remote_transport, cache=None):
+    """
+    Receive obj_id through the shared on-disk cache (set SPECKLE_CACHE_DISABLE=1 to bypass it).
+    """
+    if os.getenv("SPECKLE_CACHE_DISABLE") == "1":
+        return operations.receive(obj_id, remote_transport)
+
+    own_cache = cache is None
+    cache = cache or SpeckleModelCache()
+    try:
+        base = cache.receive(obj_id, remote_transport)
+        stats = cache.stats()
+        print(f"🗄️ Speckle cache: {stats['entries']} model(s), {stats['bytes'] / 1e6:.1f} MB, "
+              f"{stats['total_hits']} hit(s) / {stats['total_misses']} miss(es) so far")
+        return base
+    finally:
+        if own_cache:
+            cache.close()
@@ -0,0 +1,57 @@
+# bench_pathfinding.py
+# Per-query cost of a_star / theta_star for a fixed-length query on growing floors.
+# With lazily populated search state the time should stay flat as the floor grows.
+#
+#   python test/bench_pathfinding.py [--sizes 50 100 200 400] [--repeat 20]
+
+import argparse
+import os
+import sys
+import time
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathfinding_algorithms import a_star, theta_star
+
+
+def build_grid_floor(n, spacing=0.5):
+    """n x n 4-connected grid with weighted edges, keyed like the real floor graphs."""
+    G = nx.grid_2d_graph(n, n)
+    G = nx.relabel_nodes(G, {(i, j): (round(i * spacing, 4), round(j * spacing, 4), 0.0) for i, j in G.nodes})
+    for u, v in G.edges:
+        G.edges[u, v]["weight"] = spacing
+    return G
+
+
+def time_query(fn, G, start, goal, repeat, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        path = fn(G, start, goal, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best, path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--span", type=int, default=10, help="Query length in grid cells")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} | {'a_star ms':>10} | {'theta_star ms':>13}")
+    for n in args.sizes:
+        G = build_grid_floor(n)
+        mid = n // 2
+        start = (round(mid * 0.5, 4), round(mid * 0.5, 4), 0.0)
+        goal = (round((mid + args.span) * 0.5, 4), round((mid + args.span // 2) * 0.5, 4), 0.0)
+
+        t_a, path_a = time_query(a_star, G, start, goal, args.repeat)
+        t_t, path_t = time_query(theta_star, G, start, goal, args.repeat, blockers=[])
+        assert path_a and path_t, "benchmark query found no path"
+        print(f"{G.number_of_nodes():>8} | {t_a * 1000:>10.3f} | {t_t * 1000:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
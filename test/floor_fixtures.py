@@ -0,0 +1,26 @@
+import math
+from types import SimpleNamespace
+
+from specklepy.objects.geometry import Point, Line, Polycurve
+
+
+def mm_line(x0, y0, x1, y1):
+    """Speckle Line in millimetres from metre coordinates."""
+    return Line(start=Point(x=x0 * 1000, y=y0 * 1000, z=0.0), end=Point(x=x1 * 1000, y=y1 * 1000, z=0.0))
+
+
+def room(room_id, x0, y0, x1, y1, name=None, **extra):
+    pts = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+    outline = Polycurve(segments=[mm_line(*pts[i], *pts[(i + 1) % 4]) for i in range(4)])
+    return SimpleNamespace(id=room_id, elementId=room_id, name=name or room_id, outline=outline, **extra)
+
+
+def walls_around(x0, y0, x1, y1):
+    pts = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+    return [SimpleNamespace(baseLine=mm_line(*pts[i], *pts[(i + 1) % 4])) for i in range(4)]
+
+
+def door(door_id, cx, cy, angle):
+    ux, uy = math.cos(angle), math.sin(angle)
+    matrix = [ux, -uy, 0, cx * 1000, uy, ux, 0, cy * 1000, 0, 0, 1, 0.0, 0, 0, 0, 1]
+    return SimpleNamespace(id=door_id, elementId=door_id, transform=SimpleNamespace(matrix=matrix))
@@ -0,0 +1,31 @@
+import random
+from spatial_index import BlockerIndex
+from pathfinding_algorithms import line_of_sight
+
+
+def random_blockers(rng, count=200):
+    blockers = []
+    for _ in range(count):
+        x, y = rng.uniform(0, 20), rng.uniform(0, 20)
+        w, h = rng.uniform(0.2, 1.5), rng.uniform(0.2, 1.5)
+        blockers += [((x, y), (x + w, y)), ((x + w, y), (x + w, y + h)),
+                     ((x + w, y + h), (x, y + h)), ((x, y + h), (x, y))]
+    blockers.append(((0.0, 10.0), (20.0, 10.01)))  # Long wall spanning many buckets
+    return blockers
+
+
+def test_indexed_line_of_sight_matches_linear_scan():
+    rng = random.Random(7)
+    blockers = random_blockers(rng)
+    index = BlockerIndex(blockers)
+
+    for _ in range(5000):
+        p1 = (rng.uniform(-1, 21), rng.uniform(-1, 21), 0.0)
+        p2 = (p1[0] + rng.uniform(-3, 3), p1[1] + rng.uniform(-3, 3), 0.0)
+        assert line_of_sight(p1, p2, index, 2.0) == line_of_sight(p1, p2, blockers, 2.0)
+
+
+def test_empty_index_never_blocks():
+    index = BlockerIndex([])
+    assert len(index) == 0
+    assert not index.intersects_any((0.0, 0.0), (5.0, 5.0))
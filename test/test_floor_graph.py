@@ -0,0 +1,147 @@
+import networkx as nx
+from floor_graph import FloorGraph, save_floor_graph, load_floor_graph
+
+
+def build_sample_graph():
+    G = nx.Graph()
+    for ix in range(4):
+        for iy in range(3):
+            room = "R1" if ix < 2 else "R2"
+            G.add_node((ix * 0.5, iy * 0.5, 3.2), room_id=room, room_name=f"ROOM {room}")
+    for ix in range(4):
+        for iy in range(3):
+            if ix < 3:
+                G.add_edge((ix * 0.5, iy * 0.5, 3.2), ((ix + 1) * 0.5, iy * 0.5, 3.2), weight=0.5)
+            if iy < 2:
+                G.add_edge((ix * 0.5, iy * 0.5, 3.2), (ix * 0.5, (iy + 1) * 0.5, 3.2), weight=0.5)
+    G.add_node((12.3456, -7.8901, 3.2))
+    G.add_edge((1.5, 1.0, 3.2), (12.3456, -7.8901, 3.2), weight=13.4)
+
+    door = (0.5, 0.5, 3.2)
+    G.nodes[door].update(type="door", source_id="D1", is_door=True, connected_rooms=["R1", "R2"])
+    G.graph["start_nodes"] = [(0.0, 0.0, 3.2)]
+    return G
+
+
+def test_round_trip_preserves_nodes_edges_and_attributes(tmp_path):
+    G = build_sample_graph()
+    path = tmp_path / "G_test.pkl"
+    save_floor_graph(G, path)
+    H = load_floor_graph(path)
+
+    assert list(H.nodes) == list(G.nodes)
+    assert all(dict(H.nodes[n]) == dict(G.nodes[n]) for n in G.nodes)
+    assert all(list(H.adj[n]) == list(G.adj[n]) for n in G.nodes)
+    assert H.number_of_edges() == G.number_of_edges()
+    assert all(H.edges[e]["weight"] == G.edges[e]["weight"] for e in G.edges)
+    assert H.graph["start_nodes"] == [(0.0, 0.0, 3.2)]
+
+
+def test_room_codes_point_into_string_table():
+    F = FloorGraph.from_networkx(build_sample_graph())
+    assert sorted(F.tables["room_id"]) == ["R1", "R2"]
+    assert F.room_ids()[-1] is None
+    assert F.number_of_edges() == build_sample_graph().number_of_edges()
+
+
+def test_legacy_networkx_pickle_still_loads(tmp_path):
+    import pickle
+
+    G = build_sample_graph()
+    path = tmp_path / "G_legacy.pkl"
+    with open(path, "wb") as f:
+        pickle.dump(G, f)
+
+    assert set(load_floor_graph(path).nodes) == set(G.nodes)
+    assert load_floor_graph(path, as_networkx=False).number_of_nodes() == G.number_of_nodes()
+
+
+def test_npz_round_trip_memory_maps_arrays(tmp_path):
+    import numpy as np
+
+    G = build_sample_graph()
+    G.graph["room_start_nodes"] = {"R1": (0.0, 0.0, 3.2)}
+    G.graph["door_width_lookup"] = {"D1": 0.9, 17: 1.2}
+    G.graph["tags"] = {"a", "b"}
+    path = tmp_path / "G_test.npz"
+    save_floor_graph(G, str(path))
+
+    F = load_floor_graph(str(path), as_networkx=False)
+    assert isinstance(F.qcoords, np.memmap) and isinstance(F.indices, np.memmap)
+    assert F.room_ids()[:3] == ["R1", "R1", "R1"]
+
+    H = load_floor_graph(str(path))
+    assert list(H.nodes) == list(G.nodes)
+    assert all(dict(H.nodes[n]) == dict(G.nodes[n]) for n in G.nodes)
+    assert all(list(H.adj[n]) == list(G.adj[n]) for n in G.nodes)
+    assert H.graph == G.graph
+
+
+def test_list_floor_graphs_prefers_npz_over_legacy_pickle(tmp_path):
+    import os
+    from floor_graph import list_floor_graphs, level_name_from_graph_path
+
+    G = build_sample_graph()
+    for name in ("G_001.npz", "G_001.pkl", "G_002.pkl", "paths_001.pkl"):
+        save_floor_graph(G, str(tmp_path / name))
+
+    files = list_floor_graphs(str(tmp_path))
+    assert [os.path.basename(p) for p in files] == ["G_001.npz", "G_002.pkl"]
+    assert [level_name_from_graph_path(p) for p in files] == ["001", "002"]
+
+
+def test_manifest_summarizes_and_finds_floor(tmp_path):
+    from floor_graph import floor_graph_path, floor_summary, update_manifest, load_manifest, find_floor_level
+
+    G = build_sample_graph()
+    path = floor_graph_path("L2", tmp_path)
+    floor = save_floor_graph(G, path)
+    update_manifest(tmp_path, "L2", floor_summary(floor, "L2", path))
+
+    entry = load_manifest(tmp_path)["L2"]
+    assert entry["file"] == "G_L2.npz"
+    assert (entry["nodes"], entry["edges"]) == (G.number_of_nodes(), G.number_of_edges())
+    assert entry["bbox"] == [0.0, -7.8901, 12.3456, 1.0]
+    assert entry["door_nodes"] == [[0.5, 0.5, 3.2]]
+    assert entry["room_ids"] == ["R1", "R2"]
+
+    # Older graphs without level_name are matched through the manifest
+    assert find_floor_level(load_floor_graph(path), tmp_path) == "L2"
+    G.graph["level_name"] = "L3"
+    assert find_floor_level(G, tmp_path) == "L3"
+
+    update_manifest(tmp_path, "L2", None)
+    assert load_manifest(tmp_path) == {}
+
+
+def test_room_index_survives_save_and_load(tmp_path):
+    from floor_graph import build_room_index, get_room_index
+
+    G = build_sample_graph()
+    build_room_index(G)
+    path = tmp_path / "G_test.npz"
+    save_floor_graph(G, path)
+    H = load_floor_graph(path)
+
+    index = H.graph["room_index"]
+    assert get_room_index(H) is index
+    assert sorted(index["room_nodes"]) == ["R1", "R2"]
+    assert index["room_nodes"]["R1"].shape == (6, 3)
+    assert index["room_doors"] == {"R1": [(0.5, 0.5, 3.2)]}
+    assert index["door_rooms"] == {(0.5, 0.5, 3.2): ["R1", "R2"]}
+
+    # Stored as arrays next to the graph, not inside the JSON meta member
+    import json
+    import numpy as np
+    with np.load(path) as npz:
+        assert "room_order" in npz.files and "room_index" not in json.loads(bytes(npz["meta"]).decode("utf-8"))["graph"]
+
+    expected = build_room_index(load_floor_graph(path))
+    for loaded in (index, load_floor_graph(path, as_networkx=False).room_index()):
+        assert loaded["node_count"] == expected["node_count"]
+        assert loaded["room_doors"] == expected["room_doors"] and loaded["door_rooms"] == expected["door_rooms"]
+        assert list(loaded["room_nodes"]) == list(expected["room_nodes"])
+        assert all(np.array_equal(loaded["room_nodes"][r], expected["room_nodes"][r]) for r in expected["room_nodes"])
+
+    H.add_node((9.0, 9.0, 3.2), room_id="R3")
+    assert "R3" in get_room_index(H)["room_nodes"]
@@ -0,0 +1,51 @@
+import math
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+
+from floor_fixtures import mm_line, room, door
+from generate_grid_test import compute_global_bounds
+from grid_pipeline import pack_level, build_level_graph, unpack_wall_lines
+
+
+def build_level():
+    rooms = [
+        room("R1", 0, 0, 6, 4, name="OFFICE", extra="dropped"),
+        room("R2", 6, 0, 10, 4, name="CORRIDOR", extra="dropped"),
+    ]
+    walls = [SimpleNamespace(id=f"W{i}", baseLine=mm_line(*a, *b)) for i, (a, b) in enumerate(
+        [((0, 0), (10, 0)), ((10, 0), (10, 4)), ((10, 4), (0, 4)), ((0, 4), (0, 0)), ((6, 0), (6, 4))]
+    )]
+    doors = [door("D1", 6.0, 2.0, math.pi / 2)]
+    return rooms, walls, doors, []
+
+
+def test_worker_builds_same_graph_from_packed_level():
+    rooms, walls, doors, stairs = build_level()
+    global_bounds = compute_global_bounds(rooms, walls, doors)
+    packed = pack_level("L1", rooms, walls, doors, stairs)
+
+    _, local_floor, local_walls = build_level_graph(packed, global_bounds)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        level_name, floor, wall_coords = pool.submit(build_level_graph, packed, global_bounds).result()
+
+    assert level_name == "L1"
+    assert floor.node_keys() == local_floor.node_keys()
+    assert floor.room_ids() == local_floor.room_ids()
+    assert wall_coords == local_walls
+    assert len(unpack_wall_lines(wall_coords)) == len(walls)
+
+    G = floor.to_networkx()
+    assert any(data.get("type") == "door" and data.get("source_id") == "D1" for _, data in G.nodes(data=True))
+    assert {"R1", "R2"} <= set(floor.room_ids())
+
+
+def test_raster_trim_agreement_is_reported_on_request(capsys):
+    rooms, walls, doors, stairs = build_level()
+    global_bounds = compute_global_bounds(rooms, walls, doors)
+    packed = pack_level("L1", rooms, walls, doors, stairs)
+
+    build_level_graph(packed, global_bounds, trim_engine="raster")
+    assert "Raster vs geometric trimming" not in capsys.readouterr().out
+
+    build_level_graph(packed, global_bounds, trim_engine="raster", trim_agreement=True)
+    assert "Raster vs geometric trimming" in capsys.readouterr().out
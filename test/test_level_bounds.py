@@ -0,0 +1,34 @@
+from floor_fixtures import room, walls_around
+from generate_grid_test import compute_global_bounds, compute_level_bounds, generate_extended_gridlines_per_floor
+
+
+def grid_keys(rooms, walls, bounds, tagging="vectorized"):
+    edges, _, grid_dict = generate_extended_gridlines_per_floor(
+        rooms, walls, [], spacing=0.5, global_bounds=bounds, tagging=tagging
+    )
+    return [(a.x, a.y, b.x, b.y, rid) for a, b, rid in edges], sorted((p.x, p.y) for p in grid_dict.values())
+
+
+def test_level_bounds_cover_only_the_footprint_on_the_global_lattice():
+    podium = [room("P1", -0.3, 0.1, 60.2, 40.4)]
+    tower = [room("T1", 31.3, 17.1, 39.7, 25.9), room("T2", 39.7, 17.1, 43.15, 25.9)]
+    tower_walls = walls_around(31.3, 17.1, 43.15, 25.9)
+    global_bounds = compute_global_bounds(podium + tower, walls_around(-0.3, 0.1, 60.2, 40.4) + tower_walls, [])
+
+    bounds = compute_level_bounds(tower, tower_walls, [], global_bounds, spacing=0.5)
+    assert bounds["min_x"] <= 31.3 and bounds["max_x"] >= 43.15
+    assert bounds["min_y"] <= 17.1 and bounds["max_y"] >= 25.9
+    assert bounds["max_x"] - bounds["min_x"] < 13 and bounds["max_y"] - bounds["min_y"] < 10
+    for axis in ("x", "y"):
+        steps = (bounds[f"min_{axis}"] - global_bounds[f"min_{axis}"]) / 0.5
+        assert abs(steps - round(steps)) < 1e-9
+
+    assert grid_keys(tower, tower_walls, bounds) == grid_keys(tower, tower_walls, global_bounds)
+
+
+def test_sparse_tagging_matches_vectorized_tagging():
+    rooms = [room("A", 0.2, 0.2, 6.1, 4.3), room("B", 6.1, 0.2, 9.7, 4.3), room("C", 2.0, 2.0, 8.0, 7.6), room(None, 0.2, 5.0, 1.9, 7.6)]
+    walls = walls_around(0.2, 0.2, 9.7, 7.6)
+    bounds = compute_global_bounds(rooms, walls, [])
+
+    assert grid_keys(rooms, walls, bounds, tagging="sparse") == grid_keys(rooms, walls, bounds)
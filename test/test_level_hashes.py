@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from specklepy.objects.geometry import Point, Line, Polycurve
+from level_hashes import level_geometry_hash, input_key, load_state, save_state
+
+
+def line(x0, y0, x1, y1):
+    return Line(start=Point(x=x0, y=y0, z=0.0), end=Point(x=x1, y=y1, z=0.0))
+
+
+def build_level(wall_end=4000.0, door_x=2000.0):
+    outline = Polycurve(segments=[line(0, 0, 4000, 0), line(4000, 0, 4000, 3000),
+                                  line(4000, 3000, 0, 3000), line(0, 3000, 0, 0)])
+    rooms = [SimpleNamespace(id="R1", elementId="1", name="OFFICE", outline=outline, area=12.0)]
+    walls = [SimpleNamespace(id="W1", baseLine=line(0, 0, wall_end, 0))]
+    doors = [SimpleNamespace(id="D1", transform=SimpleNamespace(matrix=[1, 0, 0, door_x, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1]))]
+    stairs = [SimpleNamespace(id="S1", displayValue=[SimpleNamespace(vertices=[0.0, 0.0, 0.0, 1.0, 1.0, 0.0])])]
+    return rooms, walls, doors, stairs
+
+
+def test_hash_is_stable_and_tracks_geometry():
+    base = level_geometry_hash(*build_level(), spacing=0.5)
+
+    assert level_geometry_hash(*build_level(), spacing=0.5) == base
+    assert level_geometry_hash(*build_level(wall_end=4100.0), spacing=0.5) != base
+    assert level_geometry_hash(*build_level(door_x=2100.0), spacing=0.5) != base
+    assert level_geometry_hash(*build_level(), spacing=0.25) != base
+
+
+def test_hash_ignores_attributes_the_pipeline_does_not_read():
+    rooms, walls, doors, stairs = build_level()
+    base = level_geometry_hash(rooms, walls, doors, stairs)
+    rooms[0].area = 99.0
+    assert level_geometry_hash(rooms, walls, doors, stairs) == base
+
+
+def test_state_round_trip(tmp_path):
+    path = str(tmp_path / "graphs" / "level_hashes.json")
+    assert load_state(path) == {}
+    save_state(path, {"L1": input_key("abc", ["D1"])})
+    assert load_state(path) == {"L1": input_key("abc", ["D1"])}
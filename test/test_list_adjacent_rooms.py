@@ -1,7 +1,6 @@
-import glob
 import os
-import pickle
 from collections import defaultdict, Counter
+from floor_graph import load_floor_graph, list_floor_graphs
 
 GRAPH_DIR = "../graphs"
 
@@ -14,8 +13,7 @@ def bbox_touch_or_overlap(b1, b2, margin=1.0):
     )
 
 def list_adjacent_rooms_from_bbox(graph_path):
-    with open(graph_path, "rb") as f:
-        G = pickle.load(f)
+    G = load_floor_graph(graph_path)
 
     print(f"\n=== {os.path.basename(graph_path)} ===")
 
@@ -71,9 +69,9 @@ def list_adjacent_rooms_from_bbox(graph_path):
         print(f"  Adjacent rooms: {neighbor_names}")
 
 def main():
-    graph_files = glob.glob(os.path.join(GRAPH_DIR, "G_*.pkl"))
+    graph_files = list_floor_graphs(GRAPH_DIR)
     if not graph_files:
-        print("❌ No graph pickle files found.")
+        print("❌ No graph files found.")
         return
 
     for graph_file in graph_files:
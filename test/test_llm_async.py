@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_async import run_chat_batch
+
+
+class MockCompletions(BaseHTTPRequestHandler):
+    """Azure-style chat completions: echoes the user prompt after `latency` seconds."""
+
+    latency = 0.05
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    prompts = []
+    throttled = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        cls = type(self)
+        with cls.lock:
+            cls.prompts.append(prompt)
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(cls.latency)
+            if "deployments/gpt/chat/completions" not in self.path or self.headers.get("api-key") != "secret":
+                return self.reply(404, {"error": "not found"})
+            if prompt.startswith("THROTTLE") and prompt not in cls.throttled:
+                cls.throttled.add(prompt)
+                return self.reply(429, {"error": "rate limited"}, {"Retry-After": "0"})
+            if prompt.startswith("BAD"):
+                return self.reply(400, {"error": "bad request"})
+            self.reply(200, {"choices": [{"message": {"role": "assistant", "content": f"echo: {prompt}"}}]})
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+@pytest.fixture
+def server():
+    MockCompletions.prompts = []
+    MockCompletions.throttled = set()
+    MockCompletions.max_active = 0
+    httpd = MockServer(("127.0.0.1", 0), MockCompletions)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield {
+        "endpoint": f"http://127.0.0.1:{httpd.server_address[1]}",
+        "api_key": "secret",
+        "api_version": "2024-02-01",
+        "deployment": "gpt",
+        "backoff_s": 0.01,
+    }
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def user(prompt):
+    return [{"role": "user", "content": prompt}]
+
+
+def test_prompts_run_concurrently_within_the_limit(server):
+    prompts = [user(f"room {i}") for i in range(200)]
+    started = time.perf_counter()
+    contents = run_chat_batch(prompts, max_concurrency=32, rate_per_s=None, **server)
+    elapsed = time.perf_counter() - started
+
+    assert contents == [f"echo: room {i}" for i in range(200)]
+    assert MockCompletions.max_active <= 32
+    assert elapsed < 200 * MockCompletions.latency / 4
+
+
+def test_duplicates_retries_and_failures(server):
+    prompts = [user("OFFICE"), user("THROTTLE STORE"), user("OFFICE"), user("BAD"), user("OFFICE")]
+    contents = run_chat_batch(prompts, max_concurrency=4, rate_per_s=None, **server)
+
+    assert contents == ["echo: OFFICE", "echo: THROTTLE STORE", "echo: OFFICE", None, "echo: OFFICE"]
+    assert MockCompletions.prompts.count("OFFICE") == 1
+    assert MockCompletions.prompts.count("THROTTLE STORE") == 2
+    assert MockCompletions.prompts.count("BAD") == 1
+
+
+def test_token_bucket_limits_the_request_rate(server):
+    started = time.perf_counter()
+    run_chat_batch([user(f"room {i}") for i in range(6)], max_concurrency=6, rate_per_s=20, burst=1, **server)
+    assert time.perf_counter() - started >= 5 / 20
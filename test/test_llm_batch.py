@@ -0,0 +1,80 @@
+import json
+from types import SimpleNamespace
+
+import llm_batch
+from llm_batch import group_room_names, parse_json_answer, run_batched, union_context
+
+
+def test_similar_rooms_share_a_group():
+    names = ["STAIRS 1", "OFFICE 2", "STAIRS 2", "IT STORAGE", "OFFICE 1", "STAIRS 3", "GENERAL STORAGE"]
+    groups = group_room_names(names, max_rooms=3)
+
+    assert sorted(name for group in groups for name in group) == sorted(names)
+    assert all(len(group) <= 3 for group in groups)
+    assert ["STAIRS 1", "STAIRS 2", "STAIRS 3"] in groups
+    assert any({"GENERAL STORAGE", "IT STORAGE"} <= set(group) for group in groups)
+
+
+def test_union_context_drops_duplicates_and_keeps_each_rooms_best_chunk():
+    doc = lambda text: SimpleNamespace(page_content=text)
+    hits = {"OFFICE": [doc("table 1004.5"), doc("business")], "LOBBY": [doc("assembly"), doc("table 1004.5")]}
+
+    assert union_context(["OFFICE", "LOBBY"], hits.get) == ["table 1004.5", "assembly", "business"]
+    assert union_context(["OFFICE", "LOBBY"], hits.get, max_chunks=2) == ["table 1004.5", "assembly"]
+
+
+def test_every_room_keeps_its_best_chunk_when_rooms_outnumber_chunks(monkeypatch):
+    doc = lambda text: SimpleNamespace(page_content=text)
+    rooms = [f"ROOM {i}" for i in range(20)]
+    search = lambda name: [doc(f"{name} best"), doc(f"{name} second")]
+
+    chunks = union_context(rooms, search, max_chunks=12)
+    assert [f"{name} best" for name in rooms] == chunks
+
+    monkeypatch.setattr(llm_batch, "LLM_BATCH_ROOMS", 20)
+    monkeypatch.setattr(llm_batch, "LLM_BATCH_CHUNKS", 12)
+    groups = group_room_names(rooms)
+    assert max(len(group) for group in groups) == 12
+    for group in groups:
+        assert {f"{name} best" for name in group} <= set(union_context(group, search))
+
+
+def test_json_answers_are_read_through_code_fences():
+    assert parse_json_answer('```json\n{"OFFICE": "Group B"}\n```') == {"OFFICE": "Group B"}
+    assert parse_json_answer("Classification: Group B") == {}
+    assert parse_json_answer(None) == {}
+
+
+def test_invalid_or_missing_rooms_fall_back_to_single_prompts(monkeypatch):
+    prompts = []
+
+    def fake_chat_batch(message_lists):
+        prompts.extend(message_lists)
+        answers = []
+        for messages in message_lists:
+            rooms = json.loads(messages[0]["content"])
+            answers.append(json.dumps({
+                "office 1": "Group B", "OFFICE 2": "Group B", "STAIRS 1": "Group R-2", "STAIRS 2": "maybe"
+            }) if len(rooms) > 1 else "not json")
+        return answers
+
+    monkeypatch.setattr(llm_batch, "run_chat_batch", fake_chat_batch)
+    validate = lambda name, value: value if isinstance(value, str) and value.startswith("Group") else None
+    single_calls = []
+
+    def single(names):
+        single_calls.append(names)
+        return {name: "Group S-1" for name in names}
+
+    found = run_batched(
+        ["OFFICE 1", "OFFICE 2", "STAIRS 1", "STAIRS 2", "STAIRS 3"],
+        lambda group: [{"role": "user", "content": json.dumps(group)}],
+        validate, single, max_rooms=5
+    )
+
+    assert len(prompts) == 1
+    assert single_calls == [["STAIRS 2", "STAIRS 3"]]
+    assert found == {
+        "OFFICE 1": "Group B", "OFFICE 2": "Group B", "STAIRS 1": "Group R-2",
+        "STAIRS 2": "Group S-1", "STAIRS 3": "Group S-1"
+    }
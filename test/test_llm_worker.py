@@ -0,0 +1,105 @@
+import io
+import json
+import os
+import time
+
+import pytest
+
+import llm_worker
+from llm_worker import LLMWorkerPool, serve
+
+FAKE_TASKS = '''
+import os
+
+
+def shout(items):
+    print("debug output that must not reach the protocol")
+    return {item: item.upper() for item in items}
+
+
+def pid(items):
+    return {"pid": os.getpid()}
+
+
+def boom(items):
+    raise ValueError("no model")
+'''
+
+
+def test_serve_answers_one_json_line_per_request(tmp_path, monkeypatch):
+    (tmp_path / "fake_tasks.py").write_text(FAKE_TASKS)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    requests = "\n".join(json.dumps(r) for r in [
+        {"id": 1, "task": "shout", "items": ["office"]},
+        {"id": 2, "task": "boom", "items": []},
+        {"id": 3, "task": "missing", "items": []},
+    ])
+    out = io.StringIO()
+    monkeypatch.setattr("sys.stdout", io.StringIO())
+    serve(tasks={"shout": "fake_tasks:shout", "boom": "fake_tasks:boom"}, stdin=io.StringIO(requests), stdout=out)
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert responses[0] == {"id": 1, "ok": True, "result": {"office": "OFFICE"}}
+    assert responses[1]["ok"] is False and "no model" in responses[1]["error"]
+    assert responses[2]["ok"] is False and responses[2]["id"] == 3
+
+
+def test_pool_reuses_its_worker_processes(tmp_path):
+    (tmp_path / "fake_tasks.py").write_text(FAKE_TASKS)
+    env = dict(os.environ, PYTHONPATH=str(tmp_path))
+    tasks = {"shout": "fake_tasks:shout", "pid": "fake_tasks:pid", "boom": "fake_tasks:boom"}
+    pool = LLMWorkerPool(size=2, env=env, tasks=tasks)
+    try:
+        results = pool.map("shout", [["a", "b"], ["c"], ["d"]])
+        assert results == [{"a": "A", "b": "B"}, {"c": "C"}, {"d": "D"}]
+
+        pids = {pool.request("pid", [])["pid"] for _ in range(6)}
+        assert len(pids) <= 2
+
+        failed = pool.map("boom", [[1]])
+        assert isinstance(failed[0], RuntimeError)
+        assert pool.request("shout", ["e"]) == {"e": "E"}
+    finally:
+        pool.close()
+
+
+FAKE_WORKER = '''
+import json
+import os
+import sys
+import time
+
+for line in sys.stdin:
+    request = json.loads(line)
+    items = request["items"]
+    if items == ["garble"]:
+        print("Traceback (most recent call last):")
+    elif items == ["wrong id"]:
+        print(json.dumps({"id": request["id"] + 100, "ok": True, "result": {}}))
+    elif items == ["hang"]:
+        time.sleep(60)
+    else:
+        print(json.dumps({"id": request["id"], "ok": True, "result": {"pid": os.getpid()}}))
+    sys.stdout.flush()
+'''
+
+
+def test_pool_replaces_workers_that_break_protocol_or_hang(tmp_path, monkeypatch):
+    (tmp_path / "fake_worker.py").write_text(FAKE_WORKER)
+    monkeypatch.setattr(llm_worker, "WORKER_SCRIPT", str(tmp_path / "fake_worker.py"))
+    pool = LLMWorkerPool(size=1, timeout_s=1.0)
+    try:
+        pid = pool.request("any", [])["pid"]
+        for bad, error in [(["garble"], RuntimeError), (["wrong id"], RuntimeError), (["hang"], TimeoutError)]:
+            started = time.perf_counter()
+            with pytest.raises(error):
+                pool.request("any", bad)
+            assert time.perf_counter() - started < 10
+
+            # The next request gets a fresh worker whose answers are in step again
+            new_pid = pool.request("any", [])["pid"]
+            assert new_pid != pid
+            assert pool.request("any", [])["pid"] == new_pid
+            pid = new_pid
+    finally:
+        pool.close()
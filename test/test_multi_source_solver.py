@@ -0,0 +1,73 @@
+import networkx as nx
+from path_of_travel import compute_exit_paths_for_room, compute_exit_paths_multi_source
+
+
+def build_floor():
+    """Two 6 x 4 rooms side by side on a 0.5 m grid, joined by a door column at x = 3.0."""
+    G = nx.Graph()
+    for ix in range(13):
+        for iy in range(5):
+            room = "R1" if ix < 6 else ("R2" if ix > 6 else None)
+            if room is None and iy != 2:
+                continue
+            G.add_node((ix * 0.5, iy * 0.5, 0.0), room_id=room or "DOOR", room_name=room or "DOOR")
+    for u in list(G.nodes):
+        for v in [(u[0] + 0.5, u[1], 0.0), (u[0], u[1] + 0.5, 0.0)]:
+            if v in G:
+                G.add_edge(u, v, weight=0.5)
+
+    G.nodes[(3.0, 1.0, 0.0)].update(type="door", source_id="D_MID")
+    G.nodes[(0.0, 0.0, 0.0)].update(type="exit", source_id="EXIT_W")
+    G.nodes[(6.0, 2.0, 0.0)].update(type="exit", source_id="EXIT_E")
+
+    # Wall between the rooms with a gap at the door, so any-angle moves can't cut through it
+    G.graph["wall_segments"] = [((3.0, -0.25), (3.0, 0.75)), ((3.0, 1.25), (3.0, 2.25))]
+    return G
+
+
+def run_both(G, algorithm):
+    room_start_nodes = {"R1": (2.5, 2.0, 0.0), "R2": (4.0, 0.0, 0.0)}
+    fallback_exits = [(0.0, 0.0, 0.0), (6.0, 2.0, 0.0)]
+    outside_exits_by_room = {"R1": [(6.0, 2.0, 0.0)], "R2": [(0.0, 0.0, 0.0)]}
+
+    pairwise = []
+    for room_id, start_node in room_start_nodes.items():
+        pairwise += compute_exit_paths_for_room(
+            G, room_id, start_node, fallback_exits, outside_exits_by_room,
+            set(), set(), furniture_list=["sofa"], algorithm=algorithm
+        )
+    multi = compute_exit_paths_multi_source(
+        G, room_start_nodes, fallback_exits, outside_exits_by_room,
+        furniture_list=["sofa"], algorithm=algorithm
+    )
+    key = lambda p: (p["room_id"], p["exit_type"])
+    return {key(p): p for p in pairwise}, {key(p): p for p in multi}
+
+
+def test_multi_source_matches_pairwise_a_star():
+    pairwise, multi = run_both(build_floor(), "a_star")
+
+    assert multi.keys() == pairwise.keys()
+    for k in pairwise:
+        assert multi[k]["exit_node"] == pairwise[k]["exit_node"]
+        assert abs(multi[k]["distance_m"] - pairwise[k]["distance_m"]) < 1e-9
+        assert multi[k]["path"][0] == pairwise[k]["start_node"]
+
+
+def test_multi_source_distances_stay_close_to_pairwise_theta_star():
+    # Both are any-angle approximations, searched in opposite directions
+    tolerance = 0.05
+    pairwise, multi = run_both(build_floor(), "theta_star")
+
+    assert multi.keys() == pairwise.keys()
+    for k in pairwise:
+        assert multi[k]["exit_node"] == pairwise[k]["exit_node"]
+        assert abs(multi[k]["distance_m"] - pairwise[k]["distance_m"]) <= tolerance * pairwise[k]["distance_m"]
+
+
+def test_room_outside_exit_is_not_taken_from_another_room():
+    # R2's nearest exit is EXIT_E, but its only outside exit is EXIT_W
+    _, multi = run_both(build_floor(), "theta_star")
+
+    assert multi[("R2", "default_exit")]["exit_source_id"] == "EXIT_E"
+    assert multi[("R2", "outside_exit")]["exit_source_id"] == "EXIT_W"
@@ -0,0 +1,106 @@
+import math
+import random
+
+import networkx as nx
+import numpy as np
+
+from spatial_index import NodeIndex, get_node_index
+
+
+def lattice_nodes(seed=5):
+    rng = random.Random(seed)
+    nodes = [(ix * 0.5, iy * 0.5, 3.2) for ix in range(30) for iy in range(20)]
+    rng.shuffle(nodes)
+    return nodes
+
+
+def linear_nearest(nodes, point, max_distance=math.inf):
+    # The scan NodeIndex replaced: min() keeps the first node on ties
+    best = min(nodes, key=lambda n: math.dist(n, point), default=None)
+    if best is None or math.dist(best, point) > max_distance:
+        return None, math.inf
+    return best, math.dist(best, point)
+
+
+def assert_same(found, expected):
+    assert found[0] == expected[0]
+    assert math.isclose(found[1], expected[1], rel_tol=1e-12) or found[1] == expected[1]
+
+
+def test_nearest_matches_linear_scan_including_ties():
+    nodes = lattice_nodes()
+    index = NodeIndex(nodes, nodes)
+    rng = random.Random(7)
+
+    # Cell centres and edge midpoints are equidistant to 4 and 2 lattice nodes
+    queries = [(ix * 0.5 + 0.25, iy * 0.5 + 0.25, 3.2) for ix in range(-1, 30) for iy in range(-1, 20)]
+    queries += [(ix * 0.5 + 0.25, iy * 0.5, 3.2) for ix in range(29) for iy in range(20)]
+    queries += [(rng.uniform(-2, 17), rng.uniform(-2, 12), rng.uniform(0, 6)) for _ in range(300)]
+    for q in queries:
+        assert_same(index.nearest(q), linear_nearest(nodes, q))
+
+    assert index.nearest((40.0, 40.0, 3.2), max_distance=1.0) == (None, math.inf)
+    assert_same(index.nearest((0.25, 0.0, 3.2), max_distance=0.25), linear_nearest(nodes, (0.25, 0.0, 3.2)))
+    assert index.nearest((0.25, 0.0, 3.2), max_distance=0.25, strict=True) == (None, math.inf)
+
+
+def test_pending_nodes_are_found_before_and_after_the_rebuild():
+    nodes = lattice_nodes()[:100]
+    index = NodeIndex(nodes, nodes, rebuild_threshold=4)
+    added = [(20.25, 20.25, 3.2), (-3.0, -3.0, 3.2), (20.25, 20.75, 3.2)]
+    for node in added:
+        index.add(node, node)
+    assert index._added_coords and len(index) == 103
+
+    everything = nodes + added
+    for q in [(20.0, 20.5, 3.2), (-2.0, -2.0, 3.2), (20.25, 20.5, 3.2), (1.0, 1.0, 3.2)]:
+        assert_same(index.nearest(q), linear_nearest(everything, q))
+
+    # A tree node and a pending node at the same distance: the tree node was inserted first
+    tied = NodeIndex([(0.0, 0.0, 0.0)], [(0.0, 0.0, 0.0)])
+    tied.add((2.0, 0.0, 0.0), (2.0, 0.0, 0.0))
+    assert tied.nearest((1.0, 0.0, 0.0)) == ((0.0, 0.0, 0.0), 1.0)
+
+    index.add((30.0, 30.0, 3.2), (30.0, 30.0, 3.2))
+    index.add((31.0, 30.0, 3.2), (31.0, 30.0, 3.2))
+    assert not index._added_coords and len(index) == 105
+    everything += [(30.0, 30.0, 3.2), (31.0, 30.0, 3.2)]
+    for q in [(30.4, 30.0, 3.2), (20.25, 20.5, 3.2), (-2.0, -2.0, 3.2)]:
+        assert_same(index.nearest(q), linear_nearest(everything, q))
+
+
+def test_query_radius_matches_brute_force():
+    nodes = lattice_nodes()
+    index = NodeIndex(nodes[:-10], nodes[:-10], rebuild_threshold=100)
+    for node in nodes[-10:]:
+        index.add(node, node)
+
+    for q in [(3.25, 4.0, 3.2), (0.0, 0.0, 3.2), (14.5, 9.5, 3.2), (7.1, 2.9, 4.0)]:
+        expected = sorted(
+            ((n, math.dist(n, q)) for n in nodes if math.dist(n, q) <= 1.2),
+            key=lambda item: (item[1], nodes.index(item[0]))
+        )
+        got = index.query_radius(q, 1.2)
+        assert [n for n, _ in got] == [n for n, _ in expected]
+        assert np.allclose([d for _, d in got], [d for _, d in expected])
+
+
+def test_empty_indexes():
+    assert NodeIndex([], []).nearest((0.0, 0.0, 0.0)) == (None, math.inf)
+    assert NodeIndex.from_graph(nx.Graph()).query_radius((0.0, 0.0, 0.0), 5.0) == []
+    assert NodeIndex.from_points([]).k_nearest((0.0, 0.0, 0.0), k=3) == []
+
+
+def test_get_node_index_is_shared_until_the_graph_changes():
+    G = nx.Graph()
+    G.add_nodes_from(lattice_nodes()[:50])
+    index = get_node_index(G)
+    assert get_node_index(G) is index
+
+    G.add_node((100.0, 100.0, 3.2))
+    rebuilt = get_node_index(G)
+    assert rebuilt is not index and rebuilt.nearest((99.0, 99.0, 3.2))[0] == (100.0, 100.0, 3.2)
+
+    G.remove_node((100.0, 100.0, 3.2))
+    assert get_node_index(G) is not rebuilt
+    assert get_node_index(G).nearest((99.0, 99.0, 3.2))[0] != (100.0, 100.0, 3.2)
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import networkx as nx
+import numpy as np
+
+from floor_fixtures import mm_line, room
+from generate_grid_test import (
+    generate_extended_gridlines_per_floor, generate_quadtree_gridlines_per_floor, quadtree_leaves, create_graph
+)
+
+
+def test_quadtree_leaves_partition_rooms_without_merging_fine_points():
+    labels = np.full((13, 19), -1, dtype=np.int32)
+    labels[:, :10] = 0
+    labels[2:12, 10:] = 1
+    fine = np.zeros(labels.shape, dtype=bool)
+    fine[5, :] = True
+
+    leaf_id, blocks = quadtree_leaves(labels, fine, max_level=2)
+
+    assert ((leaf_id >= 0) == (labels >= 0)).all()
+    for leaf, (ix0, iy0, size) in enumerate(blocks.tolist()):
+        cells = leaf_id[iy0:iy0 + size, ix0:ix0 + size]
+        assert cells.shape == (size, size) and (cells == leaf).all()
+        assert len(np.unique(labels[iy0:iy0 + size, ix0:ix0 + size])) == 1
+        assert size == 1 or not fine[iy0:iy0 + size, ix0:ix0 + size].any()
+    assert blocks[:, 2].max() == 4
+
+
+def test_quadtree_grid_is_coarser_and_connected():
+    rooms = [room("HALL", 0, 0, 40, 20)]
+    walls = [SimpleNamespace(baseLine=mm_line(*c)) for c in [(0, 0, 40, 0), (40, 0, 40, 20), (40, 20, 0, 20), (0, 20, 0, 0)]]
+    bounds = {"min_x": 0.0, "max_x": 40.0, "min_y": 0.0, "max_y": 20.0, "avg_z": 0.0}
+
+    uniform, _, uniform_grid = generate_extended_gridlines_per_floor(
+        rooms, walls, [], spacing=0.5, global_bounds=bounds, tagging="vectorized"
+    )
+    quadtree, _, quadtree_grid = generate_quadtree_gridlines_per_floor(
+        rooms, walls, [], spacing=0.5, max_cell=8.0, global_bounds=bounds
+    )
+    assert len(quadtree_grid) * 4 < len(uniform_grid)
+
+    # Refined points along the walls sit exactly on the uniform lattice
+    uniform_points = {(p.x, p.y) for p in uniform_grid.values()}
+    assert (0.5, 0.5) in {(p.x, p.y) for p in quadtree_grid.values()} & uniform_points
+
+    G, _ = create_graph(rooms=rooms, walls=walls, gridlines=quadtree, level_name="L1")
+    assert nx.is_connected(G)
+    assert G.number_of_nodes() == len(quadtree_grid)
+
+    # Travel distance across the hall stays close to the straight-line distance
+    corner_a, corner_b = (0.5, 0.5, 0.0), (39.5, 19.5, 0.0)
+    straight = np.hypot(39.0, 19.0)
+    assert nx.dijkstra_path_length(G, corner_a, corner_b) < 1.1 * straight
+
+
+def test_quadtree_grid_treats_polygons_of_one_room_as_one_room():
+    rooms = [room("HALL", 0, 0, 20, 20), room("HALL", 20, 0, 40, 20)]
+    walls = [SimpleNamespace(baseLine=mm_line(*c)) for c in [(0, 0, 40, 0), (40, 0, 40, 20), (40, 20, 0, 20), (0, 20, 0, 0)]]
+    bounds = {"min_x": 0.0, "max_x": 40.0, "min_y": 0.0, "max_y": 20.0, "avg_z": 0.0}
+
+    edges, _, grid = generate_quadtree_gridlines_per_floor(rooms, walls, [], spacing=0.5, max_cell=8.0, global_bounds=bounds)
+    G, _ = create_graph(rooms=rooms, walls=walls, gridlines=edges, level_name="L1")
+    assert G.number_of_nodes() == len(grid)
+    assert nx.is_connected(G)
@@ -0,0 +1,62 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from room_cache import RoomKnowledgeCache
+
+
+def test_bulk_get_and_put_are_keyed_by_code_pdf_and_prompt_version(tmp_path):
+    cache = RoomKnowledgeCache(str(tmp_path / "rooms.sqlite"))
+
+    assert cache.put_many("classification", {" office": "Group B", "Store ": "Group M", "LOBBY": None}, "SBC_201.pdf") == 2
+    assert cache.get_many("classification", ["OFFICE", "store", "lobby"], "codes/SBC_201.pdf") == {
+        "OFFICE": "Group B", "STORE": "Group M"
+    }
+    assert cache.get_many("classification", ["OFFICE"], "IBC_2021.pdf") == {}
+    assert cache.get_many("classification", ["OFFICE"], "SBC_201.pdf", prompt_version="2") == {}
+
+    cache.put_many("olf", {"OFFICE": [9.0, "gross"]}, "SBC_201.pdf")
+    assert cache.get_many("olf", ["office"], "SBC_201.pdf") == {"OFFICE": [9.0, "gross"]}
+
+    stats = cache.stats()
+    assert (stats["classification"]["hits"], stats["classification"]["misses"]) == (2, 3)
+    assert stats["classification"]["hit_rate"] == 0.4
+    assert stats["olf"]["entries"] == 1
+    cache.close()
+
+    reopened = RoomKnowledgeCache(str(tmp_path / "rooms.sqlite"))
+    assert reopened.stats()["classification"]["total_hits"] == 2
+    assert reopened.stats()["classification"]["hits"] == 0
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / "classification_index.json"
+    legacy.write_text(json.dumps({
+        "OFFICE": {"classification": "Group B", "olf": [9.0, "gross"], "max_occupancy": 49},
+        "RECEPTION": {"classification": "Group B", "max_occupancy": 49},
+        "STORE": {"olf": [28.0, "gross"]},
+    }))
+    cache = RoomKnowledgeCache(str(tmp_path / "rooms.sqlite"))
+
+    assert cache.import_json(str(legacy), "SBC_201.pdf") == 5
+    assert cache.items("classification", "SBC_201.pdf") == {"OFFICE": "Group B", "RECEPTION": "Group B"}
+    assert cache.items("olf", "SBC_201.pdf") == {"OFFICE": [9.0, "gross"], "STORE": [28.0, "gross"]}
+    assert cache.items("max_occupancy", "SBC_201.pdf") == {"GROUP B": 49}
+
+    cache.put_many("classification", {"OFFICE": "Group E"}, "SBC_201.pdf")
+    assert cache.import_json(str(legacy), "SBC_201.pdf") == 0
+    assert cache.get_many("classification", ["OFFICE"], "SBC_201.pdf") == {"OFFICE": "Group E"}
+
+
+def test_parallel_writers_share_one_database(tmp_path):
+    path = str(tmp_path / "rooms.sqlite")
+
+    def write(worker):
+        cache = RoomKnowledgeCache(path)
+        for batch in range(10):
+            cache.put_many("classification", {f"ROOM {worker}-{batch}-{i}": "Group B" for i in range(20)}, "SBC_201.pdf")
+        cache.close()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(write, range(4)))
+
+    assert len(RoomKnowledgeCache(path).items("classification", "SBC_201.pdf")) == 4 * 10 * 20
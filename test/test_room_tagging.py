@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+from specklepy.objects.geometry import Polycurve
+
+from floor_fixtures import mm_line, room, walls_around
+from generate_grid_test import compute_global_bounds, generate_extended_gridlines_per_floor
+
+
+def l_room(room_id):
+    pts = [(10.0, 0.3), (14.2, 0.3), (14.2, 2.5), (12.0, 2.5), (12.0, 6.1), (10.0, 6.1)]
+    outline = Polycurve(segments=[mm_line(*pts[i], *pts[(i + 1) % len(pts)]) for i in range(len(pts))])
+    return SimpleNamespace(id=room_id, elementId=room_id, name=room_id, outline=outline)
+
+
+def tagged_grid(tagging):
+    rooms = [
+        room("A", 0.2, 0.2, 6.1, 4.3),
+        room("B", 6.1, 0.2, 9.7, 4.3),   # shares the x=6.1 edge with A
+        room("C", 2.0, 2.0, 8.0, 7.6),   # overlaps A and B: the earlier room keeps the points
+        room(None, 0.2, 5.0, 1.9, 7.6),  # no id: tagged, but never connected
+        room("D", 0.0, 8.0, 4.0, 10.0),  # edges on lattice lines
+        l_room("E"),
+        room("F", 10.0, 6.6, 12.0, 9.6),  # one room outlined by two polygons meeting at x=12
+        room("F", 12.0, 6.6, 14.0, 9.6),
+    ]
+    walls = walls_around(0.0, 0.0, 14.2, 10.0)
+    bounds = compute_global_bounds(rooms, walls, [])
+    edges, z, grid_dict = generate_extended_gridlines_per_floor(rooms, walls, [], spacing=0.5, global_bounds=bounds, tagging=tagging)
+    points = {key: (p.x, p.y, p.z) for key, p in grid_dict.items()}
+    return z, points, [(a.x, a.y, b.x, b.y, rid) for a, b, rid in edges]
+
+
+@pytest.mark.parametrize("tagging", ["vectorized", "sparse"])
+def test_tagging_modes_match_per_point_tagging(tagging):
+    z, points, edges = tagged_grid("per_point")
+    assert len(points) > 300 and {rid for *_, rid in edges} == {"A", "B", "C", "D", "E", "F"}
+
+    assert tagged_grid(tagging) == (z, points, edges)
+
+
+@pytest.mark.parametrize("tagging", ["per_point", "vectorized", "sparse"])
+def test_polygons_of_one_room_connect_where_they_meet(tagging):
+    _, _, edges = tagged_grid(tagging)
+    seam = {(ax, bx) for ax, ay, bx, by, rid in edges if rid == "F" and ay == by == 8.0}
+    assert {(11.5, 12.0), (12.0, 12.5)} <= seam
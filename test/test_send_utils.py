@@ -0,0 +1,59 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from specklepy.logging.exceptions import SpeckleException
+
+import send_utils
+from send_utils import UploadQueue, create_commit, send_graph_to_speckle_per_floor
+
+
+class FakeClient:
+    """Mimics specklepy: a second commit.create during one in flight comes back as an exception."""
+
+    def __init__(self):
+        self.busy = threading.Lock()
+        self.commits = []
+        self.commit = SimpleNamespace(create=self.create)
+
+    def create(self, stream_id, object_id, branch_name, message):
+        if not self.busy.acquire(blocking=False):
+            return SpeckleException("TransportAlreadyConnected")
+        try:
+            time.sleep(0.05)
+            self.commits.append(message)
+            return f"commit-{len(self.commits)}"
+        finally:
+            self.busy.release()
+
+
+def test_upload_threads_commit_through_their_own_clients():
+    clients = []
+
+    def factory():
+        clients.append(FakeClient())
+        return clients[-1]
+
+    with UploadQueue(max_workers=2, client_factory=factory) as uploads:
+        futures = [
+            uploads.submit(lambda i: create_commit(uploads.client(), "p", f"obj{i}", "main", f"floor {i}"), i)
+            for i in range(6)
+        ]
+        commit_ids = [future.result() for future in futures]
+
+    assert len(clients) == 2
+    assert all(commit_id.startswith("commit-") for commit_id in commit_ids)
+    assert sorted(m for client in clients for m in client.commits) == sorted(f"floor {i}" for i in range(6))
+
+
+def test_returned_commit_errors_are_reported_as_failures(monkeypatch, capsys):
+    client = FakeClient()
+    client.busy.acquire()  # another thread's call is in flight
+    monkeypatch.setattr(send_utils, "ServerTransport", lambda **kwargs: None)
+    monkeypatch.setattr(send_utils.operations, "send", lambda base, transports: "obj1")
+
+    send_graph_to_speckle_per_floor(["edge"], client, "p", "L1")
+
+    out = capsys.readouterr().out
+    assert "❌ Failed to create commit for L1" in out
+    assert "✅ Commit created" not in out
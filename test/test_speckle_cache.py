@@ -0,0 +1,72 @@
+from specklepy.api import operations
+from specklepy.objects.base import Base
+from specklepy.transports.memory import MemoryTransport
+
+import speckle_cache
+from speckle_cache import SpeckleModelCache
+
+
+class StandInServer(MemoryTransport):
+    """MemoryTransport that can act as the remote side of operations.receive and counts downloads."""
+
+    def __init__(self):
+        super().__init__()
+        self.downloads = 0
+
+    def copy_object_and_children(self, id, target_transport):
+        self.downloads += 1
+        for obj_id, obj in self.objects.items():
+            target_transport.save_object(obj_id, obj)
+        return self.objects[id]
+
+
+def send_model(transport, name):
+    base = Base()
+    base["name"] = name
+    base["elements"] = [Base(category="Rooms", area=12.5), Base(category="Walls", length=4.0)]
+    return operations.send(base, [transport])
+
+
+def test_second_receive_skips_the_transport(tmp_path, monkeypatch):
+    remote = StandInServer()
+    obj_id = send_model(remote, "tower")
+
+    # Keep specklepy's own local SQLite transport out of the picture
+    real_receive = operations.receive
+    monkeypatch.setattr(speckle_cache.operations, "receive",
+                        lambda oid, transport: real_receive(oid, transport, MemoryTransport()))
+
+    cache = SpeckleModelCache(str(tmp_path / "models.sqlite"))
+    first = cache.receive(obj_id, remote)
+    second = cache.receive(obj_id, remote)
+
+    assert remote.downloads == 1
+    assert second.name == first.name == "tower"
+    assert [el.category for el in second.elements] == ["Rooms", "Walls"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+    # Counters and entries survive a new process / instance
+    reopened = SpeckleModelCache(str(tmp_path / "models.sqlite"))
+    reopened.receive(obj_id, remote)
+    stats = reopened.stats()
+    assert remote.downloads == 1
+    assert (stats["entries"], stats["total_hits"], stats["total_misses"]) == (1, 2, 1)
+
+
+def test_eviction_by_age_and_size(tmp_path):
+    cache = SpeckleModelCache(str(tmp_path / "models.sqlite"), max_age_s=100)
+    cache.put("old", Base(name="old"), now=0)
+    cache.put("new", Base(name="new"), now=150)
+    assert cache.get("old", now=150) is None
+    assert cache.get("new", now=150).name == "new"
+
+    entry_size = cache.stats()["bytes"]
+    cache.max_bytes = int(entry_size * 2.5)
+    cache.put("a", Base(name="a"), now=160)
+    cache.get("new", now=170)  # Touch → "a" becomes least recently used
+    cache.put("b", Base(name="b"), now=180)
+
+    assert cache.get("a", now=190) is None
+    assert cache.get("new", now=190) is not None
+    assert cache.get("b", now=190) is not None
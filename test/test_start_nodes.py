@@ -0,0 +1,39 @@
+import networkx as nx
+from path_of_travel import compute_room_start_nodes, map_farthest_point_from_door
+
+
+def build_floor():
+    """Four 5 x 3 rooms on a 0.5 m grid with 0, 1, 2 and 3 doors."""
+    G = nx.Graph()
+    for room_index, room in enumerate(["R0", "R1", "R2", "R3"]):
+        for ix in range(10):
+            for iy in range(6):
+                G.add_node((room_index * 6.0 + ix * 0.5, iy * 0.5, 0.0), room_id=room)
+    G.add_node((99.0, 99.0, 0.0), room_id="door_D9")
+
+    doors = {
+        "R1": [(6.0, 0.0, 0.0)],
+        "R2": [(12.0, 0.0, 0.0), (16.5, 2.5, 0.0)],
+        "R3": [(18.0, 0.0, 0.0), (18.0, 2.5, 0.0), (22.5, 0.0, 0.0)],
+    }
+    for room_doors in doors.values():
+        for node in room_doors:
+            G.nodes[node]["type"] = "door"
+    return G
+
+
+def test_batched_start_nodes_follow_the_door_rules():
+    G = build_floor()
+    start_nodes = compute_room_start_nodes(G)
+
+    assert set(start_nodes) == {"R0", "R1", "R2", "R3"}
+    assert start_nodes["R0"] == (2.0, 1.0, 0.0)       # closest to the centroid (2.25, 1.25), first in node order
+    assert start_nodes["R1"] == (10.5, 2.5, 0.0)      # farthest from the single door
+    assert start_nodes["R2"] == (14.0, 1.0, 0.0)      # closest to the midpoint of the two doors
+    assert start_nodes["R3"] == (18.5, 0.5, 0.0)      # smallest average distance to all three doors
+
+    assert compute_room_start_nodes(G, strategy="room_center")["R1"] == (8.0, 1.0, 0.0)
+
+    map_farthest_point_from_door(G)
+    assert G.graph["room_start_nodes"] == start_nodes
+    assert G.graph["start_nodes"] == list(start_nodes.values())
@@ -0,0 +1,54 @@
+import random
+
+import networkx as nx
+from path_of_travel import stitch_subgraphs
+
+
+def grid_patch(G, x0, y0, nx_, ny_, spacing=0.5):
+    for ix in range(nx_):
+        for iy in range(ny_):
+            G.add_node((x0 + ix * spacing, y0 + iy * spacing, 0.0))
+    for u in list(G.nodes):
+        for v in [(u[0] + spacing, u[1], 0.0), (u[0], u[1] + spacing, 0.0)]:
+            if v in G:
+                G.add_edge(u, v, weight=spacing)
+
+
+def fragmented_floor():
+    """A large patch, two patches 0.4 m from it and a chain of two patches only close to each other."""
+    G = nx.Graph()
+    grid_patch(G, 0.0, 0.0, 20, 10)
+    grid_patch(G, 9.9, 0.0, 3, 3)
+    grid_patch(G, 0.0, 4.9, 4, 2)
+    grid_patch(G, 20.0, 0.0, 3, 3)
+    grid_patch(G, 21.4, 0.0, 3, 3)
+    return G
+
+
+def test_kdtree_engine_matches_pairwise_links():
+    G_kd, G_pw = fragmented_floor(), fragmented_floor()
+    stitch_subgraphs(G_kd, max_distance=0.6, engine="kdtree")
+    stitch_subgraphs(G_pw, max_distance=0.6, engine="pairwise")
+
+    assert G_kd.number_of_edges() == G_pw.number_of_edges() == fragmented_floor().number_of_edges() + 2
+    assert nx.number_connected_components(G_kd) == nx.number_connected_components(G_pw) == 3
+
+
+def test_forest_strategy_stitches_fragments_to_each_other():
+    G = fragmented_floor()
+    base_edges = G.number_of_edges()
+    stitch_subgraphs(G, max_distance=0.6, strategy="forest")
+
+    # The far chain is joined to itself, but nothing links it to the main patch
+    assert nx.number_connected_components(G) == 2
+    assert G.number_of_edges() == base_edges + 3
+    chain_links = [(u, v, w) for u, v, w in G.edges(data="weight") if {u[0], v[0]} == {21.0, 21.4}]
+    assert len(chain_links) == 1 and abs(chain_links[0][2] - 0.4) < 1e-9
+
+    # Nodes cut loose from the main patch are linked back to their neighbours
+    random.seed(3)
+    H = fragmented_floor()
+    for u in random.sample(list(H.nodes), 5):
+        H.remove_edges_from(list(H.edges(u)))
+    stitch_subgraphs(H, max_distance=0.6, strategy="forest")
+    assert nx.number_connected_components(H) == 2
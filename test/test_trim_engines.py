@@ -0,0 +1,81 @@
+import math
+import random
+from types import SimpleNamespace
+
+import numpy as np
+from matplotlib.path import Path
+from specklepy.objects.geometry import Point, Line
+
+from floor_fixtures import mm_line, room, door
+from generate_grid_test import (
+    generate_extended_gridlines_per_floor, trim_gridlines, points_in_polygons,
+    raster_keep_mask, trim_agreement
+)
+
+
+def build_floor(seed=3):
+    rng = random.Random(seed)
+    walls = [SimpleNamespace(baseLine=mm_line(*c)) for c in
+             [(0, 0, 12, 0), (12, 0, 12, 8), (12, 8, 0, 8), (0, 8, 0, 0), (6, 0, 6, 8), (0, 4, 12, 4)]]
+    for _ in range(15):
+        x, y, a = rng.uniform(0, 12), rng.uniform(0, 8), rng.uniform(0, math.pi)
+        walls.append(SimpleNamespace(baseLine=mm_line(x, y, x + 2 * math.cos(a), y + 2 * math.sin(a))))
+    doors = [door("D1", 6.0, 2.0, math.pi / 2), door("D2", 3.0, 4.0, 0.0), door("D3", 9.25, 4.0, 0.0)]
+    doors += [door(f"X{i}", rng.uniform(0, 12), rng.uniform(0, 8), rng.uniform(0, math.pi)) for i in range(8)]
+    rooms = [room("R1", 0, 0, 6, 4), room("R2", 6, 0, 12, 4), room("R3", 0, 4, 12, 8)]
+    return rooms, walls, doors
+
+
+def build_gridlines(seed=3):
+    rooms, walls, doors = build_floor(seed)
+    wall_lines = [Line(start=Point(x=w.baseLine.start.x / 1000, y=w.baseLine.start.y / 1000),
+                       end=Point(x=w.baseLine.end.x / 1000, y=w.baseLine.end.y / 1000)) for w in walls]
+    bounds = {"min_x": 0.0, "max_x": 12.0, "min_y": 0.0, "max_y": 8.0, "avg_z": 0.0}
+    gridlines, _, grid_dict = generate_extended_gridlines_per_floor(
+        rooms, walls, doors, spacing=0.5, global_bounds=bounds, tagging="vectorized"
+    )
+    return gridlines, wall_lines, doors, grid_dict
+
+
+def test_batch_engine_matches_per_line_engine():
+    gridlines, wall_lines, doors, grid_dict = build_gridlines()
+
+    per_line = trim_gridlines(gridlines, wall_lines, doors, grid_dict, engine="per_line")
+    batch = trim_gridlines(gridlines, wall_lines, doors, grid_dict, engine="batch")
+
+    key = lambda line: (line[0].x, line[0].y, line[1].x, line[1].y, str(line[2]))
+    assert [key(line) for line in batch] == [key(line) for line in per_line]
+    assert 0 < len(batch) < len(gridlines)
+
+
+def test_points_in_polygons_matches_matplotlib_on_lattice():
+    bowtie = np.array([[4.4, 3.9], [4.4, 4.1], [5.6, 3.9], [5.6, 4.1]])  # Door polygon vertex order
+    quad = np.array([[1.0, 0.85], [3.0, 0.85], [3.0, 1.15], [1.0, 1.15]])
+    pts = np.array([(x, y) for x in np.arange(0, 6.01, 0.25) for y in np.arange(0, 5.01, 0.05)])
+
+    for poly in (bowtie, quad):
+        got = points_in_polygons(pts[:, 0], pts[:, 1], np.repeat(poly[None], len(pts), axis=0))
+        expected = [Path(poly).contains_point(p) for p in pts]
+        assert got.tolist() == expected
+
+
+def test_raster_engine_agrees_with_geometric_engine():
+    gridlines, wall_lines, doors, grid_dict = build_gridlines()
+    batch = trim_gridlines(gridlines, wall_lines, doors, grid_dict, engine="batch")
+    raster = trim_gridlines(gridlines, wall_lines, doors, grid_dict, engine="raster", report_agreement=True)
+
+    key = lambda line: (line[0].x, line[0].y, line[1].x, line[1].y)
+    batch_keys, raster_keys = {key(line) for line in batch}, {key(line) for line in raster}
+    assert len(batch_keys ^ raster_keys) <= 0.02 * len(gridlines)
+
+
+def test_raster_keep_mask_blocks_walls_but_not_doors():
+    seg = np.array([[0.0, 1.0, 0.5, 1.0], [1.0, 0.0, 1.0, 0.5], [3.0, 0.0, 3.0, 0.5], [5.0, 0.0, 5.0, 0.5]])
+    wall = np.array([[[0.0, 0.1], [6.0, 0.1], [6.0, 0.4], [0.0, 0.4]]])
+    door = np.array([[[2.5, 0.0], [3.5, 0.0], [3.5, 0.5], [2.5, 0.5]]])
+
+    keep = raster_keep_mask(seg, wall, door, spacing=0.5, oversample=4)
+    assert keep.tolist() == [True, False, True, False]
+
+    report = trim_agreement(keep, np.array([True, False, False, False]))
+    assert report == {"gridlines": 4, "agreement": 0.75, "extra_kept": 1, "extra_removed": 0}
@@ -0,0 +1,34 @@
+import pytest
+
+from vectorstore_registry import get_vectorstore, clear_vectorstores, registry_stats
+
+
+def test_vectorstores_are_loaded_once_and_evicted_lru(tmp_path, monkeypatch):
+    for name in ("SBC_Code_201", "IBC_2021", "NFPA_101"):
+        (tmp_path / name).mkdir()
+    loads = []
+
+    def loader(index_path, index_name):
+        loads.append(index_name)
+        return object()
+
+    clear_vectorstores()
+    monkeypatch.setenv("SELECTED_CODE_PDF", "SBC_Code_201.pdf")
+    first = get_vectorstore(base_dir=tmp_path, max_size=2, loader=loader)
+    assert get_vectorstore("SBC_Code_201", base_dir=tmp_path, max_size=2, loader=loader) is first
+    assert loads == ["SBC_Code_201"]
+
+    get_vectorstore("IBC_2021.pdf", base_dir=tmp_path, max_size=2, loader=loader)
+    get_vectorstore("SBC_Code_201.pdf", base_dir=tmp_path, max_size=2, loader=loader)   # now most recent
+    get_vectorstore("NFPA_101.pdf", base_dir=tmp_path, max_size=2, loader=loader)       # evicts IBC_2021
+    assert get_vectorstore(base_dir=tmp_path, max_size=2, loader=loader) is first
+    get_vectorstore("IBC_2021.pdf", base_dir=tmp_path, max_size=2, loader=loader)
+    assert loads == ["SBC_Code_201", "IBC_2021", "NFPA_101", "IBC_2021"]
+    assert registry_stats()["open"] == 2
+
+    with pytest.raises(FileNotFoundError):
+        get_vectorstore("missing.pdf", base_dir=tmp_path, loader=loader)
+    monkeypatch.delenv("SELECTED_CODE_PDF")
+    with pytest.raises(RuntimeError):
+        get_vectorstore(base_dir=tmp_path, loader=loader)
+    clear_vectorstores()
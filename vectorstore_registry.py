@@ -0,0 +1,90 @@
+# vectorstore_registry.py
+# Process-wide FAISS vectorstores, keyed by code PDF and loaded on first use.
+#
+#   vector_db/<code pdf without extension>/<code pdf without extension>.faiss / .pkl
+#
+# All stores share one embedding model. The least recently used store is dropped once more than
+# VECTORSTORE_CACHE_SIZE code PDFs are open.
+
+import os
+import threading
+from collections import OrderedDict
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+VECTOR_DB_DIR = "vector_db"
+VECTORSTORE_CACHE_SIZE = int(os.getenv("VECTORSTORE_CACHE_SIZE", 2))
+
+_lock = threading.RLock()
+_embeddings = {}
+_vectorstores = OrderedDict()
+_stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+
+def index_name_for(code_pdf):
+    return os.path.splitext(os.path.basename(code_pdf))[0]
+
+
+def get_embeddings(model_name=EMBEDDING_MODEL):
+    """The shared HuggingFaceEmbeddings model, loaded once per process."""
+    with _lock:
+        if model_name not in _embeddings:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+
+            print(f"[DEBUG] Loading embedding model {model_name}", flush=True)
+            _embeddings[model_name] = HuggingFaceEmbeddings(model_name=model_name)
+        return _embeddings[model_name]
+
+
+def _load_faiss(index_path, index_name):
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS.load_local(
+        folder_path=index_path,
+        embeddings=get_embeddings(),
+        index_name=index_name,
+        allow_dangerous_deserialization=True
+    )
+
+
+def get_vectorstore(code_pdf=None, base_dir=VECTOR_DB_DIR, max_size=None, loader=_load_faiss):
+    """
+    The FAISS vectorstore of code_pdf (default: SELECTED_CODE_PDF), loaded on first use.
+    loader(index_path, index_name) builds a store on a miss.
+    """
+    code_pdf = code_pdf or os.environ.get("SELECTED_CODE_PDF")
+    if not code_pdf:
+        raise RuntimeError("Environment variable SELECTED_CODE_PDF must be set (e.g., SBC_Code_201.pdf)")
+
+    index_name = index_name_for(code_pdf)
+    index_path = os.path.join(base_dir, index_name)
+    key = (os.path.abspath(index_path), index_name)
+    max_size = VECTORSTORE_CACHE_SIZE if max_size is None else max_size
+
+    with _lock:
+        if key in _vectorstores:
+            _vectorstores.move_to_end(key)
+            _stats["hits"] += 1
+            return _vectorstores[key]
+
+        if not os.path.isdir(index_path):
+            raise FileNotFoundError(f"Expected FAISS index folder not found: {index_path}")
+
+        print(f"[DEBUG] Loading FAISS index from {index_path} (index_name={index_name})", flush=True)
+        store = loader(index_path, index_name)
+        _stats["loads"] += 1
+        _vectorstores[key] = store
+
+        while len(_vectorstores) > max(1, max_size):
+            _vectorstores.popitem(last=False)
+            _stats["evictions"] += 1
+        return store
+
+
+def clear_vectorstores():
+    with _lock:
+        _vectorstores.clear()
+
+
+def registry_stats():
+    with _lock:
+        return {"open": len(_vectorstores), **_stats}